@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregados materializados do dataset de reviews
+Calculados uma vez na carga (ou incrementalmente quando chegam novas linhas)
+para que os handlers do dashboard respondam em tempo constante
+"""
+
+import math
+
+import pandas as pd
+
+from dataset import sentiment_from_scores
+
+
+class ReviewAggregates:
+    """Contadores e somas do dataset, com resultados derivados memorizados"""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.total = 0
+        self.with_comment = 0
+        self.score_sum = 0.0
+        self.score_sumsq = 0.0
+        self.score_counts = pd.Series(dtype='int64')
+        self.sentiment_counts = pd.Series(dtype='int64')
+        # Mês (Period) -> [quantidade, soma das notas]
+        self.monthly_counts = pd.Series(dtype='int64')
+        self.monthly_sums = pd.Series(dtype='float64')
+        # Séries diária/semanal/mensal para os gráficos de tendência
+        self.temporal = TemporalAggregates()
+        self._memo = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Constrói os agregados a partir do DataFrame completo"""
+        aggregates = cls(version=df.attrs.get('dataset_version'))
+        aggregates.update(df)
+        return aggregates
+
+    def is_current(self, df):
+        """Indica se os agregados correspondem à versão do DataFrame"""
+        return self.version is not None and self.version == df.attrs.get('dataset_version')
+
+    def update(self, df_new, version=None):
+        """Acumula um lote de linhas novas (carga inicial ou append)"""
+        if version is not None:
+            self.version = version
+        if df_new.empty:
+            return self
+
+        scores = df_new['review_score']
+        self.total += len(df_new)
+        self.with_comment += int(df_new['review_comment_message'].notna().sum())
+        self.score_sum += float(scores.sum())
+        self.score_sumsq += float((scores.astype('float64') ** 2).sum())
+        self.score_counts = self.score_counts.add(
+            scores.value_counts(), fill_value=0).astype('int64').sort_index()
+
+        # Usa as colunas derivadas do DataFrame compartilhado quando existirem
+        if 'sentiment' in df_new.columns:
+            sentiment = df_new['sentiment']
+        else:
+            sentiment = sentiment_from_scores(scores).rename('sentiment')
+        self.sentiment_counts = self.sentiment_counts.add(
+            sentiment.value_counts(), fill_value=0).astype('int64')
+
+        if 'review_month' in df_new.columns:
+            months = df_new['review_month']
+        elif 'review_creation_date' in df_new.columns:
+            dates = df_new['review_creation_date']
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates)
+            months = dates.dt.to_period('M')
+        else:
+            months = None
+
+        if months is not None:
+            grouped = scores.groupby(months).agg(['count', 'sum'])
+            self.monthly_counts = self.monthly_counts.add(
+                grouped['count'], fill_value=0).astype('int64').sort_index()
+            self.monthly_sums = self.monthly_sums.add(
+                grouped['sum'].astype('float64'), fill_value=0).sort_index()
+        if 'review_creation_date' in df_new.columns:
+            self.temporal.update(df_new[['review_creation_date', 'review_score']])
+
+        self._memo.clear()
+        return self
+
+    def _median(self):
+        """Mediana exata a partir do histograma das notas"""
+        cumulative = self.score_counts.cumsum()
+        lower = cumulative.index[cumulative.searchsorted((self.total - 1) // 2, side='right')]
+        upper = cumulative.index[cumulative.searchsorted(self.total // 2, side='right')]
+        return (float(lower) + float(upper)) / 2
+
+    def _std(self):
+        """Desvio padrão amostral (ddof=1), como pandas"""
+        if self.total < 2:
+            return float('nan')
+        variance = (self.score_sumsq - self.score_sum ** 2 / self.total) / (self.total - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def basic_stats(self):
+        """Mesmo conteúdo de get_basic_stats(), sem varrer o dataset"""
+        if 'basic_stats' not in self._memo:
+            self._memo['basic_stats'] = {
+                "Total de Reviews": self.total,
+                "Reviews com Comentário": self.with_comment,
+                "Reviews sem Comentário": self.total - self.with_comment,
+                "Média de Avaliação": self.score_sum / self.total if self.total else float('nan'),
+                "Mediana de Avaliação": self._median() if self.total else float('nan'),
+                "Desvio Padrão": self._std()
+            }
+        return self._memo['basic_stats']
+
+    def score_distribution(self):
+        """Contagem de reviews por nota, ordenada pela nota"""
+        return self.score_counts
+
+    def sentiment_distribution(self):
+        """Contagem por sentimento, da mais frequente para a menos frequente"""
+        if 'sentiment_distribution' not in self._memo:
+            counts = self.sentiment_counts[self.sentiment_counts > 0]
+            self._memo['sentiment_distribution'] = counts.sort_values(ascending=False)
+        return self._memo['sentiment_distribution']
+
+    def monthly_trend(self):
+        """Total de reviews e avaliação média por mês"""
+        if 'monthly_trend' not in self._memo:
+            monthly_data = pd.DataFrame({
+                'Total_Reviews': self.monthly_counts,
+                'Avaliação_Média': (self.monthly_sums / self.monthly_counts).round(2)
+            })
+            self._memo['monthly_trend'] = monthly_data
+        return self._memo['monthly_trend']
+
+    def daily_trend(self):
+        """Total de reviews e avaliação média por dia"""
+        if 'daily_trend' not in self._memo:
+            daily = self.temporal.frame('daily')
+            self._memo['daily_trend'] = pd.DataFrame({
+                'Total_Reviews': daily['count'],
+                'Avaliação_Média': daily['mean_score'].round(2)
+            })
+        return self._memo['daily_trend']
+
+
+# Granularidades temporais: nome -> como agrupar a partir dos dias (PeriodIndex diário)
+TEMPORAL_GRANULARITIES = {
+    'daily': lambda days: days,
+    'weekly': lambda days: days.asfreq('W'),
+    'monthly': lambda days: days.asfreq('M'),
+    'month_of_year': lambda days: days.month,
+}
+
+
+class TemporalAggregates:
+    """
+    Quantidade de reviews e soma das notas por dia, semana, mês e mês do ano.
+    Cada bloco é agrupado uma vez por dia e os totais diários são reagrupados
+    nas demais granularidades; parciais de blocos, arquivos ou processos
+    diferentes se combinam com merge().
+    """
+
+    def __init__(self):
+        self.counts = {name: pd.Series(dtype='int64') for name in TEMPORAL_GRANULARITIES}
+        self.sums = {name: pd.Series(dtype='float64') for name in TEMPORAL_GRANULARITIES}
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls().update(df)
+
+    @classmethod
+    def from_csv(cls, csv_path, chunk_size=200_000):
+        """Uma passada pelo CSV em blocos, lendo só a data e a nota"""
+        from dataset import read_reviews_csv
+
+        aggregates = cls()
+        for chunk in read_reviews_csv(csv_path, usecols=['review_creation_date', 'review_score'],
+                                      chunksize=chunk_size):
+            aggregates.update(chunk)
+        return aggregates
+
+    def _add(self, name, counts, sums):
+        self.counts[name] = self.counts[name].add(counts, fill_value=0).astype('int64').sort_index()
+        self.sums[name] = self.sums[name].add(sums, fill_value=0).sort_index()
+
+    def update(self, df):
+        """Acumula um bloco de linhas (review_creation_date, review_score)"""
+        dates = df['review_creation_date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        valid = dates.notna()
+        if not valid.any():
+            return self
+        daily = df['review_score'][valid].astype('float64').groupby(
+            dates[valid].dt.to_period('D')).agg(['count', 'sum'])
+        for name, regroup in TEMPORAL_GRANULARITIES.items():
+            if name == 'daily':
+                grouped = daily
+            else:
+                grouped = daily.groupby(regroup(daily.index)).sum()
+            self._add(name, grouped['count'], grouped['sum'])
+        return self
+
+    def merge(self, other):
+        """Novo acumulador com a soma dos dois parciais"""
+        merged = TemporalAggregates()
+        for name in TEMPORAL_GRANULARITIES:
+            merged._add(name, self.counts[name], self.sums[name])
+            merged._add(name, other.counts[name], other.sums[name])
+        return merged
+
+    def frame(self, granularity='monthly'):
+        """DataFrame com 'count' e 'mean_score' por período da granularidade"""
+        counts = self.counts[granularity]
+        return pd.DataFrame({'count': counts, 'mean_score': self.sums[granularity] / counts})
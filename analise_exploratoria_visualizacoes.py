@@ -12,8 +12,19 @@ import seaborn as sns
 from wordcloud import WordCloud
 import warnings
 from datetime import datetime
-import re
-from collections import Counter
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import reduce
+from pathlib import Path
+
+from aggregates import TemporalAggregates
+from dataset import load_reviews
+from term_frequency import TermFrequencies
 
 # Configurações para melhor visualização
 plt.style.use('seaborn-v0_8')
@@ -26,18 +37,35 @@ warnings.filterwarnings('ignore')
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_colwidth', None)
 
-def carregar_dados():
-    """Carrega e prepara os dados"""
+# Destino das figuras no modo relatório: (diretório, nome da figura, formatos, arquivos gravados)
+_SAIDA = None
+
+def _mostrar(fig):
+    """Exibe a figura; no modo relatório grava nos formatos pedidos e fecha"""
+    if _SAIDA is None:
+        plt.show()
+        return
+    diretorio, nome, formatos, arquivos = _SAIDA
+    # Análises com mais de uma figura: nome.png, nome_2.png, ...
+    numero = len(arquivos) // len(formatos) + 1
+    base = nome if numero == 1 else f'{nome}_{numero}'
+    for formato in formatos:
+        fig.savefig(Path(diretorio) / f'{base}.{formato}', format=formato, dpi=100, bbox_inches='tight')
+        arquivos.append(f'{base}.{formato}')
+    plt.close(fig)
+
+def carregar_dados(csv_path='../app/data/olist_order_reviews_dataset.csv'):
+    """Carrega e prepara os dados (`csv_path`: um CSV ou uma lista de CSVs concatenados)"""
     print("Carregando dados...")
-    df_reviews = pd.read_csv('../app/data/olist_order_reviews_dataset.csv')
+    # Datas e tipos já vêm prontos do cache colunar
+    if isinstance(csv_path, (str, os.PathLike)):
+        df_reviews = load_reviews(csv_path)
+    else:
+        df_reviews = pd.concat([load_reviews(path) for path in csv_path], ignore_index=True)
     
     print(f"Shape do dataset: {df_reviews.shape}")
     print(f"Período dos dados: {df_reviews['review_creation_date'].min()} a {df_reviews['review_creation_date'].max()}")
     
-    # Limpeza e preparação dos dados
-    df_reviews['review_creation_date'] = pd.to_datetime(df_reviews['review_creation_date'])
-    df_reviews['review_answer_timestamp'] = pd.to_datetime(df_reviews['review_answer_timestamp'])
-    
     # Tratar valores nulos nos comentários
     df_reviews['review_comment_message'] = df_reviews['review_comment_message'].fillna('')
     
@@ -48,6 +76,17 @@ def carregar_dados():
     
     return df_reviews
 
+def agregados_temporais(csv_paths, chunk_size=200_000):
+    """
+    Agregados temporais lidos de cada CSV em blocos (só data e nota, sem
+    carregar o arquivo inteiro) e combinados com merge()
+    """
+    if isinstance(csv_paths, (str, os.PathLike)):
+        csv_paths = [csv_paths]
+    print("Agregando datas e notas em blocos...")
+    return reduce(TemporalAggregates.merge,
+                  (TemporalAggregates.from_csv(path, chunk_size) for path in csv_paths))
+
 def analise_distribuicao_notas(df_reviews):
     """Análise da distribuição das notas"""
     print("\n=== ANÁLISE DA DISTRIBUIÇÃO DAS NOTAS ===")
@@ -83,7 +122,7 @@ def analise_distribuicao_notas(df_reviews):
                  f'{int(count):,}', ha='center', va='bottom', fontweight='bold')
     
     plt.tight_layout()
-    plt.show()
+    _mostrar(fig)
     
     # Análise das notas mais comuns
     score_counts = df_reviews['review_score'].value_counts().sort_index()
@@ -94,24 +133,27 @@ def analise_distribuicao_notas(df_reviews):
     print(f"\nNota mais comum: {score_counts.idxmax()} ({score_counts.max():,} reviews)")
     print(f"Nota menos comum: {score_counts.idxmin()} ({score_counts.min():,} reviews)")
     print(f"Média das notas: {df_reviews['review_score'].mean():.2f}")
+    
+    return {
+        'contagem_por_nota': {int(score): int(count) for score, count in score_counts.items()},
+        'nota_media': round(float(df_reviews['review_score'].mean()), 4),
+    }
 
-def analise_temporal(df_reviews):
-    """Análise temporal dos reviews"""
+def analise_temporal(df_reviews, temporal=None):
+    """Análise temporal dos reviews (`temporal`: TemporalAggregates já calculado, ex.: do CSV em blocos)"""
     print("\n=== ANÁLISE TEMPORAL DOS REVIEWS ===")
     
-    # Preparar dados temporais
-    df_reviews['date'] = df_reviews['review_creation_date'].dt.date
-    df_reviews['month'] = df_reviews['review_creation_date'].dt.to_period('M')
-    df_reviews['week'] = df_reviews['review_creation_date'].dt.to_period('W')
-    
-    # Agregações por diferentes períodos
-    daily_reviews = df_reviews.groupby('date').size().reset_index(name='count')
-    weekly_reviews = df_reviews.groupby('week').size().reset_index(name='count')
-    monthly_reviews = df_reviews.groupby('month').size().reset_index(name='count')
+    # Agregações por diferentes períodos (uma passada; semanas e meses saem dos totais diários)
+    if temporal is None:
+        temporal = TemporalAggregates.from_frame(df_reviews)
+    daily = temporal.frame('daily')
+    weekly = temporal.frame('weekly')
+    monthly = temporal.frame('monthly')
+    daily_reviews = pd.DataFrame({'date': daily.index.to_timestamp().date, 'count': daily['count'].to_numpy()})
     
     # Converter períodos para datetime para plotagem
-    weekly_reviews['week_dt'] = weekly_reviews['week'].dt.to_timestamp()
-    monthly_reviews['month_dt'] = monthly_reviews['month'].dt.to_timestamp()
+    weekly_reviews = pd.DataFrame({'week_dt': weekly.index.to_timestamp(), 'count': weekly['count'].to_numpy()})
+    monthly_reviews = pd.DataFrame({'month_dt': monthly.index.to_timestamp(), 'count': monthly['count'].to_numpy()})
     
     # Criar figura com subplots para diferentes granularidades temporais
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(16, 15))
@@ -141,10 +183,10 @@ def analise_temporal(df_reviews):
     ax3.tick_params(axis='x', rotation=45)
     
     plt.tight_layout()
-    plt.show()
+    _mostrar(fig)
     
     # Análise sazonal por mês
-    monthly_avg = df_reviews.groupby(df_reviews['review_creation_date'].dt.month)['review_score'].agg(['count', 'mean']).reset_index()
+    monthly_avg = temporal.frame('month_of_year').reset_index()
     monthly_avg.columns = ['month', 'review_count', 'avg_score']
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
@@ -167,14 +209,26 @@ def analise_temporal(df_reviews):
     ax2.tick_params(axis='x', rotation=45)
     
     plt.tight_layout()
-    plt.show()
+    _mostrar(fig)
     
     # Análise dos picos e quedas
-    print(f"Período total: {df_reviews['review_creation_date'].min().strftime('%d/%m/%Y')} a {df_reviews['review_creation_date'].max().strftime('%d/%m/%Y')}")
+    print(f"Período total: {daily_reviews['date'].min().strftime('%d/%m/%Y')} "
+          f"a {daily_reviews['date'].max().strftime('%d/%m/%Y')}")
     print(f"Total de dias com reviews: {len(daily_reviews)}")
     print(f"Média diária de reviews: {daily_reviews['count'].mean():.1f}")
-    print(f"Dia com mais reviews: {daily_reviews.loc[daily_reviews['count'].idxmax(), 'date']} ({daily_reviews['count'].max()} reviews)")
-    print(f"Dia com menos reviews: {daily_reviews.loc[daily_reviews['count'].idxmin(), 'date']} ({daily_reviews['count'].min()} reviews)")
+    print(f"Dia com mais reviews: {daily_reviews.loc[daily_reviews['count'].idxmax(), 'date']} "
+          f"({daily_reviews['count'].max()} reviews)")
+    print(f"Dia com menos reviews: {daily_reviews.loc[daily_reviews['count'].idxmin(), 'date']} "
+          f"({daily_reviews['count'].min()} reviews)")
+    
+    return {
+        'dias_com_reviews': len(daily_reviews),
+        'media_diaria': round(float(daily_reviews['count'].mean()), 2),
+        'dia_pico': str(daily_reviews.loc[daily_reviews['count'].idxmax(), 'date']),
+        'reviews_no_dia_pico': int(daily_reviews['count'].max()),
+        'nota_media_por_mes_do_ano': {int(row.month): round(float(row.avg_score), 4)
+                                      for row in monthly_avg.itertuples()},
+    }
 
 def analise_comentarios(df_reviews):
     """Análise dos comentários"""
@@ -224,27 +278,27 @@ def analise_comentarios(df_reviews):
     ax4.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.show()
+    _mostrar(fig)
+    
+    return {
+        'reviews_com_comentario': int(df_reviews['has_comment'].sum()),
+        'proporcao_com_comentario': round(float(df_reviews['has_comment'].mean()), 4),
+        'media_caracteres': round(float(df_with_comments['comment_length'].mean()), 2),
+        'media_palavras': round(float(df_with_comments['word_count'].mean()), 2),
+    }
 
-def nuvem_palavras(df_reviews):
+def frequencia_termos(df_reviews):
+    """Matriz de termos dos comentários (tokenizados uma única vez, com acentos)"""
+    return TermFrequencies.from_frame(df_reviews[df_reviews['has_comment']])
+
+def nuvem_palavras(df_reviews, termos=None):
     """Cria nuvem de palavras dos comentários"""
     print("\n=== NUVEM DE PALAVRAS ===")
     
-    def clean_text(text):
-        """Limpa o texto para a nuvem de palavras"""
-        if pd.isna(text) or text == '':
-            return ''
-        # Converter para minúsculas e remover caracteres especiais
-        text = str(text).lower()
-        text = re.sub(r'[^a-z\s]', '', text)
-        return text
-    
-    df_with_comments = df_reviews[df_reviews['has_comment']]
-    
-    # Preparar texto para nuvem de palavras
-    all_comments = ' '.join(df_with_comments['review_comment_message'].apply(clean_text))
+    if termos is None:
+        termos = frequencia_termos(df_reviews)
     
-    # Criar nuvem de palavras
+    # Criar nuvem de palavras a partir das frequências já calculadas
     wordcloud = WordCloud(
         width=800, 
         height=400, 
@@ -252,75 +306,60 @@ def nuvem_palavras(df_reviews):
         max_words=100,
         colormap='viridis',
         random_state=42
-    ).generate(all_comments)
+    ).generate_from_frequencies(termos.frequencies(max_words=100))
     
-    plt.figure(figsize=(16, 8))
+    fig = plt.figure(figsize=(16, 8))
     plt.imshow(wordcloud, interpolation='bilinear')
     plt.axis('off')
     plt.title('Nuvem de Palavras dos Comentários dos Reviews', fontsize=16, fontweight='bold', pad=20)
     plt.tight_layout()
-    plt.show()
+    _mostrar(fig)
     
     # Análise das palavras mais frequentes
-    def extract_words(text):
-        """Extrai palavras do texto"""
-        if pd.isna(text) or text == '':
-            return []
-        words = re.findall(r'\b[a-z]{3,}\b', str(text).lower())
-        # Remover palavras comuns em português
-        stop_words = {'que', 'com', 'para', 'uma', 'por', 'mais', 'como', 'mas', 'foi', 'ele', 'tem', 'à', 'seu', 'sua', 'ou', 'ser', 'quando', 'muito', 'há', 'nos', 'já', 'está', 'eu', 'também', 'só', 'pelo', 'pela', 'até', 'isso', 'ela', 'entre', 'era', 'depois', 'sem', 'mesmo', 'aos', 'ter', 'seus', 'suas', 'minha', 'têm', 'naquele', 'essas', 'esses', 'pelos', 'elas', 'estava', 'seja', 'qual', 'nossa', 'nossos', 'nossa', 'nossas', 'ou', 'onde', 'meu', 'minhas', 'numa', 'eles', 'estão', 'você', 'tinha', 'foram', 'essa', 'vocês', 'já', 'ou', 'um', 'após', 'até', 'sem', 'sob', 'sobre', 'entre', 'contra', 'desde', 'durante', 'para', 'perante', 'segundo', 'conforme', 'consoante', 'mediante', 'salvo', 'tirante', 'visto'}
-        return [word for word in words if word not in stop_words]
-    
-    all_words = []
-    for comment in df_with_comments['review_comment_message']:
-        all_words.extend(extract_words(comment))
-    
-    word_freq = Counter(all_words)
-    most_common_words = word_freq.most_common(20)
-    
     print("PALAVRAS MAIS FREQUENTES NOS COMENTÁRIOS:")
-    for word, count in most_common_words:
+    for word, count in termos.top_terms(20, ngram=1):
         print(f"{word}: {count} vezes")
+    
+    print("\nEXPRESSÕES (BIGRAMAS) MAIS FREQUENTES:")
+    for term, count in termos.top_terms(10, ngram=2):
+        print(f"{term}: {count} vezes")
+    
+    return {
+        'top_palavras': termos.top_terms(20, ngram=1),
+        'top_bigramas': termos.top_terms(10, ngram=2),
+    }
 
-def analise_por_nota(df_reviews):
+def analise_por_nota(df_reviews, termos=None):
     """Análise detalhada por nota"""
     print("\n=== ANÁLISE POR NOTA ===")
     
-    def clean_text(text):
-        if pd.isna(text) or text == '':
-            return ''
-        text = str(text).lower()
-        text = re.sub(r'[^a-z\s]', '', text)
-        return text
+    if termos is None:
+        termos = frequencia_termos(df_reviews)
     
     # Análise detalhada por nota
     fig, axes = plt.subplots(2, 3, figsize=(18, 12))
     axes = axes.ravel()
     
+    top_por_nota = {}
     for i, score in enumerate([1, 2, 3, 4, 5]):
-        score_data = df_reviews[df_reviews['review_score'] == score]
-        score_comments = score_data[score_data['has_comment']]
-        
-        if len(score_comments) > 0:
-            # Nuvem de palavras para cada nota
-            text = ' '.join(score_comments['review_comment_message'].apply(clean_text))
-            if text.strip():
-                wordcloud = WordCloud(
-                    width=400, height=300,
-                    background_color='white',
-                    max_words=50,
-                    colormap='viridis',
-                    random_state=42
-                ).generate(text)
-                
-                axes[i].imshow(wordcloud, interpolation='bilinear')
-                axes[i].set_title(f'Nota {score} - Nuvem de Palavras', fontweight='bold')
-                axes[i].axis('off')
-            else:
-                axes[i].text(0.5, 0.5, f'Sem comentários\npara nota {score}', 
-                            ha='center', va='center', transform=axes[i].transAxes, fontsize=14)
-                axes[i].set_title(f'Nota {score}', fontweight='bold')
-                axes[i].axis('off')
+        # Nuvem de palavras para cada nota (contagens da faceta, sem reprocessar o texto)
+        frequencias = termos.frequencies(max_words=50, facet='score', value=score)
+        if frequencias:
+            wordcloud = WordCloud(
+                width=400, height=300,
+                background_color='white',
+                max_words=50,
+                colormap='viridis',
+                random_state=42
+            ).generate_from_frequencies(frequencias)
+            
+            axes[i].imshow(wordcloud, interpolation='bilinear')
+            axes[i].set_title(f'Nota {score} - Nuvem de Palavras', fontweight='bold')
+            axes[i].axis('off')
+            
+            top = ', '.join(term for term, _ in termos.top_terms(5, facet='score', value=score))
+            print(f"Nota {score}: {top}")
+            top_por_nota[score] = termos.top_terms(10, facet='score', value=score)
         else:
             axes[i].text(0.5, 0.5, f'Sem comentários\npara nota {score}', 
                         ha='center', va='center', transform=axes[i].transAxes, fontsize=14)
@@ -331,22 +370,153 @@ def analise_por_nota(df_reviews):
     axes[5].remove()
     
     plt.tight_layout()
-    plt.show()
+    _mostrar(fig)
+    
+    return {'top_termos_por_nota': top_por_nota}
+
+# Figuras do relatório: (nome, função, colunas de entrada, entrada pré-calculada: None, 'termos' ou 'temporal')
+# A figura temporal usa os totais diários do TemporalAggregates em vez das colunas do DataFrame
+FIGURAS = [
+    ('distribuicao_notas', analise_distribuicao_notas, ['review_score'], None),
+    ('temporal', analise_temporal, None, 'temporal'),
+    ('comentarios', analise_comentarios, ['review_score', 'comment_length', 'word_count', 'has_comment'], None),
+    ('nuvem_palavras', nuvem_palavras, ['review_comment_message', 'review_score', 'has_comment'], 'termos'),
+    ('analise_por_nota', analise_por_nota, ['review_comment_message', 'review_score', 'has_comment'], 'termos'),
+]
+# Muda quando o código das figuras muda (força a regeneração de todas)
+VERSAO_FIGURAS = 3
+
+def _hash_entrada(df_parte):
+    """Hash do conteúdo das colunas usadas por uma figura"""
+    digest = hashlib.sha1(f'{VERSAO_FIGURAS}:{list(df_parte.columns)}'.encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df_parte, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _entrada_temporal(temporal):
+    """Totais diários (de onde saem semanas, meses e meses do ano): entrada da figura temporal"""
+    daily = temporal.frame('daily')
+    return pd.DataFrame({'date': daily.index.to_timestamp(), 'count': daily['count'].to_numpy(),
+                         'score_sum': temporal.sums['daily'].to_numpy()})
+
+def _iniciar_worker():
+    plt.switch_backend('Agg')
 
-def main():
+def _renderizar(nome, df_parte, extra, diretorio, formatos):
+    """Executa uma análise num processo worker, gravando as figuras em vez de exibi-las"""
+    global _SAIDA
+    funcao = {figura[0]: figura[1] for figura in FIGURAS}[nome]
+    arquivos = []
+    _SAIDA = (diretorio, nome, formatos, arquivos)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            metricas = funcao(df_parte, extra) if extra is not None else funcao(df_parte)
+    finally:
+        _SAIDA = None
+    return arquivos, metricas
+
+def gerar_relatorio(df_reviews, diretorio='relatorio_eda', formatos=('png', 'svg'), workers=None, temporal=None):
+    """
+    Modo headless: renderiza as figuras em paralelo (backend Agg) e grava
+    imagens + metricas.json em `diretorio`. Figuras cujas colunas de entrada
+    não mudaram desde o último relatório são reaproveitadas.
+    `temporal`: TemporalAggregates já calculado (ex.: agregados_temporais());
+    com df_reviews=None só a figura temporal é gerada.
+    """
+    if temporal is None:
+        temporal = TemporalAggregates.from_frame(df_reviews)
+    figuras_relatorio = [figura for figura in FIGURAS if df_reviews is not None or figura[3] == 'temporal']
+    plt.switch_backend('Agg')
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    caminho_metricas = diretorio / 'metricas.json'
+    try:
+        with open(caminho_metricas, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)['figuras']
+    except (OSError, ValueError, KeyError):
+        anterior = {}
+    
+    figuras, pendentes = {}, []
+    for nome, _, colunas, extra in figuras_relatorio:
+        df_parte = _entrada_temporal(temporal) if extra == 'temporal' else df_reviews[colunas]
+        hash_entrada = _hash_entrada(df_parte)
+        salvo = anterior.get(nome, {})
+        if (salvo.get('hash') == hash_entrada and set(salvo.get('formatos', [])) >= set(formatos)
+                and all((diretorio / arquivo).exists() for arquivo in salvo.get('arquivos', []))):
+            figuras[nome] = salvo
+            print(f"⏭️  {nome}: entrada inalterada")
+        else:
+            pendentes.append((nome, df_parte, extra, hash_entrada))
+    
+    # Matriz de termos calculada uma vez e enviada às figuras que a usam
+    entradas = {'temporal': temporal}
+    if any(extra == 'termos' for _, _, extra, _ in pendentes):
+        entradas['termos'] = frequencia_termos(df_reviews)
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker) as executor:
+        futuros = {
+            executor.submit(_renderizar, nome, df_parte, entradas.get(extra),
+                            str(diretorio), tuple(formatos)): (nome, hash_entrada)
+            for nome, df_parte, extra, hash_entrada in pendentes
+        }
+        for futuro in as_completed(futuros):
+            nome, hash_entrada = futuros[futuro]
+            arquivos, metricas = futuro.result()
+            figuras[nome] = {'hash': hash_entrada, 'formatos': list(formatos),
+                             'arquivos': arquivos, 'metricas': metricas}
+            print(f"🖼️  {nome}: {', '.join(arquivos)}")
+    
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'total_reviews': len(df_reviews) if df_reviews is not None else int(temporal.counts['daily'].sum()),
+        'figuras': {nome: figuras[nome] for nome, *_ in figuras_relatorio},
+    }
+    tmp_path = caminho_metricas.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, caminho_metricas)
+    return relatorio
+
+def main(argv=None):
     """Função principal que executa todas as análises"""
+    parser = argparse.ArgumentParser(description="Análise exploratória dos reviews Olist")
+    parser.add_argument("--csv", nargs='+', default=['../app/data/olist_order_reviews_dataset.csv'],
+                        help="Um ou mais CSVs de reviews (ex.: dumps de anos ou marketplaces diferentes)")
+    parser.add_argument("--somente-temporal", action='store_true',
+                        help="Só a análise temporal, lendo os CSVs em blocos (não carrega o dataset em memória)")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Linhas por bloco na agregação temporal")
+    parser.add_argument("--relatorio", metavar="DIR",
+                        help="Modo headless: grava figuras e métricas em DIR em vez de exibi-las")
+    parser.add_argument("--formatos", nargs='+', default=['png', 'svg'], choices=['png', 'svg', 'pdf'])
+    parser.add_argument("--workers", type=int, help="Processos de renderização (padrão: núcleos da CPU)")
+    args = parser.parse_args(argv)
+    
     print("🚀 INICIANDO ANÁLISE EXPLORATÓRIA DOS REVIEWS OLIST")
     print("=" * 60)
     
-    # Carregar dados
-    df_reviews = carregar_dados()
+    if args.somente_temporal:
+        # Agregados temporais em blocos (um parcial por CSV, combinados com merge), sem carregar o dataset
+        df_reviews, temporal = None, agregados_temporais(args.csv, args.chunk_size)
+    else:
+        # Carregar dados; os agregados temporais saem do DataFrame já em memória (uma única leitura)
+        df_reviews = carregar_dados(args.csv)
+        temporal = TemporalAggregates.from_frame(df_reviews)
+    
+    if args.relatorio:
+        gerar_relatorio(df_reviews, args.relatorio, args.formatos, args.workers, temporal)
+        print(f"\n✅ Relatório gravado em {args.relatorio}")
+        return
+    
+    if args.somente_temporal:
+        analise_temporal(None, temporal)
+        return
     
     # Executar análises
     analise_distribuicao_notas(df_reviews)
-    analise_temporal(df_reviews)
+    analise_temporal(df_reviews, temporal)
     analise_comentarios(df_reviews)
-    nuvem_palavras(df_reviews)
-    analise_por_nota(df_reviews)
+    termos = frequencia_termos(df_reviews)
+    nuvem_palavras(df_reviews, termos)
+    analise_por_nota(df_reviews, termos)
     
     print("\n" + "=" * 60)
     print("✅ ANÁLISE CONCLUÍDA!")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API FastAPI de análise de sentimentos dos reviews Olist
+/analyze_sentiment serve os documentos pré-calculados por insights.py
+(busca pela chave, sem retrieval, classificação ou sumarização por requisição)
+/consultar_review faz a busca semântica; requisições simultâneas são agrupadas
+(micro_batcher) numa única codificação e numa única busca multi-consulta
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+
+from insights import INSIGHTS_DB, InsightStore
+from micro_batcher import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, MicroBatcher
+
+API_HOST = os.getenv('API_HOST', '0.0.0.0')
+API_PORT = int(os.getenv('API_PORT', '8000'))
+SEARCH_INDEX = os.getenv('SEARCH_INDEX', 'indice_reviews.faiss')
+DATASET_CSV = os.getenv('DATASET_CSV', 'data/olist_order_reviews_dataset.csv')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+# SEARCH_BATCHING=0 desliga o micro-batching (uma codificação por requisição)
+SEARCH_BATCHING = os.getenv('SEARCH_BATCHING', '1') != '0'
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', str(DEFAULT_MAX_BATCH_SIZE)))
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', str(DEFAULT_MAX_WAIT_MS)))
+# Limite do top_k: o lote busca com o maior top_k, então um valor alto encareceria todas as requisições
+MAX_TOP_K = int(os.getenv('MAX_TOP_K', '100'))
+
+insight_store = None
+searcher = None
+search_batcher = None
+
+
+class AnalyzeSentimentRequest(BaseModel):
+    product_id: str
+
+
+class ConsultarReviewRequest(BaseModel):
+    query: str
+    top_k: int = Field(5, ge=1, le=MAX_TOP_K)
+    similarity_threshold: Optional[float] = None
+
+
+def load_searcher():
+    """Busca semântica (índice + metadados + encoder), ou None se o índice não existe"""
+    from embedding_store import sentence_transformer_encoder
+    from query_cache import QueryCache
+    from search import SemanticSearcher
+
+    try:
+        return SemanticSearcher.load(sentence_transformer_encoder(EMBEDDING_MODEL), SEARCH_INDEX, DATASET_CSV,
+                                     model_name=EMBEDDING_MODEL, cache=QueryCache())
+    except (OSError, RuntimeError, ValueError, ImportError) as e:
+        print(f"⚠️ Busca semântica indisponível: {e}")
+        return None
+
+
+def load_insight_store():
+    """Store de insights, ou None se o SQLite não pode ser aberto"""
+    try:
+        return InsightStore(os.getenv('INSIGHTS_DB', INSIGHTS_DB))
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Insights indisponíveis: {e}")
+        return None
+
+
+def load_resources():
+    """Abre o store de insights e carrega a busca semântica uma única vez"""
+    global insight_store, searcher, search_batcher
+    insight_store = load_insight_store()
+    searcher = load_searcher()
+    search_batcher = MicroBatcher(consultar_lote, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+
+
+async def close_resources():
+    """Encerra o micro-batcher e fecha o store de insights"""
+    global insight_store, search_batcher
+    if search_batcher is not None:
+        await search_batcher.close()
+        search_batcher = None
+    if insight_store is not None:
+        insight_store.close()
+        insight_store = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    load_resources()
+    yield
+    await close_resources()
+
+
+app = FastAPI(title="Olist Reviews - API de Análise de Sentimentos", lifespan=lifespan)
+
+
+def consultar_lote(requests):
+    """Uma codificação e uma busca para o lote inteiro; o resultado de cada requisição na mesma ordem"""
+    # Busca com o maior top_k do lote; cada requisição fica com os seus top_k primeiros
+    top_k = max(request.top_k for request in requests)
+    hits = searcher.search_ids([request.query for request in requests], top_k)
+
+    selected = []
+    for request, (similarities, ids) in zip(requests, hits):
+        similarities, ids = similarities[:request.top_k], ids[:request.top_k]
+        keep = ids >= 0
+        if request.similarity_threshold is not None:
+            keep &= similarities >= request.similarity_threshold
+        selected.append((ids[keep], similarities[keep]))
+
+    # Uma única conversão para JSON com as linhas de todas as requisições
+    frame = searcher.metadata.iloc[np.concatenate([ids for ids, _ in selected])]
+    frame = frame.assign(similarity=np.concatenate([similarities for _, similarities in selected]))
+    records = json.loads(frame.to_json(orient='records', date_format='iso', force_ascii=False))
+    bounds = np.cumsum([0] + [len(ids) for ids, _ in selected])
+    return [records[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+@app.get("/")
+def root():
+    return {"name": "Olist Reviews API", "docs": "/docs"}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "insights_loaded": insight_store is not None, "search_loaded": searcher is not None}
+
+
+@app.get("/stats")
+def stats():
+    return {"products_with_insights": len(insight_store) if insight_store is not None else 0,
+            "search_batching": SEARCH_BATCHING,
+            "search_batches": search_batcher.stats() if search_batcher is not None else None}
+
+
+@app.post("/analyze_sentiment")
+def analyze_sentiment(request: AnalyzeSentimentRequest):
+    """Documento de insights do produto, materializado offline"""
+    if insight_store is None:
+        raise HTTPException(status_code=503, detail="Store de insights não carregado")
+    document = insight_store.get(request.product_id.strip())
+    if document is None:
+        raise HTTPException(status_code=404,
+                            detail=f"Nenhum insight materializado para o produto: {request.product_id}")
+    return document
+
+
+@app.post("/consultar_review")
+async def consultar_review(request: ConsultarReviewRequest):
+    """Reviews mais parecidos com o texto (busca semântica)"""
+    if searcher is None:
+        raise HTTPException(status_code=503, detail="Índice de busca não carregado")
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Texto da consulta vazio")
+    if SEARCH_BATCHING:
+        results = await search_batcher.submit(request)
+    else:
+        results = (await run_in_threadpool(consultar_lote, [request]))[0]
+    return {"query": request.query, "results": results}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
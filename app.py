@@ -3,11 +3,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import warnings
 
+from dataset import load_reviews
+
 warnings.filterwarnings("ignore")
 
 # Carrega o dataset
 try:
-    df = pd.read_csv('app/data/olist_order_reviews_dataset.csv')
+    df = load_reviews('app/data/olist_order_reviews_dataset.csv')
     print("Dataset carregado com sucesso!")
 except FileNotFoundError:
     print("Erro: Dataset não encontrado.")
@@ -1,10 +1,18 @@
 import gradio as gr
 import pandas as pd
-import matplotlib.pyplot as plt
 import warnings
 import os
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional
 from dotenv import load_dotenv
 
+from aggregates import ReviewAggregates
+from dataset import add_derived_columns, load_reviews
+from plot_cache import DEFAULT_MAX_POINTS, PlotCache, lttb
+from product_index import ProductIndex
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
@@ -13,169 +21,230 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="seaborn")
 # ------------------------------------------------------------------
 # 1) Load CSV data once
 
-# Adaptação: Carrega o dataset de reviews do Olist
-try:
-    df = pd.read_csv('app/data/olist_order_reviews_dataset.csv')
-    print("Dataset carregado com sucesso!")
-    print(f"Número de linhas: {len(df)}")
-    print("Colunas:", df.columns.tolist())
-except FileNotFoundError:
-    print("Erro: O arquivo 'olist_order_reviews_dataset.csv' não foi encontrado.")
-    print("Por favor, verifique se o arquivo está no diretório correto.")
-    df = pd.DataFrame()  # Cria um DataFrame vazio para evitar erros posteriores
+DATASET_CSV = os.getenv('DATASET_CSV', 'app/data/olist_order_reviews_dataset.csv')
+
+# Limites de concorrência da fila do Gradio por grupo de handlers:
+# consultas baratas (estatísticas, busca) não esperam atrás dos gráficos
+LOOKUP_CONCURRENCY = int(os.getenv('LOOKUP_CONCURRENCY', '32'))
+RENDER_CONCURRENCY = int(os.getenv('RENDER_CONCURRENCY', '2'))
+QUEUE_MAX_SIZE = int(os.getenv('QUEUE_MAX_SIZE', '256'))
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """
+    Estado servido aos handlers: DataFrame, agregados e índice de produtos da
+    mesma versão do dataset. Nunca é alterado; uma recarga cria outro snapshot
+    e troca a referência de uma vez, então cada requisição vê um estado coerente.
+    """
+    df: pd.DataFrame
+    aggregates: Optional[ReviewAggregates]
+    product_index: Optional[ProductIndex]
+    version: Optional[str]
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+
+def load_snapshot(csv_path=DATASET_CSV):
+    """Carrega o dataset e constrói agregados e índice (fora do caminho das requisições)"""
+    # Adaptação: Carrega o dataset de reviews do Olist (via cache colunar)
+    try:
+        df = load_reviews(csv_path)
+        # Colunas derivadas (sentimento, mês) calculadas uma única vez
+        add_derived_columns(df)
+        print("Dataset carregado com sucesso!")
+        print(f"Número de linhas: {len(df)}")
+        print("Colunas:", df.columns.tolist())
+    except FileNotFoundError:
+        print("Erro: O arquivo 'olist_order_reviews_dataset.csv' não foi encontrado.")
+        print("Por favor, verifique se o arquivo está no diretório correto.")
+        return DatasetSnapshot(pd.DataFrame(), None, None, None)
+
+    # Agregados materializados e índice product_id -> reviews, uma vez por versão
+    return DatasetSnapshot(df, ReviewAggregates.from_frame(df), ProductIndex.from_frame(df),
+                           df.attrs.get('dataset_version'))
+
+
+_snapshot = load_snapshot()
+_reload_lock = threading.Lock()
+
+def current_snapshot():
+    """Snapshot atual (cada handler lê uma vez e usa só ele até o fim)"""
+    return _snapshot
+
+def reload_dataset():
+    """Recarrega o CSV num snapshot novo e o publica atomicamente"""
+    global _snapshot
+    with _reload_lock:
+        try:
+            snapshot = load_snapshot()
+        except Exception as e:
+            return f"❌ Erro ao recarregar o dataset ({e}); mantendo a versão atual."
+        # Recarga com falha não substitui os dados que estão sendo servidos
+        if snapshot.empty:
+            return "❌ Dataset não carregado. Verifique se o arquivo CSV existe; mantendo a versão atual."
+        if snapshot.version is not None and snapshot.version == _snapshot.version:
+            return f"ℹ️ Dataset inalterado ({len(snapshot.df):,} reviews)"
+        _snapshot = snapshot
+    threading.Thread(target=warm_plot_cache, daemon=True).start()
+    return f"✅ Dataset recarregado: {len(snapshot.df):,} reviews"
 
 # ------------------------------------------------------------------
 # 2) Funções de análise de dados
 
-def get_basic_stats():
+def get_basic_stats(snapshot=None):
     """Estatísticas básicas do dataset"""
-    if df.empty:
+    snapshot = snapshot or current_snapshot()
+    if snapshot.empty:
         return "Dataset não carregado"
     
-    stats = {
-        "Total de Reviews": len(df),
-        "Reviews com Comentário": df['review_comment_message'].notna().sum(),
-        "Reviews sem Comentário": df['review_comment_message'].isna().sum(),
-        "Média de Avaliação": df['review_score'].mean(),
-        "Mediana de Avaliação": df['review_score'].median(),
-        "Desvio Padrão": df['review_score'].std()
-    }
-    
-    return stats
+    return snapshot.aggregates.basic_stats()
 
-def get_score_distribution():
+def get_score_distribution(snapshot=None):
     """Distribuição das avaliações"""
-    if df.empty:
+    snapshot = snapshot or current_snapshot()
+    if snapshot.empty:
         return None
     
-    score_counts = df['review_score'].value_counts().sort_index()
-    return score_counts
+    return snapshot.aggregates.score_distribution()
 
-def get_sentiment_analysis():
+def get_sentiment_analysis(snapshot=None):
     """Análise básica de sentimentos baseada na pontuação"""
-    if df.empty:
+    snapshot = snapshot or current_snapshot()
+    if snapshot.empty:
         return None
     
-    # Classificação simples baseada na pontuação
-    def classify_sentiment(score):
-        if score >= 4:
-            return 'Positivo'
-        elif score <= 2:
-            return 'Negativo'
-        else:
-            return 'Neutro'
-    
-    df_copy = df.copy()
-    df_copy['sentiment'] = df_copy['review_score'].apply(classify_sentiment)
-    sentiment_counts = df_copy['sentiment'].value_counts()
-    
-    return sentiment_counts
+    # Classificação pela pontuação (coluna 'sentiment' já agregada na carga)
+    return snapshot.aggregates.sentiment_distribution()
 
 # ------------------------------------------------------------------
 # 3) Funções para criação de gráficos
+# Desenhados com a API OO do Matplotlib e servidos do cache de PNGs
+# (chave: gráfico + versão do dataset + parâmetros)
 
-def create_score_distribution_plot():
-    """Cria gráfico de distribuição das avaliações"""
-    score_counts = get_score_distribution()
-    if score_counts is None:
-        return None
-    
-    plt.figure(figsize=(10, 6))
+plot_cache = PlotCache()
+
+def _draw_score_distribution(fig, aggregates):
+    score_counts = aggregates.score_distribution()
+    ax = fig.add_subplot()
     x_values = score_counts.index.tolist()  # Converte para lista
     y_values = score_counts.values.tolist()  # Converte para lista
-    bars = plt.bar(x_values, y_values, color='skyblue', alpha=0.7)
+    bars = ax.bar(x_values, y_values, color='skyblue', alpha=0.7)
     
     # Adiciona valores nas barras
     for bar in bars:
         height = float(bar.get_height())
-        plt.text(bar.get_x() + bar.get_width()/2., height + 0.01,
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.01,
                 f'{int(height):,}', ha='center', va='bottom')
     
-    plt.title('Distribuição das Avaliações dos Produtos', fontsize=14, fontweight='bold')
-    plt.xlabel('Avaliação (1-5)', fontsize=12)
-    plt.ylabel('Número de Reviews', fontsize=12)
-    plt.grid(axis='y', alpha=0.3)
-    plt.xticks(range(1, 6))
-    plt.tight_layout()
-    
-    return plt.gcf()
+    ax.set_title('Distribuição das Avaliações dos Produtos', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Avaliação (1-5)', fontsize=12)
+    ax.set_ylabel('Número de Reviews', fontsize=12)
+    ax.grid(axis='y', alpha=0.3)
+    ax.set_xticks(range(1, 6))
 
-def create_sentiment_pie_chart():
-    """Cria gráfico de pizza para sentimentos"""
-    sentiment_counts = get_sentiment_analysis()
-    if sentiment_counts is None:
-        return None
-    
-    plt.figure(figsize=(8, 8))
+def _draw_sentiment_pie(fig, aggregates):
+    sentiment_counts = aggregates.sentiment_distribution()
+    ax = fig.add_subplot()
     colors = ['#2E8B57', '#FF6B6B', '#FFD93D']  # Verde, Vermelho, Amarelo
     
     labels = [str(label) for label in sentiment_counts.index]
     values = sentiment_counts.values.tolist()  # Converte para lista
-    plt.pie(values, labels=labels, 
-            autopct='%1.1f%%', colors=colors, startangle=90)
-    plt.title('Distribuição de Sentimentos', fontsize=14, fontweight='bold')
-    plt.tight_layout()
+    ax.pie(values, labels=labels, 
+           autopct='%1.1f%%', colors=colors, startangle=90)
+    ax.set_title('Distribuição de Sentimentos', fontsize=14, fontweight='bold')
+
+def _draw_trend(fig, aggregates, granularity='monthly', max_points=DEFAULT_MAX_POINTS):
+    if granularity == 'daily':
+        data = aggregates.daily_trend()
+        title = 'Tendência Diária de Reviews'
+    else:
+        data = aggregates.monthly_trend()
+        title = 'Tendência Mensal de Reviews'
+    
+    # Séries longas reduzidas com LTTB (mantém picos e vales)
+    positions = lttb(range(len(data)), data['Total_Reviews'], max_points)
+    data = data.iloc[positions]
+    
+    # Gráfico de linha para total de reviews
+    ax1 = fig.add_subplot()
+    ax2 = ax1.twinx()
     
-    return plt.gcf()
+    marker = 'o' if len(data) <= 60 else None
+    line1 = ax1.plot(positions, data['Total_Reviews'], 
+                     color='blue', marker=marker, label='Total de Reviews')
+    line2 = ax2.plot(positions, data['Avaliação_Média'], 
+                     color='red', marker='s' if marker else None, label='Avaliação Média')
+    
+    ax1.set_xlabel('Dia' if granularity == 'daily' else 'Mês', fontsize=12)
+    ax1.set_ylabel('Total de Reviews', color='blue', fontsize=12)
+    ax2.set_ylabel('Avaliação Média', color='red', fontsize=12)
+    
+    ax1.set_title(title, fontsize=14, fontweight='bold')
+    step = max(1, len(data) // 30)
+    ax1.set_xticks(positions[::step])
+    ax1.set_xticklabels([str(x) for x in data.index[::step]], rotation=45)
+    
+    # Legenda
+    lines = line1 + line2
+    labels = [str(l.get_label()) for l in lines]
+    ax1.legend(lines, labels, loc='upper left')
+    
+    ax1.grid(alpha=0.3)
+
+def create_score_distribution_plot():
+    """Cria gráfico de distribuição das avaliações (caminho do PNG)"""
+    snapshot = current_snapshot()
+    if snapshot.empty:
+        return None
+    return plot_cache.get('score_distribution', snapshot.version,
+                          partial(_draw_score_distribution, aggregates=snapshot.aggregates), figsize=(10, 6))
 
-def create_monthly_trend():
-    """Cria gráfico de tendência mensal"""
-    if df.empty:
+def create_sentiment_pie_chart():
+    """Cria gráfico de pizza para sentimentos (caminho do PNG)"""
+    snapshot = current_snapshot()
+    if snapshot.empty:
+        return None
+    return plot_cache.get('sentiment_pie', snapshot.version,
+                          partial(_draw_sentiment_pie, aggregates=snapshot.aggregates), figsize=(8, 8))
+
+def create_monthly_trend(granularity='monthly'):
+    """Cria gráfico de tendência mensal (ou diária) (caminho do PNG)"""
+    snapshot = current_snapshot()
+    if snapshot.empty:
         return None
     
     try:
-        # Converte review_creation_date para datetime
-        df_copy = df.copy()
-        df_copy['review_creation_date'] = pd.to_datetime(df_copy['review_creation_date'])
-        
-        # Agrupa por mês
-        monthly_data = df_copy.groupby(df_copy['review_creation_date'].dt.to_period('M')).agg({
-            'review_score': ['count', 'mean']
-        }).round(2)
-        
-        monthly_data.columns = ['Total_Reviews', 'Avaliação_Média']
-        
-        plt.figure(figsize=(12, 6))
-        
-        # Gráfico de linha para total de reviews
-        ax1 = plt.gca()
-        ax2 = ax1.twinx()
-        
-        line1 = ax1.plot(range(len(monthly_data)), monthly_data['Total_Reviews'], 
-                         color='blue', marker='o', label='Total de Reviews')
-        line2 = ax2.plot(range(len(monthly_data)), monthly_data['Avaliação_Média'], 
-                         color='red', marker='s', label='Avaliação Média')
-        
-        ax1.set_xlabel('Mês', fontsize=12)
-        ax1.set_ylabel('Total de Reviews', color='blue', fontsize=12)
-        ax2.set_ylabel('Avaliação Média', color='red', fontsize=12)
-        
-        plt.title('Tendência Mensal de Reviews', fontsize=14, fontweight='bold')
-        plt.xticks(range(len(monthly_data)), [str(x) for x in monthly_data.index], rotation=45)
-        
-        # Legenda
-        lines = line1 + line2
-        labels = [str(l.get_label()) for l in lines]
-        ax1.legend(lines, labels, loc='upper left')
-        
-        plt.grid(alpha=0.3)
-        plt.tight_layout()
-        
-        return plt.gcf()
+        return plot_cache.get('trend', snapshot.version, partial(_draw_trend, aggregates=snapshot.aggregates),
+                              params={'granularity': granularity, 'max_points': DEFAULT_MAX_POINTS},
+                              figsize=(12, 6))
     except Exception as e:
         print(f"Erro ao criar gráfico de tendência: {e}")
         return None
 
+def create_daily_trend():
+    """Cria gráfico de tendência diária (caminho do PNG)"""
+    return create_monthly_trend('daily')
+
+def warm_plot_cache():
+    """Renderiza os gráficos do snapshot atual antes do primeiro clique"""
+    for create_plot in (create_score_distribution_plot, create_sentiment_pie_chart,
+                        create_monthly_trend, create_daily_trend):
+        create_plot()
+
 # ------------------------------------------------------------------
 # 4) Interface Gradio
 
 def analyze_data():
     """Função principal de análise"""
-    if df.empty:
+    snapshot = current_snapshot()
+    if snapshot.empty:
         return "❌ Dataset não carregado. Verifique se o arquivo CSV existe."
     
     # Estatísticas básicas
-    stats = get_basic_stats()
+    stats = get_basic_stats(snapshot)
     if isinstance(stats, str):
         return stats
     
@@ -190,36 +259,29 @@ def analyze_data():
 
 def search_reviews(product_id):
     """Busca reviews por ID do produto"""
-    if df.empty:
+    snapshot = current_snapshot()
+    if snapshot.empty:
         return "❌ Dataset não carregado."
     
     if not product_id:
         return "⚠️ Por favor, insira um ID de produto."
     
-    # Busca reviews do produto
-    product_reviews = df[df['product_id'] == product_id]
+    # Busca reviews do produto no índice pré-construído
+    product = snapshot.product_index.lookup(product_id.strip())
     
-    if product_reviews.empty:
+    if product is None:
         return f"❌ Nenhum review encontrado para o produto: {product_id}"
     
-    # Estatísticas do produto
-    avg_score = product_reviews['review_score'].mean()
-    total_reviews = len(product_reviews)
-    reviews_with_comments = product_reviews['review_comment_message'].notna().sum()
-    
     result = f"📦 **PRODUTO: {product_id}**\n\n"
-    result += f"**Avaliação Média:** {avg_score:.2f}/5\n"
-    result += f"**Total de Reviews:** {total_reviews}\n"
-    result += f"**Reviews com Comentário:** {reviews_with_comments}\n\n"
+    result += f"**Avaliação Média:** {product['avg_score']:.2f}/5\n"
+    result += f"**Total de Reviews:** {product['total_reviews']}\n"
+    result += f"**Reviews com Comentário:** {product['reviews_with_comments']}\n\n"
     
-    # Mostra alguns reviews recentes
-    recent_reviews = product_reviews.head(5)
+    # Mostra os reviews mais recentes (por review_creation_date)
     result += "📝 **REVIEWS RECENTES:**\n\n"
     
-    for idx, row in recent_reviews.iterrows():
-        score = row['review_score']
-        comment = row['review_comment_message'] if pd.notna(row['review_comment_message']) else "Sem comentário"
-        date = row['review_creation_date']
+    for score, date, comment in product['recent_reviews']:
+        comment = comment if comment is not None else "Sem comentário"
         
         result += f"**{score}⭐** - {date}\n"
         result += f"{comment[:100]}{'...' if len(comment) > 100 else ''}\n\n"
@@ -246,7 +308,10 @@ def create_interface():
                 
                 analyze_btn.click(
                     fn=analyze_data,
-                    outputs=stats_output
+                    outputs=stats_output,
+                    api_name="analyze_data",
+                    concurrency_limit=LOOKUP_CONCURRENCY,
+                    concurrency_id="lookup"
                 )
             
             # Tab 2: Gráficos
@@ -256,29 +321,47 @@ def create_interface():
                 with gr.Row():
                     with gr.Column():
                         dist_btn = gr.Button("📊 Distribuição de Avaliações")
-                        dist_plot = gr.Plot()
+                        dist_plot = gr.Image(type="filepath", show_label=False)
                     
                     with gr.Column():
                         sentiment_btn = gr.Button("😊 Análise de Sentimentos")
-                        sentiment_plot = gr.Plot()
+                        sentiment_plot = gr.Image(type="filepath", show_label=False)
                 
                 with gr.Row():
                     trend_btn = gr.Button("📈 Tendência Mensal")
-                    trend_plot = gr.Plot()
+                    daily_trend_btn = gr.Button("📅 Tendência Diária")
+                trend_plot = gr.Image(type="filepath", show_label=False)
                 
                 dist_btn.click(
                     fn=create_score_distribution_plot,
-                    outputs=dist_plot
+                    outputs=dist_plot,
+                    api_name="create_score_distribution_plot",
+                    concurrency_limit=RENDER_CONCURRENCY,
+                    concurrency_id="render"
                 )
                 
                 sentiment_btn.click(
                     fn=create_sentiment_pie_chart,
-                    outputs=sentiment_plot
+                    outputs=sentiment_plot,
+                    api_name="create_sentiment_pie_chart",
+                    concurrency_limit=RENDER_CONCURRENCY,
+                    concurrency_id="render"
                 )
                 
                 trend_btn.click(
                     fn=create_monthly_trend,
-                    outputs=trend_plot
+                    outputs=trend_plot,
+                    api_name="create_monthly_trend",
+                    concurrency_limit=RENDER_CONCURRENCY,
+                    concurrency_id="render"
+                )
+                
+                daily_trend_btn.click(
+                    fn=create_daily_trend,
+                    outputs=trend_plot,
+                    api_name="create_daily_trend",
+                    concurrency_limit=RENDER_CONCURRENCY,
+                    concurrency_id="render"
                 )
             
             # Tab 3: Busca de Produtos
@@ -298,7 +381,10 @@ def create_interface():
                 search_btn.click(
                     fn=search_reviews,
                     inputs=product_input,
-                    outputs=search_output
+                    outputs=search_output,
+                    api_name="search_reviews",
+                    concurrency_limit=LOOKUP_CONCURRENCY,
+                    concurrency_id="lookup"
                 )
             
             # Tab 4: Informações
@@ -322,7 +408,7 @@ def create_interface():
                 
                 ### 📊 Dataset
                 - **Arquivo**: olist_order_reviews_dataset.csv
-                - **Total de Reviews**: {len(df) if not df.empty else "N/A"}
+                - **Total de Reviews**: {len(current_snapshot().df) if not current_snapshot().empty else "N/A"}
                 - **Período**: 2016-2018
                 
                 ### 🚀 Funcionalidades
@@ -333,12 +419,26 @@ def create_interface():
                 """
                 
                 gr.Markdown(info_text)
+                
+                reload_btn = gr.Button("🔄 Recarregar Dataset")
+                reload_output = gr.Markdown()
+                
+                # Uma recarga por vez; as requisições seguem no snapshot anterior até a troca
+                reload_btn.click(
+                    fn=reload_dataset,
+                    outputs=reload_output,
+                    api_name="reload_dataset",
+                    concurrency_limit=1,
+                    concurrency_id="reload"
+                )
         
         # Footer
         gr.Markdown("---")
         gr.Markdown("### 🎯 Sistema Olist Reviews - Análise Inteligente de Avaliações")
         gr.Markdown("*Desenvolvido com Gradio e Python*")
     
+    # Fila com limite por grupo (concurrency_id) definido em cada evento
+    demo.queue(max_size=QUEUE_MAX_SIZE, default_concurrency_limit=LOOKUP_CONCURRENCY)
     return demo
 
 # ------------------------------------------------------------------
@@ -346,9 +446,10 @@ def create_interface():
 
 if __name__ == "__main__":
     print("🚀 Iniciando Olist Reviews Dashboard...")
-    print(f"📊 Dataset carregado: {len(df)} reviews")
+    print(f"📊 Dataset carregado: {len(current_snapshot().df)} reviews")
     
-    # Cria e executa a interface
+    # Cria e executa a interface (gráficos aquecidos em segundo plano)
+    threading.Thread(target=warm_plot_cache, daemon=True).start()
     demo = create_interface()
     demo.launch(
         server_name="127.0.0.1",
@@ -356,5 +457,7 @@ if __name__ == "__main__":
         share=False,
         show_error=True,
         quiet=False,
-        inbrowser=True  # Abre o navegador automaticamente
+        inbrowser=True,  # Abre o navegador automaticamente
+        # Threads suficientes para todos os grupos da fila rodarem ao mesmo tempo
+        max_threads=LOOKUP_CONCURRENCY + RENDER_CONCURRENCY + 1
     ) 
\ No newline at end of file
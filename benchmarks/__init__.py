@@ -0,0 +1,4 @@
+"""
+Benchmarks dos caminhos críticos do projeto
+Executar a partir da raiz do repositório, ex.: python -m benchmarks.bench_dashboard_stats
+"""
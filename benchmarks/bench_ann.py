@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recall@k vs. latência dos índices aproximados em relação ao IndexFlat exato
+Uso: python -m benchmarks.bench_ann --rows 1000000 --dim 384 --metric cosine
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from vector_index import build_index, index_params, prepare_vectors, set_search_params
+
+
+def clustered_vectors(n_rows, dim, n_clusters=256, seed=42):
+    """Vetores agrupados em clusters (mais próximos de embeddings reais que ruído uniforme)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype('float32')
+    labels = rng.integers(0, n_clusters, n_rows)
+    return centers[labels] + 0.35 * rng.standard_normal((n_rows, dim)).astype('float32')
+
+
+def recall_at_k(found, truth):
+    """Fração dos k vizinhos exatos recuperados, média entre as consultas"""
+    hits = [len(np.intersect1d(f[f >= 0], t)) for f, t in zip(found, truth)]
+    return float(np.mean(hits)) / truth.shape[1]
+
+
+def search_latency(index, queries, k, repeat=3):
+    """Melhor tempo por consulta (ms) buscando o lote inteiro"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, ids = index.search(queries, k)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(queries), ids
+
+
+def configurations(args):
+    """Grade de parâmetros avaliada (tipo do índice + parâmetros de busca)"""
+    for nprobe in args.nprobe:
+        yield 'ivf_flat', {'nlist': args.nlist, 'nprobe': nprobe}
+    for nprobe in args.nprobe:
+        yield 'ivf_pq', {'nlist': args.nlist, 'nprobe': nprobe, 'pq_m': args.pq_m}
+    for ef_search in args.ef_search:
+        yield 'hnsw', {'hnsw_m': args.hnsw_m, 'ef_search': ef_search}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de índices ANN (recall@k vs. latência)")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=['l2', 'cosine'], default='cosine')
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, nargs='+', default=[16, 32, 64, 128])
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.rows, args.dim)
+    queries = clustered_vectors(args.queries, args.dim, seed=7)
+
+    flat_params = index_params(index_type='flat', metric=args.metric)
+    flat = build_index(vectors, flat_params)
+    queries = prepare_vectors(queries, flat_params)
+    flat_ms, truth = search_latency(flat, queries, args.k)
+    results = [{'index_type': 'flat', 'params': {}, 'build_s': 0.0, 'recall': 1.0, 'latency_ms': flat_ms}]
+    print(f"{'índice':<10} {'parâmetros':<36} {'build (s)':>9} {'recall@' + str(args.k):>10} {'ms/consulta':>12}")
+    print(f"{'flat':<10} {'':<36} {'':>9} {1.0:>10.3f} {flat_ms:>12.4f}")
+
+    built = {}
+    for index_type, overrides in configurations(args):
+        params = index_params(index_type=index_type, metric=args.metric, **overrides)
+        # Reaproveita o índice já construído, mudando só os parâmetros de busca
+        build_key = (index_type, params['nlist'], params['pq_m'], params['hnsw_m'])
+        build_s = 0.0
+        if build_key not in built:
+            start = time.perf_counter()
+            built[build_key] = build_index(vectors, params)
+            build_s = time.perf_counter() - start
+        index = built[build_key]
+        set_search_params(index, params)
+
+        latency_ms, ids = search_latency(index, queries, args.k)
+        recall = recall_at_k(ids, truth)
+        results.append({'index_type': index_type, 'params': overrides, 'build_s': build_s,
+                        'recall': recall, 'latency_ms': latency_ms})
+        print(f"{index_type:<10} {json.dumps(overrides):<36} {build_s:>9.1f} {recall:>10.3f} {latency_ms:>12.4f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'rows': args.rows, 'dim': args.dim, 'k': args.k, 'metric': args.metric,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de carga do /consultar_review com micro-batching ligado e desligado
+Sem --url, roda a app FastAPI no próprio processo (httpx + ASGI) sobre um
+índice sintético; o encoder simulado processa um lote por vez, com custo fixo
+por chamada + custo por texto (como um SentenceTransformer ocupando os núcleos
+da CPU). Com --model usa o SentenceTransformer de verdade. Com --url dispara
+contra um servidor rodando (o modo vem de SEARCH_BATCHING no servidor).
+
+Uso: python -m benchmarks.bench_api_batching --concurrency 64 --requests 2000
+     python -m benchmarks.bench_api_batching --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_gradio_load import percentiles
+from benchmarks.hashing_embedder import HashingEmbedder
+from benchmarks.synthetic import SAMPLE_COMMENTS, make_reviews_frame
+
+QUERIES = [
+    'entrega atrasada', 'produto com defeito', 'chegou antes do prazo', 'não recebi o produto',
+    'veio diferente do anunciado', 'ótimo custo benefício', 'manual em português', 'embalagem danificada',
+]
+
+
+class SimulatedEncoder:
+    """Vetores do HashingEmbedder; custo de overhead_ms + per_text_ms * n por chamada, uma chamada por vez"""
+
+    def __init__(self, dim=384, overhead_ms=8.0, per_text_ms=0.5):
+        self.embed = HashingEmbedder(dim)
+        self.overhead = overhead_ms / 1000
+        self.per_text = per_text_ms / 1000
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, texts):
+        texts = list(texts)
+        with self._lock:
+            self.calls += 1
+            time.sleep(self.overhead + self.per_text * len(texts))
+            return self.embed(texts)
+
+
+class ModelEncoder(SimulatedEncoder):
+    """SentenceTransformer de verdade nas consultas (o índice sintético continua com o HashingEmbedder)"""
+
+    def __init__(self, model_name, dim=384):
+        from embedding_store import sentence_transformer_encoder
+
+        super().__init__(dim)
+        self._encode = sentence_transformer_encoder(model_name)
+
+    def __call__(self, texts):
+        self.calls += 1
+        return self._encode(texts)
+
+
+def in_process_app(rows, encoder, batching, max_batch_size, max_wait_ms):
+    """api.app com um SemanticSearcher sintético (sem o evento de startup)"""
+    import api
+    from micro_batcher import MicroBatcher
+    from search import SemanticSearcher
+    from vector_index import build_index, index_params
+
+    df = make_reviews_frame(rows).dropna(subset=['review_comment_message']).reset_index(drop=True)
+    # Variações dos comentários de exemplo para o índice não ter só 10 vetores distintos
+    df['review_comment_message'] = df['review_comment_message'].astype(str) + ' ' + \
+        np.array(SAMPLE_COMMENTS, dtype=object)[np.arange(len(df)) % len(SAMPLE_COMMENTS)]
+    vectors = encoder.embed(df['review_comment_message'].tolist())
+    params = index_params(index_type='flat', metric='cosine')
+    api.searcher = SemanticSearcher(build_index(vectors, params), params, df, encoder)
+    api.SEARCH_BATCHING = batching
+    api.search_batcher = MicroBatcher(api.consultar_lote, max_batch_size, max_wait_ms)
+    return api.app
+
+
+async def run(client, concurrency, total_requests, top_k=5):
+    latencies, errors = [], []
+    counter = iter(range(total_requests))
+
+    async def user():
+        for i in counter:
+            payload = {'query': QUERIES[i % len(QUERIES)], 'top_k': top_k}
+            start = time.perf_counter()
+            try:
+                response = await client.post('/consultar_review', json=payload)
+                response.raise_for_status()
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return dict(percentiles(latencies), errors=len(errors), error_samples=errors[:3],
+                seconds=round(wall, 3), throughput_rps=round(len(latencies) / wall, 2) if wall else 0.0)
+
+
+async def main_async(args):
+    import httpx
+
+    results = {}
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            results['server'] = await run(client, args.concurrency, args.requests)
+        return results
+
+    if args.model:
+        encoder = ModelEncoder(args.model, args.dim)
+    else:
+        encoder = SimulatedEncoder(args.dim, args.encode_overhead_ms, args.encode_per_text_ms)
+    for batching in (False, True):
+        app = in_process_app(args.rows, encoder, batching, args.max_batch_size, args.max_wait_ms)
+        import api
+        calls_before = encoder.calls
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://api', timeout=60) as client:
+            await run(client, args.concurrency, args.concurrency)  # aquecimento
+            stats = await run(client, args.concurrency, args.requests)
+        stats['encoder_calls'] = encoder.calls - calls_before
+        stats['batches'] = api.search_batcher.stats() if batching else None
+        await api.search_batcher.close()
+        results['batching_on' if batching else 'batching_off'] = stats
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do /consultar_review (micro-batching)")
+    parser.add_argument("--url", help="API rodando (ex.: http://127.0.0.1:8000); padrão: no processo")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requisições simultâneas")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=50_000, help="Reviews do índice sintético")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--model", help="SentenceTransformer real no lugar do encoder simulado")
+    parser.add_argument("--encode-overhead-ms", type=float, default=8.0)
+    parser.add_argument("--encode-per-text-ms", type=float, default=0.5)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    print(f"\n{args.concurrency} requisições simultâneas, {args.requests} no total")
+    print(f"{'modo':<14} {'req/s':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'encodes':>8} {'erros':>6}")
+    for mode, stats in results.items():
+        if stats['count']:
+            print(f"{mode:<14} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f} "
+                  f"{stats.get('encoder_calls', '-'):>8} {stats['errors']:>6}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latência dos cliques do dashboard: recálculo por clique vs. agregados materializados
+Uso: python -m benchmarks.bench_dashboard_stats --rows 100000 10000000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from aggregates import ReviewAggregates
+from benchmarks.synthetic import make_reviews_frame
+
+
+# Caminho antigo: recalcula tudo sobre o DataFrame completo a cada clique
+def recompute_basic_stats(df):
+    return {
+        "Total de Reviews": len(df),
+        "Reviews com Comentário": df['review_comment_message'].notna().sum(),
+        "Reviews sem Comentário": df['review_comment_message'].isna().sum(),
+        "Média de Avaliação": df['review_score'].mean(),
+        "Mediana de Avaliação": df['review_score'].median(),
+        "Desvio Padrão": df['review_score'].std()
+    }
+
+
+def recompute_score_distribution(df):
+    return df['review_score'].value_counts().sort_index()
+
+
+def recompute_monthly_trend(df):
+    df_copy = df.copy()
+    df_copy['review_creation_date'] = pd.to_datetime(df_copy['review_creation_date'])
+    monthly_data = df_copy.groupby(df_copy['review_creation_date'].dt.to_period('M')).agg({
+        'review_score': ['count', 'mean']
+    }).round(2)
+    monthly_data.columns = ['Total_Reviews', 'Avaliação_Média']
+    return monthly_data
+
+
+def time_call(fn, repeat):
+    """Melhor tempo (ms) entre `repeat` execuções"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(n_rows, repeat=5):
+    df = make_reviews_frame(n_rows)
+
+    start = time.perf_counter()
+    aggregates = ReviewAggregates.from_frame(df)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    handlers = {
+        'get_basic_stats': (lambda: recompute_basic_stats(df), aggregates.basic_stats),
+        'get_score_distribution': (lambda: recompute_score_distribution(df), aggregates.score_distribution),
+        'create_monthly_trend': (lambda: recompute_monthly_trend(df), aggregates.monthly_trend),
+    }
+
+    results = {'rows': n_rows, 'build_ms': build_ms, 'handlers': {}}
+    print(f"\n📊 {n_rows:,} linhas (construção dos agregados: {build_ms:.1f} ms)")
+    for name, (recompute, materialized) in handlers.items():
+        recompute_ms = time_call(recompute, repeat)
+        materialized_ms = time_call(materialized, repeat)
+        results['handlers'][name] = {'recompute_ms': recompute_ms, 'materialized_ms': materialized_ms}
+        print(f"  {name:<24} recálculo: {recompute_ms:10.3f} ms | materializado: {materialized_ms:8.4f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos agregados do dashboard")
+    parser.add_argument("--rows", type=int, nargs='+', default=[100_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        run(n_rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
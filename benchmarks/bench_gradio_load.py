@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de carga do dashboard Gradio: N usuários simultâneos, latência p50/p95/p99
+Sem --url, chama os handlers no próprio processo respeitando os mesmos limites
+de concorrência da fila (grupos lookup/render); com --url, dispara contra um
+servidor rodando (python app_gradio.py) via gradio_client.
+
+Uso: python -m benchmarks.bench_gradio_load --users 50 --requests 40
+     python -m benchmarks.bench_gradio_load --url http://127.0.0.1:7862 --users 50
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Mistura de requisições: (endpoint, peso)
+REQUEST_MIX = [
+    ('search_reviews', 0.55),
+    ('analyze_data', 0.25),
+    ('create_score_distribution_plot', 0.08),
+    ('create_sentiment_pie_chart', 0.06),
+    ('create_monthly_trend', 0.04),
+    ('create_daily_trend', 0.02),
+]
+
+
+def percentiles(latencies_ms):
+    values = np.asarray(latencies_ms, dtype='float64')
+    if len(values) == 0:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': int(len(values)), 'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3), 'max_ms': round(float(values.max()), 3)}
+
+
+def in_process_caller():
+    """Handlers do app_gradio com semáforos equivalentes aos grupos da fila"""
+    import app_gradio
+
+    groups = {
+        'lookup': threading.BoundedSemaphore(app_gradio.LOOKUP_CONCURRENCY),
+        'render': threading.BoundedSemaphore(app_gradio.RENDER_CONCURRENCY),
+    }
+    handlers = {
+        'search_reviews': (app_gradio.search_reviews, 'lookup'),
+        'analyze_data': (app_gradio.analyze_data, 'lookup'),
+        'create_score_distribution_plot': (app_gradio.create_score_distribution_plot, 'render'),
+        'create_sentiment_pie_chart': (app_gradio.create_sentiment_pie_chart, 'render'),
+        'create_monthly_trend': (app_gradio.create_monthly_trend, 'render'),
+        'create_daily_trend': (app_gradio.create_daily_trend, 'render'),
+    }
+
+    def call(endpoint, *args):
+        handler, group = handlers[endpoint]
+        with groups[group]:
+            return handler(*args)
+
+    snapshot = app_gradio.current_snapshot()
+    product_ids = []
+    if not snapshot.empty and 'product_id' in snapshot.df.columns:
+        product_ids = snapshot.df['product_id'].dropna().astype(str).unique()[:10_000].tolist()
+    return lambda: call, product_ids
+
+
+def remote_caller(url):
+    """Um gradio_client.Client por usuário, contra o servidor em `url`"""
+    from gradio_client import Client
+
+    local = threading.local()
+
+    def call(endpoint, *args):
+        if not hasattr(local, 'client'):
+            local.client = Client(url, verbose=False)
+        return local.client.predict(*args, api_name=f'/{endpoint}')
+
+    return lambda: call, []
+
+
+def run(make_call, product_ids, users, requests_per_user, seed=42):
+    endpoints = [endpoint for endpoint, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    latencies = {endpoint: [] for endpoint in endpoints}
+    errors = []
+    lock = threading.Lock()
+
+    def user(user_id):
+        rng = random.Random(seed + user_id)
+        call = make_call()
+        for _ in range(requests_per_user):
+            endpoint = rng.choices(endpoints, weights)[0]
+            args = ()
+            if endpoint == 'search_reviews':
+                args = (rng.choice(product_ids) if product_ids else 'produto-inexistente',)
+            start = time.perf_counter()
+            try:
+                call(endpoint, *args)
+            except Exception as e:
+                with lock:
+                    errors.append(f'{endpoint}: {e!r}')
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies[endpoint].append(elapsed_ms)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(user, range(users)))
+    wall = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'users': users,
+        'requests': len(all_latencies),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'seconds': round(wall, 3),
+        'throughput_rps': round(len(all_latencies) / wall, 2) if wall else 0.0,
+        'overall': percentiles(all_latencies),
+        'endpoints': {endpoint: percentiles(values) for endpoint, values in latencies.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard Gradio")
+    parser.add_argument("--url", help="Servidor Gradio (ex.: http://127.0.0.1:7862); padrão: no processo")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="Requisições por usuário")
+    parser.add_argument("--cold", action="store_true",
+                        help="No processo: não aquece o cache de gráficos antes da medição")
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    if args.url:
+        make_call, product_ids = remote_caller(args.url)
+    else:
+        make_call, product_ids = in_process_caller()
+        if not args.cold:
+            import app_gradio
+            app_gradio.warm_plot_cache()
+    results = run(make_call, product_ids, args.users, args.requests)
+
+    overall = results['overall']
+    print(f"\n👥 {results['users']} usuários | {results['requests']} requisições | "
+          f"{results['throughput_rps']} req/s | {results['errors']} erros")
+    print(f"{'endpoint':<32} {'n':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for endpoint, stats in list(results['endpoints'].items()) + [('total', overall)]:
+        if stats['count']:
+            print(f"{endpoint:<32} {stats['count']:>6} {stats['p50_ms']:>10.2f} "
+                  f"{stats['p95_ms']:>10.2f} {stats['p99_ms']:>10.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
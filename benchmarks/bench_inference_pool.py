@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vazão do pool de inferência com 1/2/4/8 workers na CPU
+Uso: python -m benchmarks.bench_inference_pool --task sentiment --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import time
+
+from benchmarks.synthetic import SAMPLE_COMMENTS
+from inference_pool import InferencePool, sentiment_factory, summarization_factory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool de inferência")
+    parser.add_argument("--task", choices=['sentiment', 'summarization'], default='sentiment')
+    parser.add_argument("--model", help="Nome do modelo ou diretório local")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    if args.task == 'sentiment':
+        factory = sentiment_factory(args.model) if args.model else sentiment_factory()
+        call_kwargs = {}
+    else:
+        factory = summarization_factory(args.model) if args.model else summarization_factory()
+        call_kwargs = {'max_length': 60, 'min_length': 10, 'do_sample': False}
+        args.texts = min(args.texts, 200)
+
+    # Textos com tamanhos variados, como no dataset
+    texts = [' '.join(SAMPLE_COMMENTS[i % len(SAMPLE_COMMENTS)] for i in range(n % 12 + 1))
+             for n in range(args.texts)]
+
+    results = []
+    print(f"CPU: {os.cpu_count()} núcleos | tarefa: {args.task} | {len(texts)} textos")
+    for workers in args.workers:
+        with InferencePool(factory, workers=workers, batch_size=args.batch_size, call_kwargs=call_kwargs) as pool:
+            pool.map(texts[:args.batch_size * workers])  # aquecimento
+            start = time.perf_counter()
+            pool.map(texts)
+            elapsed = time.perf_counter() - start
+        throughput = len(texts) / elapsed
+        results.append({'workers': workers, 'threads_per_worker': pool.threads_per_worker,
+                        'seconds': elapsed, 'texts_per_second': throughput})
+        print(f"  {workers} worker(s) x {pool.threads_per_worker} thread(s): {throughput:8.1f} textos/s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'task': args.task, 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memória, consultas/s e recall@k de cada modo de quantização, com e sem
+re-ranqueamento pelos vetores float32 (lidos de um memmap em disco)
+Uso: python -m benchmarks.bench_quantization --rows 1000000 --dim 384 --metric cosine
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_ann import clustered_vectors, recall_at_k
+from quantized_vectors import MODES, QuantizedVectors
+from vector_index import build_index, index_params, prepare_vectors
+
+
+def search_qps(quantized, queries, k, rerank, rerank_factor, repeat=3):
+    """Melhor vazão (consultas/s) buscando o lote inteiro"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, rows = quantized.search(queries, k, rerank_factor=rerank_factor, rerank=rerank)
+        best = min(best, time.perf_counter() - start)
+    return len(queries) / best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos modos de quantização (memória, QPS, recall@k)")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=['l2', 'cosine'], default='cosine')
+    parser.add_argument("--modes", nargs='+', choices=MODES, default=MODES)
+    parser.add_argument("--rerank-factor", type=int, nargs='+', default=[10, 50])
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.rows, args.dim)
+    queries = clustered_vectors(args.queries, args.dim, seed=7)
+
+    # Vizinhos exatos pelo IndexFlat
+    flat_params = index_params(index_type='flat', metric=args.metric)
+    _, truth = build_index(vectors, flat_params).search(prepare_vectors(queries, flat_params), args.k)
+
+    with tempfile.TemporaryDirectory(prefix='olist_quant_') as tmp_dir:
+        # Vetores completos em disco, como no EmbeddingStore
+        full_vectors = np.memmap(Path(tmp_dir) / 'vectors.f32', dtype='float32', mode='w+', shape=vectors.shape)
+        full_vectors[:] = vectors
+        full_vectors.flush()
+        full_vectors = np.memmap(full_vectors.filename, dtype='float32', mode='r', shape=vectors.shape)
+
+        results = []
+        print(f"{'modo':<8} {'rerank':>7} {'memória (MB)':>13} {'build (s)':>9} "
+              f"{'consultas/s':>12} {'recall@' + str(args.k):>10}")
+        for mode in args.modes:
+            if mode == 'binary' and args.metric != 'cosine':
+                continue
+            start = time.perf_counter()
+            quantized = QuantizedVectors.build(vectors, mode, args.metric, full_vectors=full_vectors)
+            build_s = time.perf_counter() - start
+            memory_mb = quantized.nbytes / 1024 ** 2
+
+            runs = [(False, 1)]
+            if mode != 'float32':
+                runs += [(True, factor) for factor in args.rerank_factor]
+            for rerank, factor in runs:
+                qps, rows = search_qps(quantized, queries, args.k, rerank, factor)
+                recall = recall_at_k(rows, truth)
+                label = f'x{factor}' if rerank else '-'
+                results.append({'mode': mode, 'rerank': rerank, 'rerank_factor': factor if rerank else None,
+                                'memory_mb': memory_mb, 'build_s': build_s, 'qps': qps, 'recall': recall})
+                print(f"{mode:<8} {label:>7} {memory_mb:>13.1f} {build_s:>9.1f} {qps:>12.1f} {recall:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'rows': args.rows, 'dim': args.dim, 'k': args.k, 'metric': args.metric,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
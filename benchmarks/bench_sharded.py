@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca scatter-gather no índice particionado vs. índice único
+Mede latência e recall@k com 1 processo por shard e, com --kill-shard, o
+resultado parcial quando um shard morre.
+Uso: python -m benchmarks.bench_sharded --rows 1000000 --shards 4 --kill-shard
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import clustered_vectors
+from benchmarks.bench_gradio_load import percentiles
+from sharded_index import PARTITIONS, ShardCoordinator, build_shards
+from vector_index import build_index, index_params, prepare_vectors
+
+
+def measure(search, queries, batch_size):
+    """Latência (ms) de cada lote de consultas e os resultados concatenados"""
+    latencies, results = [], []
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        begin = time.perf_counter()
+        results.append(search(batch))
+        latencies.append((time.perf_counter() - begin) * 1000)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do índice particionado (scatter-gather)")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=8, help="Consultas por chamada")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--partition", choices=PARTITIONS, default='hash')
+    parser.add_argument("--index-type", default='flat')
+    parser.add_argument("--metric", choices=['l2', 'cosine'], default='cosine')
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--kill-shard", action="store_true", help="Mata o shard 0 e mede o resultado parcial")
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.rows, args.dim)
+    queries = clustered_vectors(args.queries, args.dim, seed=7)
+    review_ids = np.array([f'review_{i:08d}' for i in range(args.rows)], dtype=object)
+    dates = np.datetime64('2017-01-01') + np.sort(np.random.default_rng(1).integers(0, 600, args.rows))
+    params = index_params(index_type=args.index_type, metric=args.metric)
+
+    single = build_index(vectors, dict(params))
+    prepared = prepare_vectors(queries, params)
+    single_latencies, single_hits = measure(lambda batch: single.search(batch, args.k)[1], prepared, args.batch_size)
+    truth = [set(review_ids[row[row >= 0]]) for row in np.concatenate(single_hits)]
+    results = {'single': percentiles(single_latencies)}
+
+    with tempfile.TemporaryDirectory(prefix='olist_shards_') as directory:
+        build_shards(vectors, review_ids, params, args.shards, args.partition, dates, directory)
+        with ShardCoordinator(directory, timeout=args.timeout) as coordinator:
+            coordinator.search(queries[:args.batch_size], args.k)  # aquecimento
+            sharded_latencies, sharded = measure(lambda batch: coordinator.search(batch, args.k),
+                                                 queries, args.batch_size)
+            found = np.concatenate([result.review_ids for result in sharded])
+            recall = np.mean([len(truth[i] & set(found[i])) / args.k for i in range(len(found))])
+            results['sharded'] = dict(percentiles(sharded_latencies), recall=float(recall))
+
+            if args.kill_shard:
+                coordinator._processes[0].kill()
+                coordinator._processes[0].join()
+                partial_latencies, partial = measure(lambda batch: coordinator.search(batch, args.k),
+                                                     queries, args.batch_size)
+                found = np.concatenate([result.review_ids for result in partial])
+                recall = np.mean([len(truth[i] & set(found[i])) / args.k for i in range(len(found))])
+                results['one_shard_dead'] = dict(percentiles(partial_latencies), recall=float(recall),
+                                                 missing_shards=partial[0].missing_shards)
+
+    print(f"\n{args.rows} vetores, {args.shards} shards ({args.partition}), lotes de {args.batch_size} consultas")
+    print(f"{'cenário':<16} {'p50 (ms)':>10} {'p99 (ms)':>10} {'recall@' + str(args.k):>10}")
+    for name, stats in results.items():
+        print(f"{name:<16} {stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f} {stats.get('recall', 1.0):>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'rows': args.rows, 'dim': args.dim, 'shards': args.shards, 'partition': args.partition,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Embedder offline para os benchmarks (sem rede e sem modelo)
+Feature hashing de palavras e trigramas de caracteres em `dim` dimensões,
+com sinal, normalizado. Textos parecidos ficam próximos, o que basta para
+medir construção de índice, busca top-k e recall sem o SentenceTransformer.
+"""
+
+import hashlib
+
+import numpy as np
+from scipy import sparse
+
+from text_dedup import TextDedup, canonical_text
+
+
+class HashingEmbedder:
+    """Chamável como o encoder do projeto: lista de textos -> matriz (n, dim) float32"""
+
+    def __init__(self, dim=384, char_ngram=3, seed=0):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self._key = seed.to_bytes(8, 'little')
+        self._features = {}
+
+    def _feature(self, feature):
+        """(coluna, sinal) de uma feature, com cache"""
+        cached = self._features.get(feature)
+        if cached is None:
+            digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8, key=self._key).digest()
+            value = int.from_bytes(digest, 'little')
+            cached = self._features.setdefault(feature, (value % self.dim, 1.0 if value >> 63 else -1.0))
+        return cached
+
+    def _text_features(self, text):
+        words = canonical_text(text).split()
+        features = [f'w:{word}' for word in words]
+        for word in words:
+            padded = f' {word} '
+            features.extend(f'c:{padded[i:i + self.char_ngram]}' for i in range(len(padded) - self.char_ngram + 1))
+        return features
+
+    def __call__(self, texts):
+        dedup = TextDedup.from_texts([text if isinstance(text, str) else '' for text in texts])
+        indptr, indices, signs = [0], [], []
+        for text in dedup.unique:
+            for column, sign in map(self._feature, self._text_features(text)):
+                indices.append(column)
+                signs.append(sign)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix((np.asarray(signs, dtype='float32'), np.asarray(indices, dtype='int64'),
+                                    np.asarray(indptr)), shape=(len(dedup.unique), self.dim))
+        vectors = matrix.toarray()
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+        return vectors[dedup.ids] if len(dedup.ids) else vectors
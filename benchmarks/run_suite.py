@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suíte reprodutível dos caminhos críticos sobre CSVs sintéticos no esquema Olist
+Para cada tamanho: gera (ou reaproveita) o CSV determinístico e mede a carga do
+CSV/Parquet, get_basic_stats, search_reviews, create_monthly_trend, a passada
+de frequência de termos da EDA, a construção dos índices e a busca top-k (com
+o HashingEmbedder, sem rede). O resultado vai para um JSON; com --compare, as
+métricas de tempo são comparadas com um JSON anterior.
+
+Uso: python -m benchmarks.run_suite --rows 100k 1m --output resultados.json
+     python -m benchmarks.run_suite --rows 100k --compare resultados_anteriores.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_ann import recall_at_k
+from benchmarks.bench_gradio_load import percentiles
+from benchmarks.hashing_embedder import HashingEmbedder
+from benchmarks.synthetic import SIZES, write_reviews_csv
+
+DEFAULT_DATA_DIR = 'data/synthetic'
+# Comentários usados na construção dos índices (limita memória nos tamanhos grandes)
+DEFAULT_MAX_INDEX_ROWS = 1_000_000
+QUERIES = [
+    'entrega atrasada', 'produto com defeito', 'chegou antes do prazo', 'não recebi o produto',
+    'veio diferente do anunciado', 'ótimo custo benefício', 'manual em português', 'embalagem danificada',
+]
+# Variação de tempo acima da qual --compare marca a métrica como regressão
+REGRESSION_THRESHOLD = 0.10
+
+
+def timed(fn):
+    """(resultado, ms) de uma chamada"""
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def latencies(fn, args_list):
+    """Percentis (ms) de uma chamada por item de `args_list`"""
+    values = []
+    for args in args_list:
+        _, ms = timed(lambda: fn(*args))
+        values.append(ms)
+    return percentiles(values)
+
+
+def run_step(results, name, fn):
+    """Executa um benchmark; falhas (ex.: dependência ausente) ficam registradas no JSON"""
+    try:
+        results[name] = fn()
+        print(f"  ✅ {name}")
+    except Exception as e:
+        results[name] = {'error': f'{type(e).__name__}: {e}'}
+        print(f"  ⚠️ {name}: {type(e).__name__}: {e}")
+
+
+def bench_load(csv_path):
+    from dataset import load_reviews, read_reviews_csv
+
+    df, csv_ms = timed(lambda: read_reviews_csv(csv_path))
+    with tempfile.TemporaryDirectory(prefix='olist_cache_') as cache_dir:
+        _, build_ms = timed(lambda: load_reviews(csv_path, cache_dir=cache_dir))
+        _, parquet_ms = timed(lambda: load_reviews(csv_path, cache_dir=cache_dir))
+    return {'rows': len(df), 'csv_read_ms': csv_ms, 'rows_per_second': len(df) / csv_ms * 1000,
+            'parquet_cache_build_ms': build_ms, 'parquet_load_ms': parquet_ms}
+
+
+def bench_dashboard(csv_path, repeat):
+    """Handlers do app_gradio sobre um snapshot do CSV sintético"""
+    import app_gradio
+
+    snapshot, snapshot_ms = timed(lambda: app_gradio.load_snapshot(csv_path))
+    # Publica o snapshot como reload_dataset() faria (os handlers leem current_snapshot())
+    app_gradio._snapshot = snapshot
+    product_ids = snapshot.df['product_id'].astype(str)
+    rng = np.random.default_rng(0)
+    popular = product_ids.value_counts().index[:repeat].tolist()
+    sampled = product_ids.iloc[rng.integers(0, len(product_ids), repeat)].tolist()
+
+    _, trend_cold_ms = timed(app_gradio.create_monthly_trend)
+    return {
+        'load_snapshot_ms': snapshot_ms,
+        'get_basic_stats': latencies(app_gradio.get_basic_stats, [()] * repeat),
+        'search_reviews_popular': latencies(app_gradio.search_reviews, [(p,) for p in popular]),
+        'search_reviews_random': latencies(app_gradio.search_reviews, [(p,) for p in sampled]),
+        'create_monthly_trend_cold_ms': trend_cold_ms,
+        'create_monthly_trend_cached': latencies(app_gradio.create_monthly_trend, [()] * repeat),
+    }
+
+
+def bench_word_frequency(df):
+    """Passada de frequência de termos da EDA (frequencia_termos + top termos geral e por nota)"""
+    from term_frequency import TermFrequencies
+
+    commented = df[df['review_comment_message'].notna()]
+    terms, build_ms = timed(lambda: TermFrequencies.from_frame(commented))
+    _, top_ms = timed(lambda: terms.top_terms(20))
+    _, by_score_ms = timed(lambda: [terms.frequencies(100, 'score', score) for score in range(1, 6)])
+    return {'comments': len(commented), 'terms': len(terms.terms), 'build_ms': build_ms,
+            'top_terms_ms': top_ms, 'frequencies_by_score_ms': by_score_ms}
+
+
+def bench_vectors(df, index_types, max_rows, k, n_queries):
+    """Embeddings (HashingEmbedder), construção de cada índice e busca top-k com recall@k contra o flat"""
+    from vector_index import build_index, index_params, prepare_vectors
+
+    texts = df['review_comment_message'].dropna().tolist()[:max_rows]
+    embedder = HashingEmbedder()
+    vectors, embed_ms = timed(lambda: embedder(texts))
+    queries = embedder([QUERIES[i % len(QUERIES)] + ('' if i < len(QUERIES) else f' {texts[i % len(texts)]}')
+                        for i in range(n_queries)])
+    results = {'vectors': len(vectors), 'embed_ms': embed_ms, 'indexes': {}}
+
+    truth = None
+    for index_type in ['flat'] + [t for t in index_types if t != 'flat']:
+        params = index_params(index_type=index_type, metric='cosine')
+        index, build_ms = timed(lambda: build_index(vectors, params))
+        prepared = prepare_vectors(queries, params)
+        (_, ids), batch_ms = timed(lambda: index.search(prepared, k))
+        if truth is None:
+            truth = ids
+        single = latencies(lambda i: index.search(prepared[i:i + 1], k), [(i,) for i in range(min(n_queries, 200))])
+        results['indexes'][index_type] = {
+            'params': params, 'build_ms': build_ms, 'batch_qps': n_queries / batch_ms * 1000,
+            'single_query': single, f'recall_at_{k}': recall_at_k(ids, truth),
+        }
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__}
+    try:
+        import faiss
+        versions['faiss'] = faiss.__version__
+    except ImportError:
+        pass
+    return {'commit': commit, 'versions': versions, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'timestamp': datetime.now(timezone.utc).isoformat()}
+
+
+def _timings(tree, prefix=''):
+    """Métricas de tempo (chaves *_ms) achatadas: {'100000/load/csv_read_ms': valor}"""
+    flat = {}
+    for key, value in tree.items():
+        path = f'{prefix}/{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(_timings(value, path))
+        elif key.endswith('_ms') and isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(current, previous_path):
+    """Imprime a variação de cada métrica de tempo em relação a um JSON anterior"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = _timings(json.load(f)['results'])
+    regressions = []
+    print(f"\n📈 Comparação com {previous_path}")
+    for path, value in _timings(current['results']).items():
+        if path not in previous or not previous[path]:
+            continue
+        change = value / previous[path] - 1
+        flag = '⚠️' if change > REGRESSION_THRESHOLD else '  '
+        if change > REGRESSION_THRESHOLD:
+            regressions.append(path)
+        print(f"  {flag} {path:<70} {previous[path]:>10.2f} -> {value:>10.2f} ms ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks dos caminhos críticos")
+    parser.add_argument("--rows", nargs='+', default=['100k'], help=f"Tamanhos ({', '.join(SIZES)} ou números)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Onde os CSVs gerados ficam (reaproveitados)")
+    parser.add_argument("--index-types", nargs='+', default=['flat', 'hnsw', 'ivf_flat'])
+    parser.add_argument("--max-index-rows", type=int, default=DEFAULT_MAX_INDEX_ROWS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50, help="Chamadas por handler do dashboard")
+    parser.add_argument("--skip", nargs='*', default=[],
+                        choices=['load', 'dashboard', 'word_frequency', 'vectors'])
+    parser.add_argument("--output", default='benchmark_results.json')
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    from dataset import read_reviews_csv
+
+    report = {'environment': environment(), 'args': vars(args), 'results': {}}
+    for size in args.rows:
+        n_rows = SIZES.get(str(size).lower()) or int(size)
+        csv_path = Path(args.data_dir) / f'olist_reviews_{n_rows}_{args.seed}.csv'
+        print(f"\n📊 {n_rows:,} linhas ({csv_path})")
+        results = report['results'][str(n_rows)] = {}
+        if not csv_path.exists():
+            _, results['generate_ms'] = timed(lambda: write_reviews_csv(csv_path, n_rows, args.seed))
+
+        if 'load' not in args.skip:
+            run_step(results, 'load', lambda: bench_load(csv_path))
+        if 'dashboard' not in args.skip:
+            run_step(results, 'dashboard', lambda: bench_dashboard(csv_path, args.repeat))
+        df = read_reviews_csv(csv_path, usecols=['review_score', 'review_comment_message', 'review_creation_date'])
+        if 'word_frequency' not in args.skip:
+            run_step(results, 'word_frequency', lambda df=df: bench_word_frequency(df))
+        if 'vectors' not in args.skip:
+            run_step(results, 'vectors',
+                     lambda df=df: bench_vectors(df, args.index_types, args.max_index_rows, args.k, args.queries))
+        del df
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    print(f"\n💾 Resultados salvos em {args.output}")
+
+    if args.compare:
+        regressions = compare(report, args.compare)
+        print(f"\n{len(regressions)} métrica(s) mais de {REGRESSION_THRESHOLD:.0%} mais lenta(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dados sintéticos no formato do dataset de reviews Olist
+make_reviews_frame: DataFrame já tipado, em memória
+write_reviews_csv: CSV determinístico com notas, comprimento dos comentários,
+duplicados e datas parecidos com os do dataset real (100k / 1M / 10M linhas)
+Uso: python -m benchmarks.synthetic --rows 1m
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Distribuição aproximada das notas no dataset real
+SCORE_PROBABILITIES = [0.115, 0.032, 0.082, 0.193, 0.578]
+
+SAMPLE_COMMENTS = [
+    'Recomendo', 'Ótimo produto', 'Chegou antes do prazo', 'Produto muito bom, recomendo',
+    'Não recebi o produto', 'Produto com defeito', 'Entrega atrasada',
+    'Veio diferente do anunciado', 'Bom custo benefício', 'Muito bom',
+]
+
+
+def make_reviews_frame(n_rows, seed=42, comment_ratio=0.41):
+    """DataFrame tipado (como o retornado por dataset.load_reviews)"""
+    rng = np.random.default_rng(seed)
+    scores = rng.choice(np.arange(1, 6, dtype='int8'), size=n_rows, p=SCORE_PROBABILITIES)
+    has_comment = rng.random(n_rows) < comment_ratio
+    comments = np.array(SAMPLE_COMMENTS, dtype=object)[rng.integers(0, len(SAMPLE_COMMENTS), n_rows)]
+    comments[~has_comment] = None
+
+    start = np.datetime64('2016-10-01T00:00:00', 's').astype('int64')
+    end = np.datetime64('2018-08-31T23:59:59', 's').astype('int64')
+    created = pd.to_datetime(rng.integers(start, end, n_rows), unit='s')
+    n_products = max(1, n_rows // 3)
+
+    df = pd.DataFrame({
+        'review_id': pd.Categorical(np.char.add('r', np.arange(n_rows).astype(str))),
+        'order_id': pd.Categorical(np.char.add('o', np.arange(n_rows).astype(str))),
+        'product_id': pd.Categorical(np.char.add('p', rng.integers(0, n_products, n_rows).astype(str))),
+        'review_score': scores,
+        'review_comment_title': None,
+        'review_comment_message': comments,
+        'review_creation_date': created,
+        'review_answer_timestamp': created + pd.to_timedelta(rng.integers(3600, 7 * 86400, n_rows), unit='s'),
+    })
+    df.attrs['dataset_version'] = f'synthetic-{n_rows}-{seed}'
+    return df
+
+
+# ------------------------------------------------------------------
+# CSV no esquema do Olist (gerador determinístico para os benchmarks)
+
+SIZES = {'100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+# Linhas por bloco: cada bloco tem a própria semente, então o arquivo só depende de (linhas, semente)
+CSV_CHUNK_ROWS = 250_000
+CSV_COLUMNS = ['review_id', 'order_id', 'product_id', 'review_score', 'review_comment_title',
+               'review_comment_message', 'review_creation_date', 'review_answer_timestamp']
+TITLE_RATIO = 0.12
+# Fração dos comentários que repetem um texto curto comum ("Recomendo", "Muito bom")
+DUPLICATE_RATIO = 0.35
+MAX_COMMENT_CHARS = 208
+
+SHORT_COMMENTS = SAMPLE_COMMENTS + ['Ótimo', 'Excelente', 'Tudo certo', 'Perfeito', 'Gostei muito', 'Bom']
+TITLES = ['Recomendo', 'Ótimo', 'Super recomendo', 'Excelente', 'Muito bom', 'Não recebi', 'Ruim',
+          'Produto com defeito', 'Bom']
+PHRASES = {
+    'negative': [
+        'não recebi o produto', 'o produto veio com defeito', 'entrega atrasada mais de uma semana',
+        'veio diferente do anunciado', 'ninguém responde o atendimento', 'faltou uma peça no pedido',
+        'a embalagem chegou danificada', 'quero meu dinheiro de volta', 'comprei dois e chegou só um',
+        'o manual não veio em português', 'produto de péssima qualidade', 'não recomendo essa loja',
+    ],
+    'neutral': [
+        'o produto é razoável', 'chegou no prazo', 'a qualidade poderia ser melhor', 'cor um pouco diferente',
+        'atendeu em parte', 'demorou mas chegou', 'tamanho menor do que eu esperava', 'preço justo',
+    ],
+    'positive': [
+        'chegou antes do prazo', 'produto de ótima qualidade', 'recomendo a loja', 'bem embalado',
+        'exatamente como anunciado', 'entrega rápida', 'superou minhas expectativas', 'ótimo custo benefício',
+        'comprarei novamente', 'vendedor atencioso', 'meu filho adorou', 'funciona perfeitamente',
+    ],
+}
+# Detalhes com números (a maior parte dos comentários longos não se repete)
+DETAILS = ['demorou {n} dias para chegar', 'comprei {n} unidades', 'já é a {n}ª compra na loja',
+           'chegou em {n} dias úteis', 'usei por {n} semanas']
+DETAIL_RATIO = 0.6
+# Frases por comentário (média) por sentimento: notas baixas têm comentários mais longos
+PHRASES_PER_COMMENT = {'negative': 2.2, 'neutral': 1.5, 'positive': 0.9}
+DATE_START = np.datetime64('2016-10-01')
+DATE_END = np.datetime64('2018-08-31')
+
+
+def _hex_ids(rng, n):
+    """Ids hexadecimais de 32 caracteres, como os do Olist"""
+    return np.frombuffer(rng.bytes(16 * n).hex().encode('ascii'), dtype='S32').astype(str)
+
+
+def _comments(rng, sentiments):
+    """Comentários compostos de frases do sentimento da nota, parte deles duplicados de textos curtos"""
+    n = len(sentiments)
+    comments = np.empty(n, dtype=object)
+    duplicate = rng.random(n) < DUPLICATE_RATIO
+    # Popularidade dos textos curtos segue uma Zipf ("Recomendo" domina)
+    ranks = (rng.zipf(1.6, duplicate.sum()) - 1) % len(SHORT_COMMENTS)
+    comments[duplicate] = np.array(SHORT_COMMENTS, dtype=object)[ranks]
+
+    for sentiment, phrases in PHRASES.items():
+        rows = np.flatnonzero(~duplicate & (sentiments == sentiment))
+        counts = 1 + rng.poisson(PHRASES_PER_COMMENT[sentiment], len(rows))
+        choices = rng.integers(0, len(phrases), (len(rows), counts.max(initial=1)))
+        suffixes = rng.random(len(rows))
+        details = np.where(rng.random(len(rows)) < DETAIL_RATIO, rng.integers(0, len(DETAILS), len(rows)), -1)
+        numbers = rng.integers(1, 31, len(rows))
+        for row, count, picked, suffix, detail, number in zip(rows, counts, choices, suffixes, details, numbers):
+            parts = [phrases[i] for i in picked[:count]]
+            if detail >= 0:
+                parts.insert(int(number) % (len(parts) + 1), DETAILS[detail].format(n=number))
+            text = ', '.join(parts)
+            text = text[0].upper() + text[1:] + ('!' if suffix < 0.2 else '.' if suffix < 0.6 else '')
+            comments[row] = text[:MAX_COMMENT_CHARS]
+    return comments
+
+
+def _reviews_chunk(seed, chunk, n_rows, product_ids, comment_ratio=0.41):
+    """Um bloco do CSV (determinístico por semente + índice do bloco)"""
+    rng = np.random.default_rng([seed, chunk])
+    scores = rng.choice(np.arange(1, 6, dtype='int8'), size=n_rows, p=SCORE_PROBABILITIES)
+    sentiments = np.where(scores <= 2, 'negative', np.where(scores == 3, 'neutral', 'positive'))
+    # Notas baixas são comentadas com mais frequência
+    comment_probability = np.where(scores <= 2, 0.75, np.where(scores == 3, 0.5, comment_ratio * 0.8))
+    has_comment = rng.random(n_rows) < comment_probability
+    comments = np.full(n_rows, None, dtype=object)
+    comments[has_comment] = _comments(rng, sentiments[has_comment])
+    titles = np.full(n_rows, None, dtype=object)
+    has_title = rng.random(n_rows) < TITLE_RATIO
+    titles[has_title] = np.array(TITLES, dtype=object)[rng.integers(0, len(TITLES), has_title.sum())]
+
+    # Volume crescente no período (densidade linear): t = início + duração * sqrt(u)
+    days = int((DATE_END - DATE_START).astype('int64'))
+    created = DATE_START + (days * np.sqrt(rng.random(n_rows))).astype('int64').astype('timedelta64[D]')
+    answered = created.astype('datetime64[s]') + rng.integers(3600, 7 * 86400, n_rows).astype('timedelta64[s]')
+    # Produtos populares concentram os reviews (início do catálogo fixo mais sorteado)
+    products = product_ids[(len(product_ids) * rng.random(n_rows) ** 2).astype('int64')]
+
+    return pd.DataFrame({
+        'review_id': _hex_ids(rng, n_rows),
+        'order_id': _hex_ids(rng, n_rows),
+        'product_id': products,
+        'review_score': scores,
+        'review_comment_title': titles,
+        'review_comment_message': comments,
+        'review_creation_date': pd.to_datetime(created).strftime('%Y-%m-%d %H:%M:%S'),
+        'review_answer_timestamp': pd.to_datetime(answered).strftime('%Y-%m-%d %H:%M:%S'),
+    }, columns=CSV_COLUMNS)
+
+
+def write_reviews_csv(path, n_rows, seed=42, progress=None):
+    """
+    Grava um CSV no esquema do Olist com `n_rows` linhas, em blocos (memória
+    constante). Mesmos (n_rows, seed) geram o mesmo arquivo byte a byte.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Catálogo de produtos fixo pela semente (um produto a cada ~3 reviews)
+    product_ids = _hex_ids(np.random.default_rng([seed, 2 ** 32 - 1]), max(1, n_rows // 3))
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for chunk, start in enumerate(range(0, n_rows, CSV_CHUNK_ROWS)):
+            size = min(CSV_CHUNK_ROWS, n_rows - start)
+            _reviews_chunk(seed, chunk, size, product_ids).to_csv(f, header=(chunk == 0), index=False)
+            if progress:
+                progress(start + size, n_rows)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no esquema dos reviews Olist")
+    parser.add_argument("--rows", default='100k', help=f"Linhas ({', '.join(SIZES)} ou um número)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo CSV (padrão: data/synthetic/olist_reviews_<linhas>_<semente>.csv)")
+    args = parser.parse_args()
+
+    n_rows = SIZES.get(args.rows.lower()) or int(args.rows)
+    output = args.output or f'data/synthetic/olist_reviews_{n_rows}_{args.seed}.csv'
+    start = time.perf_counter()
+    write_reviews_csv(output, n_rows, args.seed,
+                      progress=lambda done, total: print(f"  {done:,}/{total:,} linhas", end='\r'))
+    print(f"\n✅ {n_rows:,} linhas em {output} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
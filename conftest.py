@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Raiz do repositório no sys.path para os testes importarem os módulos do projeto"""
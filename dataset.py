@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carregamento do dataset de reviews Olist
+Converte o CSV uma única vez para um cache colunar tipado (Parquet) e
+reaproveita esse cache enquanto o arquivo de origem não mudar
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATASET_PATH = 'app/data/olist_order_reviews_dataset.csv'
+CACHE_FORMAT_VERSION = 1
+
+# Tipos das colunas do dataset (ids categóricos, nota em int8)
+CATEGORY_COLUMNS = ['review_id', 'order_id', 'product_id']
+DATE_COLUMNS = ['review_creation_date', 'review_answer_timestamp']
+SCORE_COLUMN = 'review_score'
+
+# Faixas de sentimento derivadas da nota: 1-2 negativo, 3 neutro, 4-5 positivo
+SENTIMENT_LABELS = ['Negativo', 'Neutro', 'Positivo']
+SENTIMENT_BINS = [-np.inf, 2, 3, np.inf]
+
+
+def _cache_paths(csv_path, cache_dir=None):
+    """Caminhos do arquivo Parquet e dos metadados do cache"""
+    csv_path = Path(csv_path)
+    cache_dir = Path(cache_dir) if cache_dir else csv_path.parent / '.cache'
+    stem = csv_path.stem
+    return cache_dir / f'{stem}.parquet', cache_dir / f'{stem}.meta.json'
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """Hash SHA-1 do conteúdo do arquivo, lido em blocos"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+def _source_fingerprint(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_reviews_csv(csv_path, usecols=None, **kwargs):
+    """Lê o CSV já com os tipos finais (sem conversões posteriores)"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    if usecols is not None:
+        header = [col for col in header if col in usecols]
+    dtype = {col: 'category' for col in CATEGORY_COLUMNS if col in header}
+    if SCORE_COLUMN in header:
+        dtype[SCORE_COLUMN] = 'int8'
+    parse_dates = [col for col in DATE_COLUMNS if col in header]
+    return pd.read_csv(csv_path, usecols=usecols, dtype=dtype, parse_dates=parse_dates, **kwargs)
+
+
+def build_cache(csv_path, cache_dir=None, source_sha1=None):
+    """Converte o CSV para Parquet e grava os metadados de validação"""
+    parquet_path, meta_path = _cache_paths(csv_path, cache_dir)
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = read_reviews_csv(csv_path)
+    tmp_path = parquet_path.with_suffix('.tmp')
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+
+    meta = _source_fingerprint(csv_path)
+    meta['sha1'] = source_sha1 or file_sha1(csv_path)
+    meta['format'] = CACHE_FORMAT_VERSION
+    meta['rows'] = len(df)
+    _write_meta(meta_path, meta)
+    return df, meta
+
+
+def cache_is_valid(csv_path, cache_dir=None):
+    """
+    Verifica se o cache corresponde ao CSV atual.
+    Compara tamanho e mtime; se só o mtime mudou, confirma pelo hash do conteúdo.
+    Retorna (valido, meta, sha1_calculado).
+    """
+    parquet_path, meta_path = _cache_paths(csv_path, cache_dir)
+    meta = _read_meta(meta_path)
+    if meta is None or not parquet_path.exists() or meta.get('format') != CACHE_FORMAT_VERSION:
+        return False, meta, None
+
+    current = _source_fingerprint(csv_path)
+    if current['size'] != meta.get('size'):
+        return False, meta, None
+    if current['mtime_ns'] == meta.get('mtime_ns'):
+        return True, meta, meta.get('sha1')
+
+    sha1 = file_sha1(csv_path)
+    if sha1 != meta.get('sha1'):
+        return False, meta, sha1
+
+    # Conteúdo igual (ex.: arquivo copiado ou "touch"): só atualiza o mtime
+    meta['mtime_ns'] = current['mtime_ns']
+    _write_meta(meta_path, meta)
+    return True, meta, sha1
+
+
+def load_reviews(csv_path=DATASET_PATH, cache_dir=None, columns=None, use_cache=True):
+    """
+    Carrega o dataset de reviews a partir do cache colunar, reconstruindo-o
+    quando o CSV de origem mudou. A versão do dataset (hash do CSV) fica em
+    df.attrs['dataset_version'].
+    """
+    if not Path(csv_path).exists():
+        raise FileNotFoundError(csv_path)
+
+    if not use_cache:
+        df = read_reviews_csv(csv_path, usecols=columns)
+        df.attrs['dataset_version'] = file_sha1(csv_path)
+        return df
+
+    valid, meta, sha1 = cache_is_valid(csv_path, cache_dir)
+    if valid:
+        parquet_path, _ = _cache_paths(csv_path, cache_dir)
+        try:
+            df = pd.read_parquet(parquet_path, columns=columns)
+            df.attrs['dataset_version'] = meta['sha1']
+            return df
+        except ImportError:
+            print("Aviso: pyarrow não instalado, lendo o CSV diretamente.")
+            return load_reviews(csv_path, columns=columns, use_cache=False)
+        except Exception as e:
+            print(f"Aviso: cache inválido ({e}), reconstruindo...")
+
+    try:
+        df, meta = build_cache(csv_path, cache_dir, source_sha1=sha1)
+    except ImportError:
+        print("Aviso: pyarrow não instalado, lendo o CSV diretamente.")
+        return load_reviews(csv_path, columns=columns, use_cache=False)
+
+    if columns is not None:
+        df = df[columns]
+    df.attrs['dataset_version'] = meta['sha1']
+    return df
+
+
+def sentiment_from_scores(scores):
+    """Classifica o sentimento pela nota de forma vetorizada (categórico)"""
+    return pd.cut(scores, bins=SENTIMENT_BINS, labels=SENTIMENT_LABELS)
+
+
+def add_derived_columns(df):
+    """
+    Adiciona ao próprio DataFrame (sem cópia) as colunas derivadas usadas
+    pelo dashboard: 'sentiment' (categórico) e 'review_month' (Period mensal)
+    """
+    if SCORE_COLUMN in df.columns and 'sentiment' not in df.columns:
+        df['sentiment'] = sentiment_from_scores(df[SCORE_COLUMN])
+    if 'review_creation_date' in df.columns and 'review_month' not in df.columns:
+        dates = df['review_creation_date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+            df['review_creation_date'] = dates
+        df['review_month'] = dates.dt.to_period('M')
+    return df
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armazenamento persistente e incremental dos embeddings dos comentários
+Os vetores ficam em um arquivo memory-mapped; cada linha é identificada por
+review_id + hash do texto, e o diretório do store é separado por modelo.
+Reviews novos ou editados são codificados; os inalterados são reaproveitados
+e os removidos do CSV são marcados como excluídos (tombstone).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from text_dedup import TextDedup
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_STORE_DIR = 'data/embeddings'
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+# A tabela de linhas é regravada a cada N lotes (e no fim), não a cada lote
+SAVE_EVERY_BATCHES = 16
+
+
+def text_hash(text):
+    """Hash curto (128 bits) do texto do comentário"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _model_slug(model_name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+
+
+def sentence_transformer_encoder(model_name=DEFAULT_MODEL, batch_size=64):
+    """Função de codificação baseada em SentenceTransformer (import adiado)"""
+    from sentence_transformers import SentenceTransformer
+
+    modelo = SentenceTransformer(model_name)
+
+    def encode(texts):
+        return modelo.encode(list(texts), batch_size=batch_size, show_progress_bar=False)
+
+    return encode
+
+
+class EmbeddingStore:
+    """Vetores em memmap + tabela de linhas (review_id, text_hash, alive)"""
+
+    def __init__(self, directory, model_name, dtype='float32'):
+        self.model_name = model_name
+        self.directory = Path(directory) / _model_slug(model_name)
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        self.rows = pd.DataFrame({
+            'review_id': pd.Series(dtype='object'),
+            'text_hash': pd.Series(dtype='object'),
+            'alive': pd.Series(dtype='bool'),
+        })
+        self._vectors = None
+        # Linhas cujos vetores já estão no arquivo, ainda fora de self.rows
+        self._pending_rows = []
+
+    # ------------------------------------------------------------------
+    # Persistência
+
+    @property
+    def _manifest_path(self):
+        return self.directory / 'manifest.json'
+
+    @property
+    def _rows_path(self):
+        return self.directory / 'rows.parquet'
+
+    @property
+    def _vectors_path(self):
+        return self.directory / 'vectors.bin'
+
+    @classmethod
+    def open(cls, directory=DEFAULT_STORE_DIR, model_name=DEFAULT_MODEL, dtype='float32'):
+        """Abre (ou cria) o store do modelo informado"""
+        store = cls(directory, model_name, dtype)
+        try:
+            with open(store._manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return store
+
+        if manifest.get('format') != STORE_FORMAT_VERSION or manifest.get('model_name') != model_name \
+                or manifest.get('dtype') != store.dtype.name:
+            print("Aviso: store de embeddings incompatível, será reconstruído.")
+            return store
+
+        store.dim = manifest['dim']
+        store.rows = pd.read_parquet(store._rows_path)
+        return store
+
+    def _save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_rows = self._rows_path.with_suffix('.tmp')
+        self.rows.to_parquet(tmp_rows, index=False)
+        os.replace(tmp_rows, self._rows_path)
+
+        manifest = {
+            'format': STORE_FORMAT_VERSION,
+            'model_name': self.model_name,
+            'dim': self.dim,
+            'dtype': self.dtype.name,
+            'rows': len(self.rows),
+            'alive': int(self.rows['alive'].sum()),
+        }
+        tmp_manifest = self._manifest_path.with_suffix('.tmp')
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_manifest, self._manifest_path)
+
+    @property
+    def vectors(self):
+        """Matriz (linhas, dim) memory-mapped, somente leitura"""
+        if self.dim is None or len(self.rows) == 0:
+            return np.empty((0, self.dim or 0), dtype=self.dtype)
+        if self._vectors is None or len(self._vectors) != len(self.rows):
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode='r',
+                                      shape=(len(self.rows), self.dim))
+        return self._vectors
+
+    def _append_vectors(self, new_vectors):
+        """Acrescenta vetores ao final do arquivo (linhas já gravadas não mudam)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        new_vectors = np.ascontiguousarray(new_vectors, dtype=self.dtype)
+        written = len(self.rows) + sum(len(rows) for rows in self._pending_rows)
+        offset = written * self.dim * self.dtype.itemsize
+        with open(self._vectors_path, 'ab+') as f:
+            # Descarta vetores órfãos de uma execução interrompida
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(new_vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._vectors = None
+
+    def _append(self, batch, batch_vectors):
+        """Grava os vetores do lote e guarda as linhas até o próximo _flush"""
+        if self.dim is None:
+            self.dim = int(batch_vectors.shape[1])
+        self._append_vectors(batch_vectors)
+        self._pending_rows.append(pd.DataFrame({'review_id': batch['review_id'].to_numpy(),
+                                                'text_hash': batch['text_hash'].to_numpy(),
+                                                'alive': True}))
+
+    def _flush(self):
+        """Junta as linhas pendentes à tabela (um único concat) e grava o store"""
+        if self._pending_rows:
+            self.rows = pd.concat([self.rows, *self._pending_rows], ignore_index=True)
+            self._pending_rows = []
+        self._save()
+
+    # ------------------------------------------------------------------
+    # Sincronização incremental
+
+    def sync(self, review_ids, texts, encode, batch_size=1024, save_every=SAVE_EVERY_BATCHES):
+        """
+        Sincroniza o store com o conjunto atual de (review_id, texto).
+        Textos já presentes no store sob outro review_id têm o vetor copiado;
+        os demais passam por `encode`, uma vez por texto canônico (ver text_dedup).
+        A tabela de linhas é gravada a cada `save_every` lotes e no fim.
+        Retorna contadores {'reused', 'embedded', 'copied', 'encoded', 'tombstoned', 'dedup_ratio'}.
+        """
+        current = pd.DataFrame({'review_id': pd.Series(review_ids, dtype='object').to_numpy(),
+                                'text': pd.Series(texts, dtype='object').to_numpy()})
+        current = current.drop_duplicates('review_id', keep='last')
+        current['text_hash'] = [text_hash(t) for t in current['text']]
+
+        alive = self.rows[self.rows['alive']]
+        known = pd.Series(alive.index.to_numpy(), index=alive['review_id'] + ':' + alive['text_hash'])
+        keys = current['review_id'] + ':' + current['text_hash']
+        reused_mask = keys.isin(known.index).to_numpy()
+
+        # Tombstone: linhas vivas cujo (review_id, hash) não está mais no CSV
+        keep_rows = known.reindex(keys[reused_mask]).to_numpy()
+        stale = np.setdiff1d(alive.index.to_numpy(), keep_rows)
+        self.rows.loc[stale, 'alive'] = False
+
+        pending = current[~reused_mask]
+        # Mesmo texto já gravado (inclusive em linha excluída): copia o vetor
+        stored = pd.Series(self.rows.index.to_numpy(), index=self.rows['text_hash'].to_numpy())
+        stored = stored[~stored.index.duplicated(keep='last')]
+        copy_mask = pending['text_hash'].isin(stored.index).to_numpy()
+        to_encode = pending[~copy_mask]
+
+        # Cada texto canônico é codificado uma vez; as linhas que o compartilham
+        # recebem o mesmo vetor (agrupadas pelo id do texto único)
+        dedup = TextDedup.from_texts(to_encode['text'])
+        order = np.argsort(dedup.ids, kind='stable')
+        bounds = np.searchsorted(dedup.ids[order], np.arange(0, len(dedup.unique) + batch_size, batch_size))
+        try:
+            if copy_mask.any():
+                copied = pending[copy_mask]
+                self._append(copied, np.array(self.vectors[stored.reindex(copied['text_hash']).to_numpy()]))
+            for batch_number, start in enumerate(range(0, len(dedup.unique), batch_size)):
+                unique_vectors = np.asarray(encode(dedup.unique[start:start + batch_size]))
+                members = order[bounds[batch_number]:bounds[batch_number + 1]]
+                self._append(to_encode.iloc[members], unique_vectors[dedup.ids[members] - start])
+                if (batch_number + 1) % save_every == 0:
+                    self._flush()
+        finally:
+            # Os vetores de cada lote já estão no disco (fsync); uma falha no
+            # encoder não perde os lotes anteriores
+            self._flush()
+        return {'reused': int(reused_mask.sum()), 'embedded': len(pending), 'copied': int(copy_mask.sum()),
+                'encoded': len(dedup.unique), 'tombstoned': len(stale), 'dedup_ratio': round(dedup.ratio, 4)}
+
+    # ------------------------------------------------------------------
+    # Leitura
+
+    def alive_rows(self):
+        """Linhas vivas: DataFrame com review_id e a posição do vetor ('row')"""
+        alive = self.rows[self.rows['alive']]
+        return pd.DataFrame({'review_id': alive['review_id'].to_numpy(), 'row': alive.index.to_numpy()})
+
+    def get(self, review_ids):
+        """Vetores (float32) dos review_ids informados, na mesma ordem"""
+        alive = self.alive_rows().set_index('review_id')['row']
+        rows = alive.reindex(pd.Index(review_ids, dtype='object'))
+        if rows.isna().any():
+            missing = rows[rows.isna()].index[:5].tolist()
+            raise KeyError(f"review_ids sem embedding: {missing}")
+        return np.asarray(self.vectors[rows.to_numpy(dtype='int64')], dtype='float32')
+
+    def compact(self):
+        """Reescreve o store sem as linhas excluídas"""
+        alive_idx = np.flatnonzero(self.rows['alive'].to_numpy())
+        if len(alive_idx) == len(self.rows):
+            return 0
+        kept = np.array(self.vectors[alive_idx])
+        removed = len(self.rows) - len(alive_idx)
+        self._vectors = None
+
+        tmp_path = self._vectors_path.with_suffix('.tmp')
+        kept.tofile(tmp_path)
+        os.replace(tmp_path, self._vectors_path)
+        self.rows = self.rows.iloc[alive_idx].reset_index(drop=True)
+        self._save()
+        return removed
+
+
+def main():
+    """Atualiza o store a partir do CSV de reviews"""
+    from dataset import load_reviews
+
+    parser = argparse.ArgumentParser(description="Atualiza o store de embeddings dos comentários")
+    parser.add_argument("--csv", default="data/olist_order_reviews_dataset.csv")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--dtype", choices=['float32', 'float16'], default='float32')
+    parser.add_argument("--compact", action="store_true", help="Remove linhas excluídas ao final")
+    args = parser.parse_args()
+
+    df = load_reviews(args.csv, columns=['review_id', 'review_comment_message'])
+    df = df.dropna(subset=['review_comment_message'])
+    df = df[df['review_comment_message'].str.strip() != '']
+
+    store = EmbeddingStore.open(args.store, args.model, args.dtype)
+    stats = store.sync(df['review_id'].astype(str), df['review_comment_message'],
+                       sentence_transformer_encoder(args.model))
+    print(f"✅ Embeddings: {stats['embedded']} novos ({stats['copied']} copiados do store, "
+          f"{stats['encoded']} textos únicos codificados, {stats['dedup_ratio']:.1%} duplicados), "
+          f"{stats['reused']} reaproveitados, "
+          f"{stats['tombstoned']} excluídos")
+    if args.compact:
+        print(f"🧹 Compactação: {store.compact()} linhas removidas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline de construção do índice FAISS em processo
+1. Lê o CSV em blocos
+2. Deduplica os textos equivalentes (cada texto único é codificado uma vez)
+3. Codifica os textos únicos em shards, em vários processos
+4. Grava cada shard em disco assim que fica pronto (retomável após falha)
+5. Junta os shards, espalha os vetores para os reviews e grava o índice
+O progresso e a vazão são reportados a cada shard.
+"""
+
+import functools
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from text_dedup import TextDedup, canonical_text
+from vector_index import INDEX_PATH, build_index, index_params, save_index
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+DEFAULT_WORK_DIR = 'data/index_build'
+DEFAULT_SHARD_SIZE = 20_000
+# 2: textos únicos deduplicados pela forma canônica (muda a ordem e os shards)
+BUILD_FORMAT_VERSION = 2
+
+
+def _load_encoder(model_name, batch_size=64):
+    """Carrega o SentenceTransformer (executado dentro de cada worker)"""
+    from sentence_transformers import SentenceTransformer
+
+    modelo = SentenceTransformer(model_name, device='cpu')
+
+    def encode(texts, **kwargs):
+        return list(modelo.encode(list(texts), batch_size=batch_size, show_progress_bar=False))
+
+    return encode
+
+
+def encoder_factory(model_name=DEFAULT_MODEL, batch_size=64):
+    """Fábrica picklable do encoder (para o InferencePool)"""
+    return functools.partial(_load_encoder, model_name, batch_size)
+
+
+def stream_unique_texts(csv_path, chunk_size=50_000, text_column='review_comment_message'):
+    """
+    Lê o CSV em blocos e deduplica os comentários pela forma canônica (text_dedup).
+    Retorna (textos_unicos, review_ids, unique_ids), onde unique_ids[i] é a
+    posição em textos_unicos do comentário do review i.
+    """
+    # Forma canônica -> posição em unique_texts, para os textos vistos em blocos anteriores
+    positions = {}
+    unique_texts = []
+    review_ids, unique_ids = [np.empty(0, dtype=object)], [np.empty(0, dtype='int64')]
+    for chunk in pd.read_csv(csv_path, usecols=['review_id', text_column], dtype=str, chunksize=chunk_size):
+        chunk = chunk.dropna(subset=[text_column])
+        texts = chunk[text_column].str.strip()
+        keep = (texts != '').to_numpy()
+        dedup = TextDedup.from_texts(texts.to_numpy()[keep])
+        # Só os textos únicos do bloco são comparados com os blocos anteriores
+        chunk_positions = np.empty(len(dedup.unique), dtype='int64')
+        for i, text in enumerate(dedup.unique):
+            key = canonical_text(text)
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = len(unique_texts)
+                unique_texts.append(text)
+            chunk_positions[i] = position
+        review_ids.append(chunk['review_id'].to_numpy(dtype=object)[keep])
+        unique_ids.append(chunk_positions[dedup.ids])
+    return unique_texts, np.concatenate(review_ids), np.concatenate(unique_ids)
+
+
+def print_progress(event):
+    """Saída padrão de progresso do pipeline"""
+    if event['stage'] == 'dedup':
+        ratio = 1 - event['unique'] / event['reviews'] if event['reviews'] else 0.0
+        print(f"📥 {event['reviews']} comentários, {event['unique']} textos únicos "
+              f"({ratio:.1%} duplicados) em {event['seconds']:.1f}s")
+    elif event['stage'] == 'resume':
+        print(f"↩️  Retomando: {event['done']}/{event['total']} shards já prontos")
+    elif event['stage'] == 'shard':
+        eta = event['remaining'] / event['rate'] if event['rate'] else float('inf')
+        print(f"🧮 Shard {event['done']}/{event['total']}: {event['rate']:.0f} textos/s, "
+              f"ETA {eta / 60:.1f} min")
+    elif event['stage'] == 'merge':
+        print(f"🔨 Índice {event['index_type']} com {event['vectors']} vetores em {event['seconds']:.1f}s")
+
+
+class IndexBuild:
+    """Estado persistente de uma construção (diretório de trabalho + manifest)"""
+
+    def __init__(self, work_dir, source, model_name, shard_size):
+        self.work_dir = Path(work_dir)
+        self.manifest = {'format': BUILD_FORMAT_VERSION, 'source': source, 'model': model_name,
+                         'shard_size': shard_size, 'shards_done': []}
+
+    @property
+    def _manifest_path(self):
+        return self.work_dir / 'manifest.json'
+
+    def shard_path(self, shard):
+        return self.work_dir / f'shard_{shard:05d}.npy'
+
+    def load(self):
+        """Reaproveita um manifest compatível (mesma fonte, modelo e tamanho de shard)"""
+        try:
+            with open(self._manifest_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        keys = ('format', 'source', 'model', 'shard_size')
+        if any(saved.get(key) != self.manifest[key] for key in keys):
+            return False
+        saved['shards_done'] = [shard for shard in saved['shards_done'] if self.shard_path(shard).exists()]
+        self.manifest = saved
+        return True
+
+    def save(self):
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+    def write_shard(self, shard, vectors):
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.work_dir / f'shard_{shard:05d}.tmp.npy'
+        np.save(tmp_path, np.asarray(vectors, dtype='float32'))
+        os.replace(tmp_path, self.shard_path(shard))
+        self.manifest['shards_done'].append(shard)
+        self.save()
+
+    def read_shards(self, n_shards):
+        return np.concatenate([np.load(self.shard_path(shard)) for shard in range(n_shards)])
+
+
+def run_build(csv_path, output=INDEX_PATH, model_name=DEFAULT_MODEL, params=None, workers=1,
+              shard_size=DEFAULT_SHARD_SIZE, batch_size=64, work_dir=DEFAULT_WORK_DIR,
+              encoder=None, progress=print_progress, index_shards=1, partition='hash'):
+    """
+    Executa (ou retoma) a construção completa e grava o índice em `output`.
+    `encoder` permite injetar uma função de codificação (texto -> vetor) no
+    lugar do SentenceTransformer; nesse caso a codificação roda no processo atual.
+    Com index_shards > 1, `output` é o diretório do índice particionado
+    (sharded_index.build_shards), dividido por hash do review_id ou por data.
+    """
+    from dataset import file_sha1
+
+    params = params or index_params()
+    start = time.perf_counter()
+    unique_texts, review_ids, unique_ids = stream_unique_texts(csv_path)
+    progress({'stage': 'dedup', 'reviews': len(review_ids), 'unique': len(unique_texts),
+              'seconds': time.perf_counter() - start})
+    if not unique_texts:
+        raise ValueError("Nenhum comentário para indexar")
+
+    build = IndexBuild(work_dir, file_sha1(csv_path), model_name, shard_size)
+    if build.load() and build.manifest['shards_done']:
+        progress({'stage': 'resume', 'done': len(build.manifest['shards_done']),
+                  'total': -(-len(unique_texts) // shard_size)})
+    build.save()
+
+    n_shards = -(-len(unique_texts) // shard_size)
+    done = set(build.manifest['shards_done'])
+    pending = [shard for shard in range(n_shards) if shard not in done]
+    remaining = sum(len(unique_texts[shard * shard_size:(shard + 1) * shard_size]) for shard in pending)
+
+    pool = None
+    if pending and encoder is None:
+        if workers > 1:
+            from inference_pool import InferencePool
+            pool = InferencePool(encoder_factory(model_name, batch_size), workers=workers, batch_size=batch_size)
+            encode = pool.map
+        else:
+            encode = _load_encoder(model_name, batch_size)
+    else:
+        encode = encoder
+
+    try:
+        encode_start = time.perf_counter()
+        encoded = 0
+        for shard in pending:
+            texts = unique_texts[shard * shard_size:(shard + 1) * shard_size]
+            build.write_shard(shard, np.stack(encode(texts)))
+            encoded += len(texts)
+            remaining -= len(texts)
+            rate = encoded / (time.perf_counter() - encode_start)
+            progress({'stage': 'shard', 'done': len(build.manifest['shards_done']), 'total': n_shards,
+                      'rate': rate, 'remaining': remaining})
+    finally:
+        if pool is not None:
+            pool.close()
+
+    # Junta os shards e espalha cada vetor único para os reviews que o usam
+    merge_start = time.perf_counter()
+    unique_vectors = build.read_shards(n_shards)
+    if index_shards > 1:
+        from sharded_index import build_shards
+
+        dates = _review_dates(csv_path, review_ids) if partition == 'time' else None
+        manifest = build_shards(unique_vectors[unique_ids], review_ids, params, index_shards, partition,
+                                dates, output)
+        progress({'stage': 'merge', 'index_type': f"{params['index_type']} em {index_shards} shards ({partition})",
+                  'vectors': sum(shard['ntotal'] for shard in manifest['shards']),
+                  'seconds': time.perf_counter() - merge_start})
+        return manifest
+    index = build_index(unique_vectors[unique_ids], params)
+    save_index(index, params, review_ids, output)
+    progress({'stage': 'merge', 'index_type': params['index_type'], 'vectors': int(index.ntotal),
+              'seconds': time.perf_counter() - merge_start})
+    return index
+
+
+def _review_dates(csv_path, review_ids):
+    """review_creation_date alinhada a `review_ids` (primeira ocorrência de cada review)"""
+    dates = pd.read_csv(csv_path, usecols=['review_id', 'review_creation_date'], dtype=str)
+    dates = dates.drop_duplicates('review_id').set_index('review_id')['review_creation_date']
+    return pd.to_datetime(dates.reindex(review_ids), errors='coerce').to_numpy()
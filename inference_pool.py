@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de processos para inferência na CPU (sentimento e sumarização)
+Cada processo carrega o modelo uma única vez, fixa o próprio número de
+threads e consome batches de uma fila compartilhada; assim a vazão cresce
+com o número de núcleos em vez de depender de um único intra-op thread pool.
+"""
+
+import functools
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+SENTIMENT_MODEL = 'cardiffnlp/twitter-roberta-base-sentiment'
+SUMMARIZATION_MODEL = 'facebook/bart-large-cnn'
+# Intervalo entre as checagens de workers vivos enquanto espera resultados
+POLL_INTERVAL = 1.0
+
+
+def _pin_threads(threads):
+    """Limita as threads das bibliotecas numéricas antes de importar o torch"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+
+def _load_pipeline(task, model, **kwargs):
+    from transformers import pipeline
+    return pipeline(task, model=model, tokenizer=model, device=-1, **kwargs)
+
+
+def sentiment_factory(model=SENTIMENT_MODEL):
+    """Fábrica (picklable) do pipeline de sentimento"""
+    return functools.partial(_load_pipeline, "sentiment-analysis", model, top_k=None, truncation=True)
+
+
+def summarization_factory(model=SUMMARIZATION_MODEL):
+    """Fábrica (picklable) do pipeline de sumarização"""
+    return functools.partial(_load_pipeline, "summarization", model, truncation=True)
+
+
+def _worker_main(model_factory, threads, call_kwargs, tasks, results):
+    _pin_threads(threads)
+    try:
+        model = model_factory()
+    except Exception as e:
+        results.put(('load_error', None, repr(e)))
+        return
+    results.put(('ready', None, os.getpid()))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, texts = task
+        try:
+            results.put(('ok', task_id, model(texts, **call_kwargs)))
+        except Exception as e:
+            results.put(('error', task_id, repr(e)))
+
+
+class InferencePool:
+    """
+    Executa `model(texts, **call_kwargs)` em `workers` processos.
+    `model_factory` precisa ser picklable (função de módulo ou functools.partial).
+    Chamadas a map() de threads diferentes são serializadas (uma por vez).
+    `timeout`: limite em segundos para carregar o modelo e para cada resultado;
+    com None espera sem limite, mas falha se algum worker morrer.
+    """
+
+    def __init__(self, model_factory, workers=None, threads_per_worker=None, batch_size=32,
+                 call_kwargs=None, start_method='spawn', timeout=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = itertools.count()
+        context = mp.get_context(start_method)
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(target=_worker_main, daemon=True,
+                            args=(model_factory, self.threads_per_worker, call_kwargs or {},
+                                  self._tasks, self._results))
+            for _ in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        self._wait_ready()
+
+    def _next_result(self):
+        """
+        Próximo item da fila de resultados, consultando em intervalos curtos;
+        TimeoutError após self.timeout, RuntimeError se um worker morreu
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        dead_before = False
+        while True:
+            wait = POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise TimeoutError("Workers de inferência não responderam a tempo")
+            try:
+                return self._results.get(timeout=wait)
+            except queue.Empty:
+                pass
+            dead = [process for process in self._processes if not process.is_alive()]
+            # Uma checagem a mais: a última mensagem do worker pode chegar logo depois de ele sair
+            if dead and dead_before:
+                raise RuntimeError(f"Worker de inferência encerrou inesperadamente "
+                                   f"(pid {dead[0].pid}, exitcode {dead[0].exitcode})")
+            dead_before = bool(dead)
+
+    def _wait_ready(self):
+        """Espera todos os processos carregarem o modelo"""
+        ready = 0
+        while ready < len(self._processes):
+            try:
+                status, _, payload = self._next_result()
+            except (TimeoutError, RuntimeError):
+                self.close()
+                raise
+            if status == 'load_error':
+                self.close()
+                raise RuntimeError(f"Falha ao carregar o modelo no worker: {payload}")
+            if status == 'ready':
+                ready += 1
+
+    def map(self, texts):
+        """Processa todos os textos em batches e devolve os resultados na ordem de entrada"""
+        texts = list(texts)
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        with self._lock:
+            # Resultados de chamadas anteriores (ex.: após um TimeoutError) têm outro call_id e são descartados
+            call_id = next(self._calls)
+            for batch_id, batch in enumerate(batches):
+                self._tasks.put(((call_id, batch_id), batch))
+
+            outputs = [None] * len(batches)
+            errors = []
+            pending = len(batches)
+            while pending:
+                status, task_id, payload = self._next_result()
+                if task_id is None or task_id[0] != call_id:
+                    continue
+                batch_id = task_id[1]
+                pending -= 1
+                if status == 'error':
+                    # Continua coletando para não deixar resultados desta chamada na fila
+                    errors.append(f"batch {batch_id}: {payload}")
+                outputs[batch_id] = payload
+        if errors:
+            raise RuntimeError(f"Erro na inferência ({errors[0]})")
+        return [item for batch_output in outputs for item in batch_output]
+
+    def close(self):
+        for process in self._processes:
+            if process.is_alive():
+                self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Materialização offline dos insights por produto (/analyze_sentiment)
+Pré-calcula, para cada product_id, o documento de resposta da API
+(sentimento predominante, distribuição, reviews representativos, resumo e
+pontos) e grava num SQLite chave-valor. Cada execução só recalcula os
+produtos cujos reviews mudaram desde a anterior.
+
+Uso: python insights.py --csv app/data/olist_order_reviews_dataset.csv --db data/insights.sqlite
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dataset import sentiment_from_scores
+
+INSIGHTS_DB = 'data/insights.sqlite'
+# Muda quando o formato do documento muda (força recálculo de tudo)
+DOCUMENT_VERSION = 1
+REPRESENTATIVE_REVIEWS = 3
+
+
+class InsightStore:
+    """SQLite chave-valor: product_id -> (fingerprint, documento JSON)"""
+
+    def __init__(self, path=INSIGHTS_DB):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS insights ("
+            " product_id TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " document TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, product_id):
+        """Documento pré-calculado do produto (busca pela chave primária) ou None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document FROM insights WHERE product_id = ?", (product_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def fingerprints(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT product_id, fingerprint FROM insights"))
+
+    def put_many(self, items):
+        """Grava [(product_id, fingerprint, documento)] numa única transação"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO insights (product_id, fingerprint, document, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                [(product_id, fingerprint, json.dumps(document, ensure_ascii=False), now)
+                 for product_id, fingerprint, document in items])
+
+    def delete_many(self, product_ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM insights WHERE product_id = ?",
+                                   [(product_id,) for product_id in product_ids])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM insights").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def load_sentiment_results(path):
+    """Rótulos do job sentiment_batch.py (JSONL) como Series review_id -> sentimento"""
+    results = pd.read_json(path, lines=True, dtype={'review_id': str})
+    return results.drop_duplicates('review_id', keep='last').set_index('review_id')['sentiment']
+
+
+def product_fingerprints(df, salt=''):
+    """Hash por produto, independente da ordem das linhas (soma dos hashes das linhas)"""
+    # Inclui tudo o que build_document usa (a data escolhe os reviews representativos)
+    columns = [col for col in ('review_id', 'review_score', 'review_comment_message', 'sentiment',
+                               'review_creation_date') if col in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    sums = row_hashes.groupby(df['product_id'].to_numpy()).sum()
+    return (sums.astype('uint64').astype(str) + f':{DOCUMENT_VERSION}{salt}').to_dict()
+
+
+def build_document(product_id, group, summarizer=None):
+    """Documento de resposta do /analyze_sentiment para um produto"""
+    distribution = group['sentiment'].value_counts()
+    distribution = {label: int(distribution.get(label, 0)) for label in ('positivo', 'neutro', 'negativo')}
+    predominant = max(distribution, key=distribution.get)
+
+    comments = group.dropna(subset=['review_comment_message'])
+    comments = comments[comments['review_comment_message'].str.strip() != '']
+    # Reviews representativos: com comentário, do sentimento predominante, mais recentes primeiro
+    representative = comments[comments['sentiment'] == predominant]
+    if 'review_creation_date' in representative.columns:
+        representative = representative.sort_values('review_creation_date', ascending=False)
+    representative_reviews = [
+        {'text': text, 'score': int(score), 'sentiment': sentiment}
+        for text, score, sentiment in representative[
+            ['review_comment_message', 'review_score', 'sentiment']].head(REPRESENTATIVE_REVIEWS).itertuples(index=False)
+    ]
+
+    document = {
+        'product_id': product_id,
+        'predominant_sentiment': predominant,
+        'summary': '',
+        'positive_points': [],
+        'negative_points': [],
+        'representative_reviews': representative_reviews,
+        'total_reviews': int(len(group)),
+        'sentiment_distribution': distribution,
+    }
+    if summarizer is not None and len(comments):
+        analysis = summarizer.analyze(comments['review_comment_message'].tolist(),
+                                      comments['review_score'].tolist())
+        document.update(summary=analysis['summary'], positive_points=analysis['positive_points'],
+                        negative_points=analysis['negative_points'])
+    return document
+
+
+def materialize(df, store, sentiments=None, summarizer=None, batch_size=500):
+    """
+    Atualiza o store com os documentos de todos os produtos do DataFrame.
+    Só recalcula produtos novos ou com reviews alterados e remove os que sumiram.
+    Retorna contadores {'updated', 'unchanged', 'deleted'}.
+    """
+    if 'product_id' not in df.columns:
+        raise ValueError("O dataset não tem a coluna product_id")
+    df = df.dropna(subset=['product_id'])
+    columns = [col for col in ('review_id', 'product_id', 'review_score', 'review_comment_message',
+                               'review_creation_date') if col in df.columns]
+    df = df[columns].astype({'product_id': str, 'review_id': str})
+
+    # Sentimento do job de classificação quando disponível; senão, pela nota
+    by_score = sentiment_from_scores(df['review_score']).astype(str).str.lower()
+    if sentiments is not None:
+        df['sentiment'] = df['review_id'].map(sentiments).fillna(by_score)
+    else:
+        df['sentiment'] = by_score
+
+    # Documentos gerados sem resumo são recalculados quando o resumo é ativado
+    current = product_fingerprints(df, salt=':summary' if summarizer is not None else '')
+    stored = store.fingerprints()
+    changed = [product_id for product_id, fingerprint in current.items() if stored.get(product_id) != fingerprint]
+    removed = [product_id for product_id in stored if product_id not in current]
+
+    if changed:
+        changed_rows = df[df['product_id'].isin(changed)]
+        pending = []
+        for product_id, group in changed_rows.groupby('product_id', sort=False):
+            pending.append((product_id, current[product_id], build_document(product_id, group, summarizer)))
+            if len(pending) >= batch_size:
+                store.put_many(pending)
+                pending = []
+        store.put_many(pending)
+    store.delete_many(removed)
+
+    return {'updated': len(changed), 'unchanged': len(current) - len(changed), 'deleted': len(removed)}
+
+
+def main():
+    from dataset import load_reviews
+
+    parser = argparse.ArgumentParser(description="Materializa os insights por produto")
+    parser.add_argument("--csv", default="app/data/olist_order_reviews_dataset.csv")
+    parser.add_argument("--db", default=INSIGHTS_DB)
+    parser.add_argument("--sentiment-results", help="JSONL gerado por sentiment_batch.py")
+    parser.add_argument("--summarize", action="store_true", help="Gera resumo e pontos com o BART")
+    args = parser.parse_args()
+
+    summarizer = None
+    if args.summarize:
+        from transformers import pipeline
+        from summarizer import ReviewSummarizer, pipeline_summarize, tokenizer_counter
+
+        bart = pipeline("summarization", model="facebook/bart-large-cnn", device=-1)
+        summarizer = ReviewSummarizer(pipeline_summarize(bart), count_tokens=tokenizer_counter(bart.tokenizer),
+                                      cache_dir='data/summaries', cache_key='facebook/bart-large-cnn')
+
+    sentiments = load_sentiment_results(args.sentiment_results) if args.sentiment_results else None
+    store = InsightStore(args.db)
+    start = time.perf_counter()
+    stats = materialize(load_reviews(args.csv), store, sentiments, summarizer)
+    print(f"✅ Insights: {stats['updated']} atualizados, {stats['unchanged']} inalterados, "
+          f"{stats['deleted']} removidos ({time.perf_counter() - start:.1f}s)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice invertido BM25 dos comentários (recuperação lexical)
+Os comentários passam pela mesma tokenização da análise exploratória
+(term_frequency.tokenize), com letras e dígitos e os acentos dobrados
+("português" e "portugues" caem no mesmo termo). Cada lista de postings guarda
+as posições dos documentos em deltas e as frequências, codificadas em varint
+num único buffer de bytes; só as listas dos termos da consulta são
+decodificadas na busca.
+"""
+
+import argparse
+import json
+import os
+import re
+import unicodedata
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from term_frequency import STOPWORDS, tokenize
+from text_dedup import TextDedup
+
+LEXICAL_PATH = 'indice_reviews_lexical'
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+# Letras e dígitos (códigos de produto entram como termos)
+_TERM = re.compile(r'[^\W_]+')
+MIN_TERM_LENGTH = 2
+# Acima de 1 posting a cada 16 documentos, a soma dos scores usa um vetor denso
+DENSE_ACCUMULATOR_RATIO = 16
+
+
+def fold_accents(text):
+    """Remove os acentos (NFD sem as marcas combinantes)"""
+    return ''.join(char for char in unicodedata.normalize('NFD', text) if not unicodedata.combining(char))
+
+
+# Com termos a partir de 2 caracteres, as preposições curtas também saem
+LEXICAL_STOPWORDS = frozenset(STOPWORDS | {fold_accents(word) for word in STOPWORDS}
+                              | {'de', 'do', 'da', 'em', 'no', 'na', 'os', 'as', 'ao', 'se', 'me'})
+# token -> forma sem acentos (o vocabulário dos comentários é pequeno)
+_FOLDED = {}
+
+
+def analyze(text):
+    """Termos do índice: tokens canônicos sem stopwords, com os acentos dobrados"""
+    terms = []
+    for token in tokenize(text, stopwords=LEXICAL_STOPWORDS, min_length=MIN_TERM_LENGTH, pattern=_TERM):
+        folded = _FOLDED.get(token)
+        if folded is None:
+            folded = _FOLDED.setdefault(token, fold_accents(token))
+        terms.append(folded)
+    return terms
+
+
+def varint_encode(values):
+    """Codifica inteiros não negativos em varint (7 bits por byte); retorna (bytes, início de cada valor)"""
+    values = np.asarray(values, dtype='uint64')
+    n_bytes = np.ones(len(values), dtype='int64')
+    rest = values >> np.uint64(7)
+    while rest.any():
+        n_bytes += rest > 0
+        rest >>= np.uint64(7)
+    ends = np.cumsum(n_bytes)
+    starts = ends - n_bytes
+    encoded = np.empty(int(ends[-1]) if len(values) else 0, dtype='uint8')
+    for position in range(int(n_bytes.max()) if len(values) else 0):
+        selected = n_bytes > position
+        chunk = ((values[selected] >> np.uint64(7 * position)) & np.uint64(0x7F)).astype('uint8')
+        # Bit de continuação em todos os bytes menos o último de cada valor
+        chunk[n_bytes[selected] - 1 > position] |= 0x80
+        encoded[starts[selected] + position] = chunk
+    return encoded, starts
+
+
+def varint_decode(data):
+    """Inverso de varint_encode (vetorizado)"""
+    data = np.asarray(data, dtype='uint8')
+    if len(data) == 0:
+        return np.zeros(0, dtype='uint64')
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    values = (data & 0x7F).astype('uint64') << (7 * shift).astype('uint64')
+    return np.add.reduceat(values, starts)
+
+
+class LexicalIndex:
+    """
+    terms: vocabulário (posição = id do termo)
+    doc_freq: número de documentos de cada termo
+    offsets: início de cada lista no buffer `postings` (n_termos + 1)
+    postings: por termo, varint dos deltas das posições seguidos das frequências
+    doc_lengths: número de termos de cada documento (normalização do BM25)
+    review_ids: review_id de cada posição
+    """
+
+    def __init__(self, terms, doc_freq, offsets, postings, doc_lengths, review_ids=None,
+                 k1=DEFAULT_K1, b=DEFAULT_B, version=None):
+        self.terms = list(terms)
+        self.doc_freq = np.asarray(doc_freq, dtype='int64')
+        self.offsets = np.asarray(offsets, dtype='int64')
+        self.postings = postings
+        self.doc_lengths = np.asarray(doc_lengths, dtype='uint32')
+        self.review_ids = review_ids
+        self.k1 = k1
+        self.b = b
+        self.version = version
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+
+        n_docs = len(self.doc_lengths)
+        average = self.doc_lengths.mean() if n_docs else 1.0
+        self.idf = np.log1p((n_docs - self.doc_freq + 0.5) / (self.doc_freq + 0.5)).astype('float32')
+        # Parte do denominador do BM25 que só depende do documento
+        self._length_norm = (k1 * (1 - b + b * self.doc_lengths / max(average, 1e-9))).astype('float32')
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts, review_ids=None, k1=DEFAULT_K1, b=DEFAULT_B):
+        """Tokeniza cada texto único uma vez e monta as listas de postings comprimidas"""
+        dedup = TextDedup.from_texts(pd.Series(texts, dtype='object').fillna(''))
+        vocabulary = {}
+        indptr, indices = [0], []
+        for text in dedup.unique:
+            indices.extend(vocabulary.setdefault(term, len(vocabulary)) for term in analyze(text))
+            indptr.append(len(indices))
+        unique_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype='int64'), np.asarray(indices, dtype='int64'), np.asarray(indptr)),
+            shape=(len(dedup.unique), len(vocabulary)))
+        unique_matrix.sum_duplicates()
+        doc_lengths = np.asarray(unique_matrix.sum(axis=1)).ravel()[dedup.ids] if len(dedup.ids) else np.zeros(0)
+        columns = (unique_matrix[dedup.ids] if len(dedup.ids) else unique_matrix).tocsc()
+        columns.sort_indices()
+
+        # Por termo: [deltas das posições..., frequências...]
+        col_ptr, docs, freqs = columns.indptr, columns.indices.astype('int64'), columns.data
+        term_of = np.repeat(np.arange(len(vocabulary)), np.diff(col_ptr))
+        deltas = docs.copy()
+        deltas[1:] -= docs[:-1]
+        first = col_ptr[:-1][np.diff(col_ptr) > 0]
+        deltas[first] = docs[first]
+        values = np.empty(2 * len(docs), dtype='int64')
+        positions = np.arange(len(docs))
+        values[col_ptr[term_of] + positions] = deltas
+        values[col_ptr[term_of + 1] + positions] = freqs
+        postings, starts = varint_encode(values)
+        offsets = np.append(starts[2 * col_ptr[:-1]], len(postings)) if len(vocabulary) else np.zeros(1, dtype='int64')
+
+        if review_ids is not None:
+            review_ids = pd.Series(review_ids, dtype='object').to_numpy()
+        return cls(list(vocabulary), np.diff(col_ptr), offsets, postings, doc_lengths, review_ids,
+                   k1, b, uuid.uuid4().hex)
+
+    @property
+    def nbytes(self):
+        """Memória das listas de postings comprimidas"""
+        return int(self.postings.nbytes + self.offsets.nbytes)
+
+    def term_postings(self, term_id):
+        """(posições, frequências) dos documentos que contêm o termo"""
+        df = int(self.doc_freq[term_id])
+        values = varint_decode(self.postings[self.offsets[term_id]:self.offsets[term_id + 1]]).astype('int64')
+        return np.cumsum(values[:df]), values[df:]
+
+    def lookup(self, query):
+        """(ids dos termos da consulta presentes no índice, número de termos ausentes)"""
+        terms = list(dict.fromkeys(analyze(query)))
+        term_ids = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+        return term_ids, len(terms) - len(term_ids)
+
+    def search_terms(self, term_ids, top_k=10, mask=None, require_all=False):
+        """BM25 dos termos; retorna (scores, posições) em ordem decrescente, no máximo top_k"""
+        if not term_ids:
+            return np.zeros(0, dtype='float32'), np.zeros(0, dtype='int64')
+        docs, scores = [], []
+        for term_id in term_ids:
+            term_docs, freqs = self.term_postings(term_id)
+            docs.append(term_docs)
+            scores.append(self.idf[term_id] * freqs * (self.k1 + 1) / (freqs + self._length_norm[term_docs]))
+        docs, scores = np.concatenate(docs), np.concatenate(scores)
+        if len(docs) * DENSE_ACCUMULATOR_RATIO >= len(self):
+            # Listas longas: acumula num vetor denso por documento (evita ordenar as postings)
+            totals = np.bincount(docs, weights=scores, minlength=len(self))
+            matches = np.bincount(docs, minlength=len(self))
+            candidates = np.flatnonzero(matches)
+            totals, matches = totals[candidates].astype('float32'), matches[candidates]
+        else:
+            candidates, inverse = np.unique(docs, return_inverse=True)
+            totals = np.bincount(inverse, weights=scores).astype('float32')
+            matches = np.bincount(inverse)
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if require_all and len(term_ids) > 1:
+            keep &= matches == len(term_ids)
+        if mask is not None:
+            keep &= mask[candidates]
+        candidates, totals = candidates[keep], totals[keep]
+        if len(candidates) > top_k:
+            top = np.argpartition(-totals, top_k - 1)[:top_k]
+            candidates, totals = candidates[top], totals[top]
+        order = np.lexsort((candidates, -totals))
+        return totals[order], candidates[order]
+
+    def search(self, query, top_k=10, mask=None, require_all=False):
+        """BM25 de uma consulta em texto livre; retorna (scores, posições)"""
+        term_ids, _ = self.lookup(query)
+        return self.search_terms(term_ids, top_k, mask, require_all)
+
+    # ------------------------------------------------------------------
+    # Persistência
+
+    def save(self, directory=LEXICAL_PATH):
+        """Grava os arrays (.npy), o vocabulário e os review_ids; o JSON de metadados vai por último"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {'postings': self.postings, 'offsets': self.offsets, 'doc_freq': self.doc_freq,
+                  'doc_lengths': self.doc_lengths}
+        for name, array in arrays.items():
+            tmp_path = directory / f'{name}.tmp.npy'
+            np.save(tmp_path, array)
+            os.replace(tmp_path, directory / f'{name}.npy')
+        with open(directory / 'terms.json', 'w', encoding='utf-8') as f:
+            json.dump(self.terms, f, ensure_ascii=False)
+        if self.review_ids is not None:
+            pd.DataFrame({'review_id': self.review_ids}).to_parquet(directory / 'review_ids.parquet', index=False)
+        meta = {'k1': self.k1, 'b': self.b, 'n_docs': len(self), 'n_terms': len(self.terms),
+                'version': self.version}
+        with open(directory / 'lexical.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory=LEXICAL_PATH, mmap=True):
+        """Carrega o que save() gravou (as postings ficam em memmap por padrão)"""
+        directory = Path(directory)
+        with open(directory / 'lexical.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(directory / 'terms.json', 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        arrays = {name: np.load(directory / f'{name}.npy', mmap_mode='r' if mmap and name == 'postings' else None)
+                  for name in ('postings', 'offsets', 'doc_freq', 'doc_lengths')}
+        ids_path = directory / 'review_ids.parquet'
+        review_ids = pd.read_parquet(ids_path)['review_id'].to_numpy() if ids_path.exists() else None
+        return cls(terms, arrays['doc_freq'], arrays['offsets'], arrays['postings'], arrays['doc_lengths'],
+                   review_ids, meta['k1'], meta['b'], meta.get('version'))
+
+
+def main():
+    """Constrói o índice lexical a partir do CSV de reviews"""
+    from dataset import load_reviews
+
+    parser = argparse.ArgumentParser(description="Constrói o índice BM25 dos comentários")
+    parser.add_argument("--csv", default="data/olist_order_reviews_dataset.csv")
+    parser.add_argument("--output", default=LEXICAL_PATH)
+    parser.add_argument("--k1", type=float, default=DEFAULT_K1)
+    parser.add_argument("--b", type=float, default=DEFAULT_B)
+    args = parser.parse_args()
+
+    df = load_reviews(args.csv, columns=['review_id', 'review_comment_message'])
+    df = df.dropna(subset=['review_comment_message'])
+    df = df[df['review_comment_message'].str.strip() != '']
+
+    index = LexicalIndex.build(df['review_comment_message'], df['review_id'].astype(str), args.k1, args.b)
+    index.save(args.output)
+    # Tamanho sem compressão: posição + frequência em int32 por posting
+    raw_bytes = 8 * int(index.doc_freq.sum())
+    print(f"✅ Índice lexical: {len(index)} documentos, {len(index.terms)} termos, "
+          f"postings {index.nbytes / 1024 ** 2:.1f} MB (sem compressão: {raw_bytes / 1024 ** 2:.1f} MB) "
+          f"em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-batching assíncrono de requisições
+Requisições concorrentes são agrupadas por até `max_wait_ms` (ou até
+`max_batch_size` itens) e processadas numa única chamada, rodando numa thread
+do executor para não bloquear o event loop; cada resultado volta para a
+requisição que o pediu. Enquanto um lote roda, o próximo vai se formando.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class MicroBatcher:
+    """
+    `process_batch(itens) -> resultados` (mesma ordem) é síncrona e roda no
+    executor; por padrão uma única thread, já que o encoder ocupa os núcleos.
+    """
+
+    def __init__(self, process_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro_batcher')
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """Enfileira o item e espera o seu resultado"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        """Primeiro item (espera sem limite) + o que chegar até o prazo ou o tamanho máximo"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [(item, future) for item, future in await self._collect() if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self.process_batch,
+                                                     [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {'batches': self.batches, 'items': self.items,
+                'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0}
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=False)
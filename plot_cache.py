@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache dos gráficos do dashboard
+Cada gráfico é desenhado com a API orientada a objetos do Matplotlib (sem o
+estado global do pyplot), gravado como PNG e guardado pela chave
+(gráfico, versão do dataset, parâmetros). Enquanto o dataset não muda, os
+cliques seguintes só devolvem o arquivo já gerado.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+DEFAULT_MAX_ENTRIES = 64
+# Pontos por série acima dos quais a linha é reduzida com LTTB
+DEFAULT_MAX_POINTS = 500
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: escolhe `threshold` pontos que preservam a
+    forma da série (picos e vales). Retorna os índices dos pontos escolhidos.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    selected = np.empty(threshold, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+    # Baldes internos com tamanhos iguais (o primeiro e o último ponto ficam fixos)
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Média do próximo balde (ou o último ponto)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Área do triângulo (ponto anterior, candidato, média do próximo balde)
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def figure_to_png(fig):
+    """Renderiza a figura (Agg) em bytes PNG"""
+    buffer = io.BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return buffer.getvalue()
+
+
+class PlotCache:
+    """
+    LRU de gráficos renderizados, gravados como PNG em `directory`.
+    `render` recebe uma Figure nova e desenha nela; a figura é descartada
+    logo após virar PNG. Sem `directory`, usa um diretório temporário
+    próprio, apagado em close() (ou quando o cache é coletado / o processo sai).
+    """
+
+    def __init__(self, directory=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self._cleanup = None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='olist_plots_')
+            self._cleanup = weakref.finalize(self, shutil.rmtree, directory, ignore_errors=True)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._rendering = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(name, version, params):
+        raw = f'{name}|{version}|{sorted((params or {}).items())}'
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _lookup(self, key):
+        with self._lock:
+            path = self._entries.get(key)
+            if path is not None and path.exists():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return str(path)
+        return None
+
+    def get(self, name, version, render, params=None, figsize=(10, 6), dpi=100):
+        """Caminho do PNG do gráfico, renderizando só quando não está no cache"""
+        key = self._key(name, version, params)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        # Requisições simultâneas do mesmo gráfico esperam uma única renderização:
+        # [lock da chave, threads usando o lock]; sai de _rendering com a última
+        with self._lock:
+            rendering = self._rendering.setdefault(key, [threading.Lock(), 0])
+            rendering[1] += 1
+        try:
+            with rendering[0]:
+                cached = self._lookup(key)
+                if cached is not None:
+                    return cached
+
+                fig = Figure(figsize=figsize, dpi=dpi)
+                try:
+                    render(fig, **(params or {}))
+                    fig.tight_layout()
+                    png = figure_to_png(fig)
+                finally:
+                    # Sem pyplot não há registro global: limpar libera a figura imediatamente
+                    fig.clear()
+                path = self.directory / f'{name}_{key[:16]}.png'
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(png)
+                os.replace(tmp_path, path)
+
+                with self._lock:
+                    self.misses += 1
+                    self._entries[key] = path
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        _, evicted = self._entries.popitem(last=False)
+                        if evicted != path:
+                            evicted.unlink(missing_ok=True)
+        finally:
+            # Também quando a renderização falha: o lock da chave não fica para trás,
+            # e quem ainda espera por ele tenta renderizar com o mesmo lock
+            with self._lock:
+                rendering[1] -= 1
+                if rendering[1] == 0:
+                    del self._rendering[key]
+        return str(path)
+
+    def clear(self):
+        with self._lock:
+            for path in self._entries.values():
+                path.unlink(missing_ok=True)
+            self._entries.clear()
+
+    def close(self):
+        """Apaga os PNGs gerados; o diretório temporário criado pelo cache é removido inteiro"""
+        self.clear()
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice por product_id para a busca de reviews do dashboard
+As linhas são agrupadas por produto (mais recentes primeiro) em arrays
+contíguos; cada produto aponta para um intervalo [início, fim) desses arrays
+"""
+
+import numpy as np
+import pandas as pd
+
+RECENT_REVIEWS = 5
+
+
+class ProductIndex:
+    """Mapa product_id -> intervalo de linhas, com estatísticas pré-calculadas"""
+
+    def __init__(self, positions, mean_scores, review_counts, comment_counts,
+                 recent_offsets, recent_scores, recent_dates, recent_comments, version=None):
+        self.version = version
+        self._positions = positions
+        self.mean_scores = mean_scores
+        self.review_counts = review_counts
+        self.comment_counts = comment_counts
+        self.recent_offsets = recent_offsets
+        self.recent_scores = recent_scores
+        self.recent_dates = recent_dates
+        self.recent_comments = recent_comments
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, product_id):
+        return product_id in self._positions
+
+    @classmethod
+    def empty(cls, version=None):
+        return cls({}, np.empty(0), np.empty(0, dtype='int64'), np.empty(0, dtype='int64'),
+                   np.zeros(1, dtype='int64'), np.empty(0, dtype='int8'),
+                   np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=object), version)
+
+    @classmethod
+    def from_frame(cls, df, recent=RECENT_REVIEWS):
+        """Constrói o índice ordenando uma única vez por (produto, data desc)"""
+        version = df.attrs.get('dataset_version')
+        if df.empty or 'product_id' not in df.columns:
+            return cls.empty(version)
+
+        products = df['product_id']
+        if not isinstance(products.dtype, pd.CategoricalDtype):
+            products = products.astype('category')
+        codes = products.cat.codes.to_numpy()
+        categories = products.cat.categories
+        n_products = len(categories)
+
+        scores = df['review_score'].to_numpy()
+        comments = df['review_comment_message'].to_numpy(dtype=object)
+        has_comment = df['review_comment_message'].notna().to_numpy()
+        dates = pd.to_datetime(df['review_creation_date']).to_numpy(dtype='datetime64[ns]')
+
+        # Estatísticas por produto (linhas sem produto têm código -1 e ficam de fora)
+        valid = codes >= 0
+        valid_codes = codes[valid]
+        review_counts = np.bincount(valid_codes, minlength=n_products)
+        score_sums = np.bincount(valid_codes, weights=scores[valid].astype('float64'), minlength=n_products)
+        comment_counts = np.bincount(valid_codes, weights=has_comment[valid], minlength=n_products).astype('int64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_scores = score_sums / review_counts
+
+        # Ordena por produto e, dentro dele, da data mais recente para a mais antiga (NaT por último)
+        date_keys = dates.astype('int64')
+        date_keys = np.where(np.isnat(dates), np.iinfo('int64').max, -date_keys)
+        valid_rows = np.flatnonzero(valid)
+        order = valid_rows[np.lexsort((date_keys[valid_rows], codes[valid_rows]))]
+
+        # Mantém só os N reviews mais recentes de cada produto
+        starts = np.concatenate(([0], np.cumsum(review_counts)[:-1]))
+        rank = np.arange(len(order)) - np.repeat(starts, review_counts)
+        order = order[rank < recent]
+        recent_counts = np.minimum(review_counts, recent)
+        recent_offsets = np.concatenate(([0], np.cumsum(recent_counts))).astype('int64')
+
+        positions = dict(zip(categories, range(n_products)))
+        return cls(positions, mean_scores, review_counts, comment_counts, recent_offsets,
+                   scores[order], dates[order], comments[order], version)
+
+    def is_current(self, df):
+        """Indica se o índice corresponde à versão do DataFrame"""
+        return self.version is not None and self.version == df.attrs.get('dataset_version')
+
+    def lookup(self, product_id):
+        """Resumo do produto em O(1), ou None se ele não existir"""
+        code = self._positions.get(product_id)
+        if code is None or self.review_counts[code] == 0:
+            return None
+
+        start, end = self.recent_offsets[code], self.recent_offsets[code + 1]
+        recent = [
+            (int(score), pd.Timestamp(date) if not np.isnat(date) else None,
+             comment if isinstance(comment, str) else None)
+            for score, date, comment in zip(self.recent_scores[start:end],
+                                            self.recent_dates[start:end],
+                                            self.recent_comments[start:end])
+        ]
+        return {
+            'avg_score': float(self.mean_scores[code]),
+            'total_reviews': int(self.review_counts[code]),
+            'reviews_with_comments': int(self.comment_counts[code]),
+            'recent_reviews': recent,
+        }
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armazenamento quantizado dos embeddings com re-ranqueamento
+Os vetores ficam comprimidos em memória num índice FAISS (float16, int8
+escalar por dimensão ou 1 bit por dimensão) e a busca varre os códigos; os
+melhores candidatos são reordenados com os vetores float32 completos, lidos
+de um memmap em disco (só as linhas candidatas são tocadas).
+
+| modo    | bytes/vetor (dim 384) | busca grossa                      |
+|---------|-----------------------|-----------------------------------|
+| float32 | 1536                  | exata (IndexFlat)                 |
+| float16 | 768                   | IndexScalarQuantizer QT_fp16      |
+| int8    | 384                   | IndexScalarQuantizer QT_8bit      |
+| binary  | 48                    | Hamming (IndexBinaryFlat)         |
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+MODES = ['float32', 'float16', 'int8', 'binary']
+METRICS = ['cosine', 'l2']
+# Candidatos por resultado final levados ao re-ranqueamento
+DEFAULT_RERANK_FACTOR = 10
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def _prepare(vectors, metric):
+    """float32 contíguo, normalizado quando a métrica é cosseno (sempre uma cópia)"""
+    vectors = np.array(vectors, dtype='float32', order='C', copy=True)
+    if metric == 'cosine':
+        _faiss().normalize_L2(vectors)
+    return vectors
+
+
+def _sign_bits(vectors):
+    """1 bit por dimensão (positivo -> 1), empacotado em bytes para o IndexBinaryFlat"""
+    return np.packbits(vectors > 0, axis=1)
+
+
+class QuantizedVectors:
+    """
+    index: índice FAISS com os códigos (busca grossa)
+    full_vectors: vetores originais (memmap) para o re-ranqueamento; sem eles,
+    o resultado é o da busca grossa.
+    Scores maiores são melhores: cosseno, ou -distância² na métrica l2.
+    """
+
+    def __init__(self, mode, metric, index, full_vectors=None):
+        if mode not in MODES:
+            raise ValueError(f"Modo inválido: {mode}")
+        if metric not in METRICS:
+            raise ValueError(f"Métrica inválida: {metric}")
+        if mode == 'binary' and metric != 'cosine':
+            raise ValueError("O modo binary só suporta a métrica cosine")
+        self.mode = mode
+        self.metric = metric
+        self.index = index
+        self.full_vectors = full_vectors
+
+    def __len__(self):
+        return int(self.index.ntotal)
+
+    @classmethod
+    def build(cls, vectors, mode='int8', metric='cosine', full_vectors=None):
+        """Quantiza `vectors`; `full_vectors` (padrão: os próprios vetores) serve ao re-ranqueamento"""
+        faiss = _faiss()
+        prepared = _prepare(vectors, metric)
+        dim = prepared.shape[1]
+        faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == 'cosine' else faiss.METRIC_L2
+
+        if mode == 'binary':
+            index = faiss.IndexBinaryFlat(dim if dim % 8 == 0 else dim + 8 - dim % 8)
+            index.add(_sign_bits(prepared))
+        else:
+            if mode == 'float32':
+                index = faiss.IndexFlat(dim, faiss_metric)
+            else:
+                quantizer_type = faiss.ScalarQuantizer.QT_fp16 if mode == 'float16' else faiss.ScalarQuantizer.QT_8bit
+                index = faiss.IndexScalarQuantizer(dim, quantizer_type, faiss_metric)
+                # QT_8bit: mínimo/máximo por dimensão
+                index.train(prepared)
+            index.add(prepared)
+        return cls(mode, metric, index, full_vectors if full_vectors is not None else vectors)
+
+    @property
+    def nbytes(self):
+        """Memória dos códigos (sem contar os vetores completos em disco)"""
+        if self.mode == 'binary':
+            return len(self) * self.index.code_size
+        return len(self) * self.index.sa_code_size()
+
+    # ------------------------------------------------------------------
+    # Busca
+
+    def _coarse_search(self, queries, n_candidates):
+        """(scores, linhas) da busca nos códigos; scores maiores são melhores"""
+        if self.mode == 'binary':
+            distances, rows = self.index.search(_sign_bits(queries), n_candidates)
+            return -distances.astype('float32'), rows
+        distances, rows = self.index.search(queries, n_candidates)
+        return (distances if self.metric == 'cosine' else -distances), rows
+
+    def _exact_scores(self, queries, candidates):
+        """Scores exatos contra os vetores completos das linhas candidatas (-inf onde não há candidato)"""
+        valid = candidates >= 0
+        unique_rows = np.unique(candidates[valid])
+        vectors = _prepare(self.full_vectors[unique_rows], self.metric)
+        gathered = vectors[np.searchsorted(unique_rows, np.where(valid, candidates, unique_rows[0]))]
+        if self.metric == 'cosine':
+            scores = np.einsum('qd,qcd->qc', queries, gathered)
+        else:
+            scores = -((gathered - queries[:, None, :]) ** 2).sum(axis=2)
+        return np.where(valid, scores, -np.inf)
+
+    def search(self, queries, k=10, rerank_factor=DEFAULT_RERANK_FACTOR, rerank=True):
+        """
+        Top-k de cada consulta: retorna (scores, linhas), ambos (n_consultas, k).
+        A busca grossa traz k * rerank_factor candidatos, reordenados pelos
+        vetores completos.
+        """
+        queries = _prepare(np.atleast_2d(queries), self.metric)
+        rerank = rerank and self.full_vectors is not None and self.mode != 'float32'
+        n_candidates = min(len(self), k * rerank_factor if rerank else k)
+        scores, rows = self._coarse_search(queries, n_candidates)
+        if not rerank or len(self) == 0:
+            return scores[:, :k], rows[:, :k]
+
+        exact = self._exact_scores(queries, rows)
+        top = np.argsort(-exact, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(exact, top, axis=1), np.take_along_axis(rows, top, axis=1)
+
+    # ------------------------------------------------------------------
+    # Persistência
+
+    def save(self, path):
+        """Grava o índice dos códigos e um JSON com modo e métrica ao lado"""
+        faiss = _faiss()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        if self.mode == 'binary':
+            faiss.write_index_binary(self.index, tmp_path)
+        else:
+            faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, path)
+        with open(path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+            json.dump({'mode': self.mode, 'metric': self.metric, 'ntotal': len(self)}, f, indent=2)
+
+    @classmethod
+    def load(cls, path, full_vectors=None):
+        """Carrega o que save() gravou; `full_vectors` é o memmap para o re-ranqueamento"""
+        faiss = _faiss()
+        path = Path(path)
+        with open(path.with_suffix('.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['mode'] == 'binary':
+            index = faiss.read_index_binary(str(path))
+        else:
+            index = faiss.read_index(str(path))
+        return cls(meta['mode'], meta['metric'], index, full_vectors)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache LRU com TTL dos embeddings de consulta (e dos ids do top-k)
+Chave: texto normalizado da consulta + nome do modelo. Consultas repetidas
+("entrega atrasada", "produto com defeito") não passam de novo pelo encoder.
+O cache é esvaziado quando a versão do índice muda (reconstrução).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from text_dedup import canonical_text
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL_SECONDS = 3600
+
+
+def normalize_query(text):
+    """Mesma forma canônica usada na deduplicação dos comentários"""
+    return canonical_text(text)
+
+
+class QueryCache:
+    """Cache limitado, thread-safe, com expiração por entrada e contadores"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_version = None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(query, model_name):
+        return model_name, normalize_query(query)
+
+    def bind_index(self, index_version):
+        """Associa o cache a uma versão do índice; uma versão nova invalida tudo"""
+        with self._lock:
+            if index_version != self.index_version:
+                self._entries.clear()
+                self.index_version = index_version
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._clock() - entry['created'] > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_embedding(self, query, model_name):
+        """Embedding em cache da consulta, ou None (conta hit/miss)"""
+        with self._lock:
+            entry = self._get_entry(self.key(query, model_name))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['embedding']
+
+    def put_embedding(self, query, model_name, embedding):
+        with self._lock:
+            key = self.key(query, model_name)
+            self._entries[key] = {'embedding': embedding, 'results': {}, 'created': self._clock()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_results(self, query, model_name, search_key, top_k):
+        """
+        Resultado (similaridades, ids) em cache para os filtros informados,
+        cortado nos top_k primeiros; None se o cache guarda menos que top_k (conta hit/miss)
+        """
+        with self._lock:
+            entry = self._get_entry(self.key(query, model_name))
+            results = None if entry is None else entry['results'].get(search_key)
+            if results is None or len(results[1]) < top_k:
+                self.result_misses += 1
+                return None
+            self.result_hits += 1
+            similarities, ids = results
+            return similarities[:top_k], ids[:top_k]
+
+    def put_results(self, query, model_name, search_key, results):
+        """Guarda o resultado mais profundo por filtros (um top_k menor é servido do maior)"""
+        with self._lock:
+            entry = self._entries.get(self.key(query, model_name))
+            if entry is None:
+                return
+            cached = entry['results'].get(search_key)
+            if cached is None or len(results[1]) >= len(cached[1]):
+                entry['results'][search_key] = results
+
+    def stats(self):
+        """hits/misses: cache de embeddings; result_*: cache dos resultados do top-k"""
+        total = self.hits + self.misses
+        result_total = self.result_hits + self.result_misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'result_hits': self.result_hits,
+            'result_misses': self.result_misses,
+            'result_hit_rate': self.result_hits / result_total if result_total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
@@ -6,24 +6,67 @@ Script principal para executar a aplicação de análise de sentimentos
 import sys
 import os
 import argparse
+import importlib
+import importlib.util
 import subprocess
+import time
 from pathlib import Path
 
-def check_dependencies():
-    """Verifica se as dependências estão instaladas"""
-    try:
-        import fastapi
-        import uvicorn
-        import pandas
-        import sentence_transformers
-        import faiss
-        import transformers
-        print("✅ Todas as dependências estão instaladas")
-        return True
-    except ImportError as e:
-        print(f"❌ Dependência não encontrada: {e}")
+# Dependências de cada subcomando (verificadas sem importar os módulos)
+DEPENDENCIES = {
+    'build_index': ['pandas', 'pyarrow', 'sentence_transformers', 'faiss'],
+    'start_api': ['fastapi', 'uvicorn', 'pandas'],
+}
+ALL_DEPENDENCIES = ['fastapi', 'uvicorn', 'pandas', 'pyarrow', 'sentence_transformers', 'faiss', 'transformers']
+
+def check_dependencies(modules=ALL_DEPENDENCIES):
+    """Verifica se as dependências estão instaladas (find_spec, sem importá-las)"""
+    missing = [module for module in modules if importlib.util.find_spec(module) is None]
+    if missing:
+        print(f"❌ Dependência não encontrada: {', '.join(missing)}")
         print("Execute: pip install -r requirements.txt")
         return False
+    print("✅ Todas as dependências estão instaladas")
+    return True
+
+def profile_startup():
+    """Mede o tempo de import e de carga de cada fase da inicialização"""
+    import resource
+
+    def load_dataset():
+        from dataset import load_reviews
+        return load_reviews("data/olist_order_reviews_dataset.csv")
+
+    def load_faiss_index():
+        from vector_index import INDEX_PATH, load_index
+        return load_index(INDEX_PATH)
+
+    def load_embedding_model():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer('all-MiniLM-L6-v2')
+
+    phases = [(f"import {module}", lambda module=module: importlib.import_module(module))
+              for module in ALL_DEPENDENCIES]
+    phases += [
+        ("carregar dataset", load_dataset),
+        ("carregar índice FAISS", load_faiss_index),
+        ("carregar modelo de embeddings", load_embedding_model),
+    ]
+
+    print(f"{'fase':<34} {'tempo (s)':>10} {'RSS máx. (MB)':>14}")
+    total = 0.0
+    for name, phase in phases:
+        start = time.perf_counter()
+        try:
+            phase()
+            status = ""
+        except Exception as e:
+            status = f"  ⚠️ {type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{name:<34} {elapsed:>10.3f} {rss_mb:>14.1f}{status}")
+    print(f"{'total':<34} {total:>10.3f}")
 
 def check_dataset():
     """Verifica se o dataset existe"""
@@ -35,20 +78,19 @@ def check_dataset():
         print(f"❌ Dataset não encontrado: {dataset_path}")
         return False
 
-def build_index():
-    """Constrói o índice FAISS"""
+def build_index(workers=None):
+    """Constrói o índice FAISS no próprio processo (progresso no terminal, retomável)"""
     print("🔨 Construindo índice FAISS...")
     try:
-        result = subprocess.run([sys.executable, "scripts/build_index.py"], 
-                              capture_output=True, text=True)
-        if result.returncode == 0:
-            print("✅ Índice construído com sucesso!")
-            return True
-        else:
-            print(f"❌ Erro ao construir índice: {result.stderr}")
-            return False
+        from index_build import run_build
+        run_build("data/olist_order_reviews_dataset.csv", workers=workers or os.cpu_count() or 1)
+        print("✅ Índice construído com sucesso!")
+        return True
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrompido: os shards prontos serão reaproveitados na próxima execução")
+        return False
     except Exception as e:
-        print(f"❌ Erro ao executar script: {e}")
+        print(f"❌ Erro ao construir índice: {e}")
         return False
 
 def start_api():
@@ -59,7 +101,7 @@ def start_api():
     print("⏹️  Pressione Ctrl+C para parar")
     
     try:
-        subprocess.run([sys.executable, "src/olist_reviews/api/main.py"])
+        subprocess.run([sys.executable, "api.py"])
     except KeyboardInterrupt:
         print("\n👋 API encerrada")
 
@@ -72,14 +114,31 @@ def main():
                        help="Inicia a API FastAPI")
     parser.add_argument("--full-setup", action="store_true", 
                        help="Executa setup completo (build-index + start-api)")
+    parser.add_argument("--profile-startup", action="store_true",
+                       help="Mede o tempo de import e de carga de cada fase")
+    parser.add_argument("--workers", type=int,
+                       help="Processos de codificação no --build-index (padrão: núcleos da CPU)")
     
     args = parser.parse_args()
     
     print("🚀 API de Análise de Sentimentos - Olist Reviews")
     print("=" * 50)
     
-    # Verificações iniciais
-    if not check_dependencies():
+    if args.profile_startup:
+        profile_startup()
+        return
+    
+    # Verificações iniciais (só as dependências do subcomando escolhido)
+    # (no modo interativo a verificação acontece quando a opção é escolhida)
+    if args.build_index:
+        required = DEPENDENCIES['build_index']
+    elif args.start_api:
+        required = DEPENDENCIES['start_api']
+    elif args.full_setup:
+        required = DEPENDENCIES['build_index'] + DEPENDENCIES['start_api']
+    else:
+        required = []
+    if required and not check_dependencies(required):
         sys.exit(1)
     
     if not check_dataset():
@@ -87,7 +146,7 @@ def main():
     
     # Execução baseada nos argumentos
     if args.build_index:
-        if not build_index():
+        if not build_index(args.workers):
             sys.exit(1)
     
     elif args.start_api:
@@ -95,7 +154,7 @@ def main():
     
     elif args.full_setup:
         print("🔧 Executando setup completo...")
-        if not build_index():
+        if not build_index(args.workers):
             sys.exit(1)
         start_api()
     
@@ -112,13 +171,16 @@ def main():
                 choice = input("\nDigite sua escolha (1-4): ").strip()
                 
                 if choice == "1":
-                    if not build_index():
+                    if not check_dependencies(DEPENDENCIES['build_index']) or not build_index(args.workers):
                         break
                 elif choice == "2":
-                    start_api()
+                    if check_dependencies(DEPENDENCIES['start_api']):
+                        start_api()
                     break
                 elif choice == "3":
-                    if not build_index():
+                    if not check_dependencies(DEPENDENCIES['build_index'] + DEPENDENCIES['start_api']):
+                        break
+                    if not build_index(args.workers):
                         break
                     start_api()
                     break
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Constrói o índice FAISS dos comentários dos reviews
+Uso: python scripts/build_index.py --index-type hnsw --metric cosine --workers 4
+
+Por padrão roda o pipeline de index_build.py (textos deduplicados, codificação
+em paralelo, shards retomáveis). Com --store, usa o store incremental de
+embeddings (só codifica reviews novos ou alterados desde a última execução).
+Com --index-shards N (nos dois modos), grava o índice particionado de sharded_index.py.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Permite executar a partir da raiz do repositório (python scripts/build_index.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dataset import load_reviews  # noqa: E402
+from embedding_store import DEFAULT_MODEL, EmbeddingStore, sentence_transformer_encoder  # noqa: E402
+from index_build import DEFAULT_SHARD_SIZE, DEFAULT_WORK_DIR, run_build  # noqa: E402
+from sharded_index import PARTITIONS, SHARDS_PATH, build_shards  # noqa: E402
+from vector_index import INDEX_PATH, INDEX_TYPES, METRICS, build_index, index_params, save_index  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Constrói o índice FAISS dos reviews")
+    parser.add_argument("--csv", default="data/olist_order_reviews_dataset.csv")
+    parser.add_argument("--store", help="Diretório do store de embeddings (modo incremental)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--output", default=INDEX_PATH)
+    parser.add_argument("--workers", type=int, default=1, help="Processos de codificação")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Textos únicos por shard")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="Diretório dos shards (retomada)")
+    parser.add_argument("--index-shards", type=int, default=1,
+                        help="Particiona o índice em N shards (um processo por shard na busca)")
+    parser.add_argument("--partition", choices=PARTITIONS, default='hash',
+                        help="Shards por hash do review_id ou por faixa de data")
+    parser.add_argument("--index-type", choices=INDEX_TYPES)
+    parser.add_argument("--metric", choices=METRICS)
+    parser.add_argument("--nlist", type=int, help="IVF: número de listas (centróides)")
+    parser.add_argument("--nprobe", type=int, help="IVF: listas visitadas por busca")
+    parser.add_argument("--pq-m", type=int, help="IVF-PQ: subquantizadores")
+    parser.add_argument("--pq-bits", type=int, help="IVF-PQ: bits por código")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW: vizinhos por nó (M)")
+    parser.add_argument("--ef-construction", type=int, help="HNSW: efConstruction")
+    parser.add_argument("--ef-search", type=int, help="HNSW: efSearch")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = index_params(index_type=args.index_type, metric=args.metric, nlist=args.nlist,
+                          nprobe=args.nprobe, pq_m=args.pq_m, pq_bits=args.pq_bits,
+                          hnsw_m=args.hnsw_m, ef_construction=args.ef_construction,
+                          ef_search=args.ef_search)
+
+    output = args.output
+    if args.index_shards > 1 and output == INDEX_PATH:
+        output = SHARDS_PATH
+
+    if not args.store:
+        run_build(args.csv, output, args.model, params, workers=args.workers,
+                  shard_size=args.shard_size, work_dir=args.work_dir,
+                  index_shards=args.index_shards, partition=args.partition)
+        print(f"✅ Índice salvo em {output}")
+        return 0
+
+    columns = ['review_id', 'review_comment_message']
+    if args.index_shards > 1 and args.partition == 'time':
+        columns.append('review_creation_date')
+    df = load_reviews(args.csv, columns=columns)
+    df = df.dropna(subset=['review_comment_message'])
+    df = df[df['review_comment_message'].str.strip() != '']
+    print(f"📥 {len(df)} comentários")
+
+    store = EmbeddingStore.open(args.store, args.model)
+    stats = store.sync(df['review_id'].astype(str), df['review_comment_message'],
+                       sentence_transformer_encoder(args.model))
+    print(f"🧮 Embeddings: {stats['embedded']} novos ({stats['copied']} copiados, {stats['encoded']} textos únicos), "
+          f"{stats['reused']} reaproveitados")
+
+    rows = store.alive_rows()
+    start = time.perf_counter()
+    if args.index_shards > 1:
+        dates = None
+        if args.partition == 'time':
+            dates = pd.to_datetime(df.drop_duplicates('review_id').set_index('review_id')['review_creation_date']
+                                   .reindex(rows['review_id'].astype(str)), errors='coerce').to_numpy()
+        manifest = build_shards(store.vectors[rows['row'].to_numpy()], rows['review_id'].to_numpy(), params,
+                                args.index_shards, args.partition, dates, output)
+        print(f"🔨 Índice {params['index_type']} ({params['metric']}) em {args.index_shards} shards "
+              f"({args.partition}) com {sum(shard['ntotal'] for shard in manifest['shards'])} vetores "
+              f"em {time.perf_counter() - start:.1f}s")
+        print(f"✅ Índice salvo em {output}")
+        return 0
+
+    index = build_index(store.vectors[rows['row'].to_numpy()], params)
+    print(f"🔨 Índice {params['index_type']} ({params['metric']}) com {index.ntotal} vetores "
+          f"em {time.perf_counter() - start:.1f}s")
+
+    save_index(index, params, rows['review_id'], args.output)
+    print(f"✅ Índice salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
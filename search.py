@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camada de busca semântica sobre o índice FAISS dos reviews
+Codifica e busca um lote de consultas numa única chamada, aplica filtros
+por nota, data e produto antes da busca (ID selectors do FAISS) e descarta
+resultados abaixo do similarity_threshold
+"""
+
+import numpy as np
+import pandas as pd
+
+from dataset import load_reviews
+from lexical_index import LEXICAL_PATH, LexicalIndex
+from vector_index import INDEX_PATH, load_index, prepare_vectors
+
+METADATA_COLUMNS = ['review_id', 'review_comment_message', 'review_score',
+                    'review_creation_date', 'product_id']
+
+# Abaixo deste número de candidatos o filtro é resolvido por busca exata no subconjunto
+EXACT_SUBSET_LIMIT = 4096
+
+# Reciprocal rank fusion: score = soma de 1 / (RRF_K + posição) em cada lista
+RRF_K = 60
+# Candidatos trazidos de cada busca (lexical e vetorial) para a fusão
+RRF_DEPTH = 50
+# Consultas com até este número de termos, todos presentes juntos em pelo menos
+# top_k comentários, são respondidas só pelo índice lexical (sem o encoder)
+LEXICAL_MAX_TERMS = 3
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+class SemanticSearcher:
+    """Índice + metadados alinhados às posições do índice + função de codificação"""
+
+    def __init__(self, index, params, metadata, encode, model_name=None, cache=None):
+        self.index = index
+        self.params = params
+        self.metadata = metadata.reset_index(drop=True)
+        self.encode = encode
+        self.model_name = model_name
+        self.cache = cache
+        if cache is not None:
+            cache.bind_index(params.get('version'))
+        self._scores = self.metadata['review_score'].to_numpy()
+        self._dates = self.metadata['review_creation_date'].to_numpy(dtype='datetime64[ns]')
+        self._ivf = None
+        if params['index_type'] in ('ivf_flat', 'ivf_pq'):
+            self._ivf = _faiss().extract_index_ivf(index)
+            # Permite reconstruct() para a busca exata em subconjuntos pequenos
+            self._ivf.make_direct_map()
+
+    @classmethod
+    def load(cls, encode, index_path=INDEX_PATH, csv_path='data/olist_order_reviews_dataset.csv',
+             model_name=None, cache=None):
+        """Carrega o índice gravado por vector_index.save_index() e os metadados do CSV"""
+        index, params, review_ids = load_index(index_path)
+        if review_ids is None:
+            raise ValueError(f"{index_path} não tem o mapa de review_ids; reconstrua o índice")
+        df = load_reviews(csv_path)
+        columns = [col for col in METADATA_COLUMNS if col in df.columns]
+        df = df[columns].astype({'review_id': 'object'}).drop_duplicates('review_id', keep='last')
+        metadata = df.set_index('review_id').reindex(pd.Index(review_ids, name='review_id')).reset_index()
+        return cls(index, params, metadata, encode, model_name, cache)
+
+    # ------------------------------------------------------------------
+    # Filtros
+
+    def filter_mask(self, min_score=None, max_score=None, date_from=None, date_to=None, product_ids=None):
+        """Máscara booleana (posições do índice) dos reviews que passam nos filtros, ou None"""
+        if all(value is None for value in (min_score, max_score, date_from, date_to, product_ids)):
+            return None
+        mask = np.ones(len(self.metadata), dtype=bool)
+        if min_score is not None:
+            mask &= self._scores >= min_score
+        if max_score is not None:
+            mask &= self._scores <= max_score
+        if date_from is not None:
+            mask &= self._dates >= np.datetime64(pd.Timestamp(date_from), 'ns')
+        if date_to is not None:
+            mask &= self._dates <= np.datetime64(pd.Timestamp(date_to), 'ns')
+        if product_ids is not None:
+            if 'product_id' not in self.metadata.columns:
+                return np.zeros(len(self.metadata), dtype=bool)
+            if isinstance(product_ids, str):
+                product_ids = [product_ids]
+            mask &= self.metadata['product_id'].isin(product_ids).to_numpy()
+        return mask
+
+    def _search_params(self, selector):
+        faiss = _faiss()
+        if self._ivf is not None:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.params['nprobe'])
+        if self.params['index_type'] == 'hnsw':
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.params['ef_search'])
+        return faiss.SearchParameters(sel=selector)
+
+    def _exact_subset(self, query_vectors, candidates, k):
+        """Busca exata restrita aos candidatos (filtros muito seletivos)"""
+        subset = self.index.reconstruct_batch(candidates.astype('int64'))
+        scores = query_vectors @ subset.T
+        if self.params['metric'] == 'cosine':
+            order = np.argsort(-scores, axis=1)[:, :k]
+        else:
+            # ||q - s||² = ||q||² - 2 q·s + ||s||²
+            scores = (query_vectors ** 2).sum(axis=1)[:, None] - 2 * scores + (subset ** 2).sum(axis=1)[None, :]
+            order = np.argsort(scores, axis=1)[:, :k]
+        return np.take_along_axis(scores, order, axis=1), candidates[order]
+
+    # ------------------------------------------------------------------
+    # Busca
+
+    def similarity(self, distances):
+        """
+        Converte a saída do FAISS em similaridade de cosseno.
+        Com métrica L2 assume embeddings normalizados (caso do all-MiniLM-L6-v2):
+        cos = 1 - d²/2, sendo d² a distância que o FAISS retorna.
+        """
+        if self.params['metric'] == 'cosine':
+            return distances
+        return 1.0 - distances / 2.0
+
+    def search_vectors(self, query_vectors, top_k=5, mask=None):
+        """Busca um lote de vetores; retorna (similaridades, posições), -1 onde não há resultado"""
+        query_vectors = prepare_vectors(query_vectors, self.params)
+        if mask is None:
+            distances, ids = self.index.search(query_vectors, top_k)
+            return self.similarity(distances), ids
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            empty = np.full((len(query_vectors), top_k), -1, dtype='int64')
+            return np.full(empty.shape, -np.inf, dtype='float32'), empty
+        if len(candidates) <= EXACT_SUBSET_LIMIT:
+            k = min(top_k, len(candidates))
+            distances, ids = self._exact_subset(query_vectors, candidates, k)
+            if k < top_k:
+                pad = ((0, 0), (0, top_k - k))
+                distances = np.pad(distances, pad, constant_values=np.nan)
+                ids = np.pad(ids, pad, constant_values=-1)
+        else:
+            faiss = _faiss()
+            # O bitmap precisa continuar referenciado enquanto a busca roda
+            bitmap = np.packbits(mask, bitorder='little')
+            selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+            distances, ids = self.index.search(query_vectors, top_k, params=self._search_params(selector))
+        return self.similarity(distances), ids
+
+    def search(self, queries, top_k=5, similarity_threshold=None, **filters):
+        """
+        Busca um lote de consultas (uma string também é aceita).
+        Filtros: min_score, max_score, date_from, date_to, product_ids.
+        Retorna uma lista de DataFrames (um por consulta) com a coluna 'similarity'.
+        """
+        return [self._results_frame(row_sims, row_ids, similarity_threshold)
+                for row_sims, row_ids in self.search_ids(queries, top_k, **filters)]
+
+    def search_ids(self, queries, top_k=5, **filters):
+        """Como search(), mas retorna [(similaridades, posições)] por consulta, sem montar os DataFrames"""
+        if isinstance(queries, str):
+            queries = [queries]
+        queries = list(queries)
+        if self.cache is None:
+            query_vectors = np.asarray(self.encode(queries), dtype='float32')
+            similarities, ids = self.search_vectors(query_vectors, top_k, self.filter_mask(**filters))
+            return list(zip(similarities, ids))
+
+        search_key = _search_key(filters)
+        embeddings = [self.cache.get_embedding(query, self.model_name) for query in queries]
+        results = [self.cache.get_results(query, self.model_name, search_key, top_k) if embedding is not None
+                   else None
+                   for query, embedding in zip(queries, embeddings)]
+
+        # Só as consultas fora do cache passam pelo encoder (em um único lote)
+        to_encode = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if to_encode:
+            encoded = np.asarray(self.encode([queries[i] for i in to_encode]), dtype='float32')
+            for i, vector in zip(to_encode, encoded):
+                embeddings[i] = vector
+                self.cache.put_embedding(queries[i], self.model_name, vector)
+
+        to_search = [i for i, result in enumerate(results) if result is None]
+        if to_search:
+            query_vectors = np.stack([embeddings[i] for i in to_search])
+            similarities, ids = self.search_vectors(query_vectors, top_k, self.filter_mask(**filters))
+            for i, row_sims, row_ids in zip(to_search, similarities, ids):
+                results[i] = (row_sims, row_ids)
+                self.cache.put_results(queries[i], self.model_name, search_key, results[i])
+
+        return results
+
+    def _results_frame(self, similarities, ids, similarity_threshold=None):
+        keep = ids >= 0
+        if similarity_threshold is not None:
+            keep &= similarities >= similarity_threshold
+        results = self.metadata.iloc[ids[keep]].copy()
+        results['similarity'] = similarities[keep]
+        return results.reset_index(drop=True)
+
+
+class HybridSearcher:
+    """
+    Busca lexical (BM25) + vetorial fundidas por reciprocal rank fusion.
+    Consultas curtas de termos exatos vão direto ao índice lexical.
+    """
+
+    def __init__(self, semantic, lexical, rrf_k=RRF_K, depth=RRF_DEPTH, lexical_max_terms=LEXICAL_MAX_TERMS):
+        self.semantic = semantic
+        self.lexical = lexical
+        self.metadata = semantic.metadata
+        self.rrf_k = rrf_k
+        self.depth = depth
+        self.lexical_max_terms = lexical_max_terms
+        # Posição no índice lexical -> posição no índice vetorial (-1 quando o review não está nele)
+        if lexical.review_ids is None:
+            self._to_vector = np.arange(len(lexical))
+        else:
+            positions = pd.Series(np.arange(len(self.metadata)), index=self.metadata['review_id'].astype(str))
+            positions = positions[~positions.index.duplicated()]
+            self._to_vector = positions.reindex(pd.Index(lexical.review_ids).astype(str)).fillna(-1) \
+                .to_numpy(dtype='int64')
+
+    @classmethod
+    def load(cls, encode, index_path=INDEX_PATH, lexical_path=LEXICAL_PATH,
+             csv_path='data/olist_order_reviews_dataset.csv', model_name=None, cache=None):
+        """Carrega os dois índices gravados (vector_index.save_index e LexicalIndex.save)"""
+        semantic = SemanticSearcher.load(encode, index_path, csv_path, model_name, cache)
+        return cls(semantic, LexicalIndex.load(lexical_path))
+
+    def _lexical_hits(self, term_ids, mask, top_k, require_all=False):
+        """(scores BM25, posições no índice vetorial) dos melhores documentos lexicais"""
+        lexical_mask = self._to_vector >= 0
+        if mask is not None:
+            lexical_mask &= mask[np.maximum(self._to_vector, 0)]
+        scores, rows = self.lexical.search_terms(term_ids, top_k, lexical_mask, require_all)
+        rows = self._to_vector[rows]
+        # review_id repetido no CSV: fica a primeira ocorrência (a de maior score)
+        _, first = np.unique(rows, return_index=True)
+        first.sort()
+        return scores[first], rows[first]
+
+    def search(self, queries, top_k=5, similarity_threshold=None, mode='auto', **filters):
+        """
+        Busca um lote de consultas; mode: 'auto' (lexical para termos exatos
+        curtos, híbrida nas demais), 'hybrid', 'lexical' ou 'vector'.
+        similarity_threshold descarta candidatos vetoriais antes da fusão.
+        Retorna um DataFrame por consulta com as colunas 'score', 'bm25',
+        'similarity' e 'retriever'.
+        """
+        if mode not in ('auto', 'hybrid', 'lexical', 'vector'):
+            raise ValueError(f"Modo de busca inválido: {mode}")
+        if isinstance(queries, str):
+            queries = [queries]
+        queries = list(queries)
+        if mode == 'vector':
+            return self.semantic.search(queries, top_k, similarity_threshold, **filters)
+
+        mask = self.semantic.filter_mask(**filters)
+        results = [None] * len(queries)
+        lexical = []
+        for i, query in enumerate(queries):
+            term_ids, missing = self.lexical.lookup(query)
+            if mode == 'lexical':
+                results[i] = self._lexical_frame(*self._lexical_hits(term_ids, mask, top_k))
+                continue
+            if mode == 'auto' and 0 < len(term_ids) <= self.lexical_max_terms and not missing:
+                scores, rows = self._lexical_hits(term_ids, mask, top_k, require_all=True)
+                if len(rows) >= top_k:
+                    results[i] = self._lexical_frame(scores, rows)
+                    continue
+            lexical.append((i, self._lexical_hits(term_ids, mask, self.depth)))
+
+        if lexical:
+            # Uma única passada do encoder para todas as consultas híbridas
+            hybrid_queries = [queries[i] for i, _ in lexical]
+            vector_hits = self.semantic.search_ids(hybrid_queries, self.depth, **filters)
+            for (i, lexical_hits), (similarities, rows) in zip(lexical, vector_hits):
+                keep = rows >= 0
+                if similarity_threshold is not None:
+                    keep &= similarities >= similarity_threshold
+                results[i] = self._fused_frame(lexical_hits, (similarities[keep], rows[keep]), top_k)
+        return results
+
+    def _fused_frame(self, lexical_hits, vector_hits, top_k):
+        """Reciprocal rank fusion das duas listas de candidatos"""
+        bm25, lexical_rows = lexical_hits
+        similarities, vector_rows = vector_hits
+        rows = np.concatenate([lexical_rows, vector_rows])
+        ranks = np.concatenate([np.arange(len(lexical_rows)), np.arange(len(vector_rows))])
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        fused = np.bincount(inverse, weights=1.0 / (self.rrf_k + 1 + ranks))
+        top = np.lexsort((candidates, -fused))[:top_k]
+        candidates = candidates[top]
+
+        frame = self.metadata.iloc[candidates].copy()
+        frame['score'] = fused[top]
+        frame['bm25'] = pd.Series(bm25, index=lexical_rows).reindex(candidates).to_numpy()
+        frame['similarity'] = pd.Series(similarities, index=vector_rows).reindex(candidates).to_numpy()
+        in_lexical = np.isin(candidates, lexical_rows)
+        in_vector = np.isin(candidates, vector_rows)
+        frame['retriever'] = np.where(in_lexical & in_vector, 'hybrid', np.where(in_lexical, 'lexical', 'vector'))
+        return frame.reset_index(drop=True)
+
+    def _lexical_frame(self, bm25, rows):
+        frame = self.metadata.iloc[rows].copy()
+        frame['score'] = bm25
+        frame['bm25'] = bm25
+        frame['similarity'] = np.nan
+        frame['retriever'] = 'lexical'
+        return frame.reset_index(drop=True)
+
+
+def _search_key(filters):
+    """Chave hashable dos filtros (para o cache de resultados; o top_k fica de fora)"""
+    items = []
+    for name, value in sorted(filters.items()):
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+            value = tuple(sorted(str(v) for v in value))
+        items.append((name, str(value)))
+    return tuple(items)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Job em lote de classificação de sentimento dos comentários
+Lê o CSV em blocos, deduplica os comentários de cada bloco, ordena os textos
+únicos pelo tamanho em tokens (menos padding), classifica em batches na CPU e
+grava os resultados num arquivo JSONL só de append. Um checkpoint permite retomar do último bloco concluído.
+
+Uso: python sentiment_batch.py --csv data/olist_order_reviews_dataset.csv --output data/sentiment.jsonl
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from text_dedup import TextDedup
+
+DEFAULT_MODEL = 'cardiffnlp/twitter-roberta-base-sentiment'
+
+# Rótulos do modelo cardiffnlp -> sentimento
+LABELS = {'LABEL_0': 'negativo', 'LABEL_1': 'neutro', 'LABEL_2': 'positivo',
+          'negative': 'negativo', 'neutral': 'neutro', 'positive': 'positivo'}
+
+
+def load_classifier(model=DEFAULT_MODEL, threads=None, max_length=128):
+    """
+    Pipeline de sentimento na CPU. `model` pode ser um nome do Hub ou um
+    diretório local (ex.: um modelo pequeno salvo com save_pretrained, sem rede).
+    """
+    import torch
+    from transformers import pipeline
+
+    if threads:
+        torch.set_num_threads(threads)
+    return pipeline("sentiment-analysis", model=model, tokenizer=model, device=-1,
+                    top_k=None, truncation=True, max_length=max_length)
+
+
+def token_lengths(classifier, texts):
+    """Tamanho em tokens de cada texto (ou em palavras se não houver tokenizer)"""
+    tokenizer = getattr(classifier, 'tokenizer', None)
+    if tokenizer is None:
+        return np.array([len(text.split()) for text in texts])
+    encoded = tokenizer(list(texts), add_special_tokens=True, truncation=True)['input_ids']
+    return np.array([len(ids) for ids in encoded])
+
+
+def classify_chunk(classifier, texts, batch_size):
+    """Classifica os textos ordenados por tamanho e devolve na ordem original"""
+    order = np.argsort(token_lengths(classifier, texts), kind='stable')
+    sorted_texts = [texts[i] for i in order]
+    outputs = []
+    for start in range(0, len(sorted_texts), batch_size):
+        outputs.extend(classifier(sorted_texts[start:start + batch_size], batch_size=batch_size))
+    results = [None] * len(texts)
+    for position, output in zip(order, outputs):
+        results[position] = output
+    return results
+
+
+def _to_record(review_id, output):
+    scores = {LABELS.get(item['label'], item['label']): round(float(item['score']), 6) for item in output}
+    label = max(scores, key=scores.get)
+    return {'review_id': review_id, 'sentiment': label, 'score': scores[label], 'scores': scores}
+
+
+class Checkpoint:
+    """Estado do job: blocos concluídos e tamanho válido do arquivo de resultados"""
+
+    def __init__(self, path, source, model, chunk_size):
+        self.path = Path(path)
+        self.state = {'source': source, 'model': model, 'chunk_size': chunk_size,
+                      'chunks_done': 0, 'rows_done': 0, 'output_bytes': 0}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Os blocos concluídos só valem com o mesmo tamanho de bloco
+        if any(saved.get(key) != self.state[key] for key in ('source', 'model', 'chunk_size')):
+            print("Aviso: checkpoint de outra fonte/modelo/tamanho de bloco ignorado; recomeçando.")
+            return False
+        self.state = saved
+        return True
+
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def run(csv_path, output_path, classifier, model_name, chunk_size=5000, batch_size=32,
+        checkpoint_path=None, resume=True, text_column='review_comment_message'):
+    """Executa (ou retoma) o job; retorna o número de linhas classificadas nesta execução"""
+    from dataset import file_sha1
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(checkpoint_path or f'{output_path}.checkpoint.json',
+                            source=file_sha1(csv_path), model=model_name, chunk_size=chunk_size)
+    resumed = resume and checkpoint.load()
+    if resumed:
+        print(f"↩️  Retomando após o bloco {checkpoint.state['chunks_done']} "
+              f"({checkpoint.state['rows_done']} linhas)")
+
+    # Descarta o que foi escrito depois do último bloco confirmado
+    with open(output_path, 'ab') as f:
+        f.truncate(checkpoint.state['output_bytes'] if resumed else 0)
+
+    rows_this_run = unique_this_run = 0
+    start = time.perf_counter()
+    reader = pd.read_csv(csv_path, usecols=['review_id', text_column], dtype=str, chunksize=chunk_size)
+    for chunk_number, chunk in enumerate(reader):
+        if chunk_number < checkpoint.state['chunks_done']:
+            continue
+
+        chunk = chunk.dropna(subset=[text_column])
+        chunk = chunk[chunk[text_column].str.strip() != '']
+        # Comentários repetidos no bloco são classificados uma única vez
+        dedup = TextDedup.from_texts(chunk[text_column])
+        outputs = dedup.map(lambda texts: classify_chunk(classifier, texts, batch_size))
+
+        lines = [json.dumps(_to_record(review_id, output), ensure_ascii=False)
+                 for review_id, output in zip(chunk['review_id'], outputs)]
+        with open(output_path, 'a', encoding='utf-8') as f:
+            if lines:
+                f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            output_bytes = f.tell()
+
+        rows_this_run += len(lines)
+        unique_this_run += len(dedup.unique)
+        checkpoint.state.update(chunks_done=chunk_number + 1,
+                                rows_done=checkpoint.state['rows_done'] + len(lines),
+                                output_bytes=output_bytes)
+        checkpoint.save()
+        elapsed = time.perf_counter() - start
+        print(f"✅ Bloco {chunk_number + 1}: {checkpoint.state['rows_done']} linhas "
+              f"({rows_this_run / elapsed:.1f} linhas/s, "
+              f"{1 - unique_this_run / rows_this_run if rows_this_run else 0:.1%} duplicados)")
+
+    return rows_this_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classificação de sentimento em lote (CPU)")
+    parser.add_argument("--csv", default="data/olist_order_reviews_dataset.csv")
+    parser.add_argument("--output", default="data/sentiment.jsonl")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Nome do modelo ou diretório local")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, help="Threads intra-op do torch")
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: <output>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e recomeça")
+    args = parser.parse_args()
+
+    classifier = load_classifier(args.model, args.threads)
+    rows = run(args.csv, args.output, classifier, args.model, args.chunk_size, args.batch_size,
+               args.checkpoint, resume=not args.restart)
+    print(f"🏁 {rows} comentários classificados nesta execução")
+
+
+if __name__ == "__main__":
+    main()
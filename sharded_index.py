@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice vetorial particionado em shards, servidos por processos separados
+O corpus é dividido em N shards (por hash do review_id ou por faixas de data)
+e cada shard é gravado como um índice FAISS completo (vector_index.save_index).
+Na busca, um processo por shard carrega só o seu pedaço; o coordenador envia a
+consulta a todos, junta os top-k de cada um e, se um shard estiver lento ou
+morto, devolve o resultado parcial ao fim do timeout.
+"""
+
+import heapq
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from vector_index import build_index, load_index, prepare_vectors, save_index
+
+SHARDS_PATH = 'indice_reviews_shards'
+PARTITIONS = ['hash', 'time']
+# Tempo máximo de espera pelas respostas dos shards numa busca (segundos)
+DEFAULT_SHARD_TIMEOUT = 2.0
+# Tempo máximo para todos os shards carregarem o índice na inicialização (segundos)
+DEFAULT_LOAD_TIMEOUT = 300.0
+# Intervalo entre as checagens de processos vivos durante a carga
+LOAD_POLL_INTERVAL = 0.5
+SHARDS_FORMAT_VERSION = 1
+
+
+def hash_partition(review_ids, n_shards):
+    """Shard de cada review pelo hash estável do review_id"""
+    hashes = pd.util.hash_pandas_object(pd.Series(review_ids, dtype='object').astype(str), index=False)
+    return (hashes.to_numpy() % np.uint64(n_shards)).astype('int64')
+
+
+def time_partition(dates, n_shards):
+    """Shard de cada review por faixas de data com o mesmo número de reviews; retorna (shards, limites)"""
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    valid = dates[~np.isnat(dates)]
+    if len(valid) == 0:
+        raise ValueError("Particionamento por tempo exige review_creation_date")
+    quantiles = np.quantile(valid.astype('int64'), np.linspace(0, 1, n_shards + 1)[1:-1])
+    boundaries = quantiles.astype('int64').astype('datetime64[ns]')
+    # Sem data vai para o primeiro shard
+    shards = np.searchsorted(boundaries, np.where(np.isnat(dates), valid.min(), dates), side='right')
+    return shards.astype('int64'), boundaries
+
+
+def _manifest_path(directory):
+    return Path(directory) / 'shards.json'
+
+
+def _shard_path(directory, shard):
+    return Path(directory) / f'shard_{shard:03d}.faiss'
+
+
+def build_shards(vectors, review_ids, params, n_shards, partition='hash', dates=None, directory=SHARDS_PATH):
+    """Particiona os vetores e grava um índice por shard mais o manifest (shards.json)"""
+    if partition not in PARTITIONS:
+        raise ValueError(f"Particionamento inválido: {partition}")
+    review_ids = pd.Series(review_ids, dtype='object').to_numpy()
+    boundaries = None
+    if partition == 'hash':
+        shard_of = hash_partition(review_ids, n_shards)
+    else:
+        shard_of, boundaries = time_partition(dates, n_shards)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    shards = []
+    for shard in range(n_shards):
+        rows = np.flatnonzero(shard_of == shard)
+        if len(rows) == 0:
+            raise ValueError(f"Shard {shard} ficou vazio; use menos shards")
+        # build_index ajusta nlist ao tamanho do shard: cada shard recebe sua cópia dos parâmetros
+        shard_params = dict(params)
+        index = build_index(vectors[rows], shard_params)
+        save_index(index, shard_params, review_ids[rows], _shard_path(directory, shard))
+        shards.append({'path': _shard_path(directory, shard).name, 'ntotal': int(index.ntotal)})
+
+    manifest = {'format': SHARDS_FORMAT_VERSION, 'partition': partition, 'n_shards': n_shards,
+                'metric': params['metric'], 'index_type': params['index_type'], 'shards': shards,
+                'boundaries': [str(boundary) for boundary in boundaries] if boundaries is not None else None,
+                'version': uuid.uuid4().hex}
+    tmp_path = _manifest_path(directory).with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, _manifest_path(directory))
+    return manifest
+
+
+def load_manifest(directory=SHARDS_PATH):
+    with open(_manifest_path(directory), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _similarity(distances, params):
+    """Mesma conversão de SemanticSearcher.similarity (maior = mais parecido)"""
+    if params['metric'] == 'cosine':
+        return distances
+    return 1.0 - distances / 2.0
+
+
+def _shard_main(shard, index_path, threads, requests, responses):
+    """Processo de um shard: carrega o índice uma vez e responde às buscas"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    try:
+        import faiss
+        faiss.omp_set_num_threads(threads)
+        index, params, review_ids = load_index(index_path)
+    except Exception as e:
+        responses.put(('load_error', shard, None, repr(e)))
+        return
+    responses.put(('ready', shard, None, int(index.ntotal)))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, query_vectors, k = request
+        try:
+            distances, ids = index.search(prepare_vectors(query_vectors, params), k)
+            hits = np.where(ids >= 0, review_ids[np.maximum(ids, 0)], None)
+            responses.put(('ok', shard, request_id, (_similarity(distances, params), hits)))
+        except Exception as e:
+            responses.put(('error', shard, request_id, repr(e)))
+
+
+@dataclass
+class ShardedResult:
+    """
+    similarities / review_ids: (n_consultas, k), ordenados do mais parecido;
+    posições sem resultado têm -inf / None.
+    missing_shards: shards que não responderam a tempo (resultado parcial).
+    """
+    similarities: np.ndarray
+    review_ids: np.ndarray
+    missing_shards: list
+
+    @property
+    def partial(self):
+        return bool(self.missing_shards)
+
+
+class ShardCoordinator:
+    """
+    Um processo por shard; search() envia as consultas a todos (scatter) e
+    junta os top-k (gather). Pode ser usado por várias threads ao mesmo tempo.
+    """
+
+    def __init__(self, directory=SHARDS_PATH, timeout=DEFAULT_SHARD_TIMEOUT, threads_per_shard=None,
+                 start_method='spawn', load_timeout=DEFAULT_LOAD_TIMEOUT):
+        self.directory = Path(directory)
+        self.manifest = load_manifest(directory)
+        self.timeout = timeout
+        n_shards = self.manifest['n_shards']
+        self.threads_per_shard = threads_per_shard or max(1, (os.cpu_count() or 1) // n_shards)
+        self._closed = False
+        context = mp.get_context(start_method)
+        self._responses = context.Queue()
+        self._requests = [context.Queue() for _ in range(n_shards)]
+        self._processes = [
+            context.Process(target=_shard_main, daemon=True,
+                            args=(shard, str(self.directory / entry['path']), self.threads_per_shard,
+                                  self._requests[shard], self._responses))
+            for shard, entry in enumerate(self.manifest['shards'])
+        ]
+        for process in self._processes:
+            process.start()
+        self._wait_ready(load_timeout)
+
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _wait_ready(self, load_timeout):
+        """
+        Espera todos os shards carregarem o índice; falha se algum shard
+        reportar erro, morrer durante a carga ou não ficar pronto no prazo
+        """
+        deadline = time.monotonic() + load_timeout
+        ready = set()
+        dead_before = set()
+        while len(ready) < len(self._processes):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                waiting = sorted(set(range(len(self._processes))) - ready)
+                raise TimeoutError(f"Shards {waiting} não carregaram o índice em {load_timeout:.0f}s")
+            try:
+                status, shard, _, payload = self._responses.get(timeout=min(LOAD_POLL_INTERVAL, remaining))
+            except queue.Empty:
+                # Um shard só é dado como morto na segunda checagem: a mensagem de erro
+                # enviada antes de o processo sair pode chegar logo depois
+                dead = {shard for shard, process in enumerate(self._processes)
+                        if shard not in ready and not process.is_alive()}
+                failed = sorted(dead & dead_before)
+                if failed:
+                    self.close()
+                    shard = failed[0]
+                    raise RuntimeError(f"Shard {shard} ({self.manifest['shards'][shard]['path']}) encerrou "
+                                       f"durante a carga do índice (exitcode {self._processes[shard].exitcode})")
+                dead_before = dead
+                continue
+            if status == 'load_error':
+                self.close()
+                raise RuntimeError(f"Falha ao carregar o shard {shard}: {payload}")
+            ready.add(shard)
+
+    def _collect(self):
+        """Encaminha cada resposta à busca que a pediu (respostas atrasadas são descartadas)"""
+        while not self._closed:
+            try:
+                status, shard, request_id, payload = self._responses.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                pending = self._pending.get(request_id)
+                if pending is None:
+                    continue
+                pending['answers'][shard] = (status, payload)
+                if len(pending['answers']) == pending['expected']:
+                    pending['done'].set()
+
+    def alive_shards(self):
+        return [shard for shard, process in enumerate(self._processes) if process.is_alive()]
+
+    def search(self, query_vectors, k=10, timeout=None):
+        """Busca um lote de vetores em todos os shards vivos; retorna um ShardedResult"""
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype='float32'))
+        timeout = self.timeout if timeout is None else timeout
+        alive = self.alive_shards()
+        request_id = next(self._ids)
+        pending = {'expected': len(alive), 'answers': {}, 'done': threading.Event()}
+        with self._lock:
+            self._pending[request_id] = pending
+        try:
+            for shard in alive:
+                self._requests[shard].put((request_id, query_vectors, k))
+            if alive:
+                pending['done'].wait(timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+                answers = dict(pending['answers'])
+
+        ok = {shard: payload for shard, (status, payload) in answers.items() if status == 'ok'}
+        missing = sorted(set(range(len(self._processes))) - set(ok))
+        similarities, review_ids = self._merge(list(ok.values()), len(query_vectors), k)
+        return ShardedResult(similarities, review_ids, missing)
+
+    @staticmethod
+    def _merge(shard_results, n_queries, k):
+        """Junta as listas top-k já ordenadas de cada shard (heap merge) e mantém as k melhores"""
+        similarities = np.full((n_queries, k), -np.inf, dtype='float32')
+        review_ids = np.full((n_queries, k), None, dtype=object)
+        for query in range(n_queries):
+            lists = [zip(sims[query], ids[query]) for sims, ids in shard_results]
+            merged = heapq.merge(*lists, key=lambda hit: -hit[0])
+            hits = list(itertools.islice((hit for hit in merged if hit[1] is not None), k))
+            for rank, (similarity, review_id) in enumerate(hits):
+                similarities[query, rank] = similarity
+                review_ids[query, rank] = review_id
+        return similarities, review_ids
+
+    def close(self):
+        self._closed = True
+        for shard, process in enumerate(self._processes):
+            if process.is_alive():
+                self._requests[shard].put(None)
+        deadline = time.monotonic() + 10
+        for process in self._processes:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumo map-reduce dos reviews de um produto
+Todos os reviews são divididos em blocos dentro do orçamento de tokens do
+modelo, resumidos em batches (map) e os resumos parciais são resumidos de novo
+até caber num único bloco (reduce). Pontos positivos e negativos saem dos
+clusters de embeddings dos reviews de cada polaridade. O resultado é guardado
+em cache pelo hash do conjunto de reviews.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from text_dedup import TextDedup
+
+# Orçamento por bloco abaixo do limite de 1024 tokens do BART (sobra para o prompt)
+DEFAULT_CHUNK_TOKENS = 700
+MAX_POINTS = 3
+MAX_POINT_CHARS = 90
+
+
+def approx_token_count(text):
+    """Estimativa de tokens sem tokenizer (~1,3 token por palavra em português)"""
+    return int(len(text.split()) * 1.3) + 1
+
+
+def tokenizer_counter(tokenizer):
+    """Contador de tokens exato a partir de um tokenizer Hugging Face"""
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def pipeline_summarize(summarizer, max_length=130, min_length=30, batch_size=8):
+    """Adapta um pipeline("summarization") para a assinatura lista -> lista de textos"""
+    def summarize(texts):
+        outputs = summarizer(list(texts), max_length=max_length, min_length=min_length,
+                             do_sample=False, truncation=True, batch_size=batch_size)
+        return [output['summary_text'] for output in outputs]
+    return summarize
+
+
+def pool_summarize(pool):
+    """Adapta um inference_pool.InferencePool de sumarização (batches em paralelo)"""
+    return lambda texts: [output['summary_text'] for output in pool.map(texts)]
+
+
+def chunk_texts(texts, max_tokens=DEFAULT_CHUNK_TOKENS, count_tokens=approx_token_count):
+    """Agrupa textos em blocos de até max_tokens (textos maiores que o limite são cortados)"""
+    chunks, current, current_tokens = [], [], 0
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            words = text.split()
+            text = ' '.join(words[:max(1, int(len(words) * max_tokens / tokens))])
+            tokens = max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def review_set_hash(reviews, extra=''):
+    """Hash do conjunto de reviews (independente da ordem)"""
+    digest = hashlib.sha1(extra.encode('utf-8'))
+    for review in sorted(reviews):
+        digest.update(review.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def kmeans(vectors, k, iterations=20, seed=42):
+    """K-means simples em NumPy (k pequeno); retorna (rótulos, centróides)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)]
+    labels = np.zeros(len(vectors), dtype='int64')
+    for iteration in range(iterations):
+        distances = ((vectors ** 2).sum(axis=1)[:, None] - 2 * vectors @ centroids.T
+                     + (centroids ** 2).sum(axis=1)[None, :])
+        new_labels = distances.argmin(axis=1)
+        if iteration > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = vectors[labels == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+    return labels, centroids
+
+
+def _as_point(text):
+    """Primeira frase do review, encurtada, como ponto de destaque"""
+    sentence = re.split(r'(?<=[.!?])\s+', text.strip())[0]
+    if len(sentence) > MAX_POINT_CHARS:
+        sentence = sentence[:MAX_POINT_CHARS].rsplit(' ', 1)[0] + '...'
+    return sentence[:1].upper() + sentence[1:]
+
+
+def extract_points(texts, embeddings=None, max_points=MAX_POINTS):
+    """
+    Pontos representativos de um grupo de reviews: clusteriza os embeddings e
+    devolve o review mais próximo do centróide dos maiores clusters.
+    Sem embeddings, usa os textos mais repetidos.
+    """
+    if not texts:
+        return []
+    if embeddings is None or len(texts) <= max_points:
+        counts = Counter(_as_point(text) for text in texts)
+        return [point for point, _ in counts.most_common(max_points)]
+
+    vectors = np.asarray(embeddings, dtype='float32')
+    k = min(len(texts), max(max_points, int(math.sqrt(len(texts) / 2))))
+    labels, centroids = kmeans(vectors, k)
+    sizes = np.bincount(labels, minlength=k)
+
+    points = []
+    for cluster in np.argsort(-sizes):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) == 0:
+            continue
+        nearest = members[((vectors[members] - centroids[cluster]) ** 2).sum(axis=1).argmin()]
+        point = _as_point(texts[nearest])
+        if point not in points:
+            points.append(point)
+        if len(points) == max_points:
+            break
+    return points
+
+
+class ReviewSummarizer:
+    """
+    summarize: função lista de textos -> lista de resumos (ver pipeline_summarize/pool_summarize)
+    embed: função opcional lista de textos -> matriz de embeddings (para os pontos)
+    """
+
+    def __init__(self, summarize, embed=None, count_tokens=approx_token_count,
+                 chunk_tokens=DEFAULT_CHUNK_TOKENS, batch_size=8, cache_dir=None, cache_key=''):
+        self.summarize = summarize
+        self.embed = embed
+        self.count_tokens = count_tokens
+        self.chunk_tokens = chunk_tokens
+        self.batch_size = batch_size
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_key = cache_key
+        self._memory_cache = {}
+
+    def _summarize_batches(self, chunks):
+        summaries = []
+        for start in range(0, len(chunks), self.batch_size):
+            summaries.extend(self.summarize(chunks[start:start + self.batch_size]))
+        return summaries
+
+    def summarize_all(self, texts):
+        """Map-reduce: resume os blocos e depois os resumos, até sobrar um só"""
+        chunks = chunk_texts(texts, self.chunk_tokens, self.count_tokens)
+        if not chunks:
+            return ''
+        while True:
+            summaries = self._summarize_batches(chunks)
+            if len(summaries) == 1:
+                return summaries[0]
+            reduced = chunk_texts(summaries, self.chunk_tokens, self.count_tokens)
+            if len(reduced) >= len(chunks):
+                reduced = self._shrink(summaries, len(chunks))
+            chunks = reduced
+
+    def _shrink(self, summaries, n_chunks):
+        """
+        Resumos que não encolheram: encurta cada um para uma fatia igual do
+        orçamento, para todos entrarem no próximo reduce (nenhum é descartado)
+        """
+        budget = self.chunk_tokens // len(summaries)
+        if budget < 1:
+            raise ValueError(f"{len(summaries)} resumos não cabem num bloco de {self.chunk_tokens} tokens")
+        print(f"Aviso: resumos não encolheram; encurtando cada um dos {len(summaries)} para ~{budget} tokens.")
+        trimmed = [chunk[0] for chunk in (chunk_texts([summary], budget, self.count_tokens)
+                                          for summary in summaries) if chunk]
+        reduced = chunk_texts(trimmed, self.chunk_tokens, self.count_tokens)
+        if len(reduced) >= n_chunks:
+            raise ValueError(f"O reduce não converge: {len(reduced)} blocos a partir de {n_chunks}")
+        return reduced
+
+    # ------------------------------------------------------------------
+    # Cache por hash do conjunto de reviews
+
+    def _cache_get(self, key):
+        if key in self._memory_cache:
+            return self._memory_cache[key]
+        if self.cache_dir is not None:
+            try:
+                with open(self.cache_dir / f'{key}.json', 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                self._memory_cache[key] = result
+                return result
+            except (OSError, ValueError):
+                pass
+        return None
+
+    def _cache_put(self, key, result):
+        self._memory_cache[key] = result
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_dir / f'{key}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_dir / f'{key}.json')
+
+    def analyze(self, reviews, scores=None):
+        """
+        Resumo geral + pontos positivos (nota >= 4) e negativos (nota <= 2)
+        de todos os reviews. Sem notas, só o resumo é gerado.
+        """
+        pairs = [(review.strip(), score)
+                 for review, score in zip(reviews, scores if scores is not None else [None] * len(reviews))
+                 if isinstance(review, str) and review.strip()]
+        reviews = [review for review, _ in pairs]
+        scores = None if scores is None else [score for _, score in pairs]
+        key = review_set_hash(
+            [f'{score}:{review}' for review, score in zip(reviews, scores or [''] * len(reviews))],
+            extra=f'{self.cache_key}|{self.chunk_tokens}')
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        positives, negatives = [], []
+        if scores is not None:
+            positives = [review for review, score in zip(reviews, scores) if score >= 4]
+            negatives = [review for review, score in zip(reviews, scores) if score <= 2]
+
+        def points(group):
+            embeddings = None
+            if self.embed is not None and len(group) > MAX_POINTS:
+                # Embeddings só dos textos únicos; os repetidos mantêm o peso no k-means
+                embeddings = TextDedup.from_texts(group).map(lambda texts: np.asarray(self.embed(texts)))
+            return extract_points(group, embeddings)
+
+        result = {
+            # Textos repetidos não acrescentam nada ao resumo
+            "summary": self.summarize_all(TextDedup.from_texts(reviews).unique),
+            "positive_points": points(positives),
+            "negative_points": points(negatives),
+            "total_reviews": len(reviews),
+        }
+        self._cache_put(key, result)
+        return result
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Frequência de termos dos comentários (análise exploratória)
+Os comentários são tokenizados uma única vez (mantendo os acentos) numa matriz
+esparsa documento x termo de unigramas e bigramas. Contagens por nota e por
+mês, top termos e as frequências da nuvem de palavras saem de produtos
+esparsos sobre essa matriz, sem reprocessar o texto.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from text_dedup import TextDedup, canonical_text
+
+# Palavras comuns em português (construído uma vez, já na forma canônica)
+STOPWORDS = frozenset(canonical_text(word) for word in (
+    'que', 'com', 'para', 'uma', 'por', 'mais', 'como', 'mas', 'foi', 'ele', 'tem', 'à', 'seu', 'sua',
+    'ou', 'ser', 'quando', 'muito', 'há', 'nos', 'já', 'está', 'eu', 'também', 'só', 'pelo', 'pela',
+    'até', 'isso', 'ela', 'entre', 'era', 'depois', 'sem', 'mesmo', 'aos', 'ter', 'seus', 'suas',
+    'minha', 'têm', 'naquele', 'essas', 'esses', 'pelos', 'elas', 'estava', 'seja', 'qual', 'nossa',
+    'nossos', 'nossas', 'onde', 'meu', 'minhas', 'numa', 'eles', 'estão', 'você', 'tinha', 'foram',
+    'essa', 'vocês', 'um', 'após', 'sob', 'sobre', 'contra', 'desde', 'durante', 'perante', 'segundo',
+    'conforme', 'consoante', 'mediante', 'salvo', 'tirante', 'visto', 'dos', 'das', 'não', 'nao',
+    'esse', 'este', 'esta', 'isto', 'num', 'nas', 'pra', 'ainda', 'porque',
+))
+# Negações ficam fora das stopwords dos bigramas ("não chegou", "nao recebi")
+BIGRAM_KEEP = frozenset({'não', 'nao'})
+
+# Sequências de letras (inclui acentuadas); dígitos e pontuação separam tokens
+_TOKEN = re.compile(r'[^\W\d_]+')
+
+
+def tokenize(text, stopwords=STOPWORDS, min_length=3, pattern=_TOKEN):
+    """Tokens na forma canônica (minúsculas, acentos preservados), sem stopwords"""
+    if not isinstance(text, str):
+        return []
+    return [token for token in pattern.findall(canonical_text(text))
+            if len(token) >= min_length and token not in stopwords]
+
+
+def _terms(text, bigrams):
+    """Unigramas + bigramas de tokens adjacentes (negações entram nos bigramas)"""
+    tokens = tokenize(text, stopwords=STOPWORDS - BIGRAM_KEEP)
+    terms = [token for token in tokens if token not in BIGRAM_KEEP]
+    if bigrams:
+        terms += [f'{first} {second}' for first, second in zip(tokens, tokens[1:])]
+    return terms
+
+
+class TermFrequencies:
+    """
+    matrix: contagens esparsas (CSR) documento x termo
+    terms: vocabulário (posição = coluna da matriz)
+    facets: rótulos por documento ('score', 'month') para as contagens agrupadas
+    """
+
+    def __init__(self, matrix, terms, facets=None):
+        self.matrix = matrix
+        self.terms = np.asarray(terms, dtype=object)
+        self.facets = facets or {}
+        self._memo = {}
+
+    @classmethod
+    def from_texts(cls, texts, facets=None, bigrams=True):
+        """Tokeniza cada texto único uma vez e espalha as linhas para os duplicados"""
+        dedup = TextDedup.from_texts(pd.Series(texts, dtype='object').fillna(''))
+        vocabulary = {}
+        indptr, indices = [0], []
+        for text in dedup.unique:
+            indices.extend(vocabulary.setdefault(term, len(vocabulary)) for term in _terms(text, bigrams))
+            indptr.append(len(indices))
+        unique_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype='int32'), np.asarray(indices, dtype='int64'), np.asarray(indptr)),
+            shape=(len(dedup.unique), len(vocabulary)))
+        unique_matrix.sum_duplicates()
+        matrix = unique_matrix[dedup.ids] if len(dedup.ids) else unique_matrix
+        facets = {name: np.asarray(labels) for name, labels in (facets or {}).items()}
+        return cls(matrix, list(vocabulary), facets)
+
+    @classmethod
+    def from_frame(cls, df, text_column='review_comment_message', bigrams=True):
+        """Matriz dos comentários com as facetas nota e mês (quando as colunas existem)"""
+        facets = {}
+        if 'review_score' in df.columns:
+            facets['score'] = df['review_score'].to_numpy()
+        if 'review_creation_date' in df.columns:
+            facets['month'] = df['review_creation_date'].dt.to_period('M').astype(str).to_numpy()
+        return cls.from_texts(df[text_column], facets, bigrams)
+
+    def _term_mask(self, ngram):
+        if ngram is None:
+            return np.ones(len(self.terms), dtype=bool)
+        return np.array([term.count(' ') == ngram - 1 for term in self.terms], dtype=bool)
+
+    def totals(self):
+        """Contagem total de cada termo (vetor)"""
+        if 'totals' not in self._memo:
+            self._memo['totals'] = np.asarray(self.matrix.sum(axis=0)).ravel()
+        return self._memo['totals']
+
+    def facet_counts(self, facet):
+        """(rótulos, matriz esparsa rótulo x termo) com a soma das linhas de cada rótulo"""
+        if facet not in self._memo:
+            codes, labels = pd.factorize(self.facets[facet], sort=True)
+            valid = codes >= 0
+            grouping = sparse.csr_matrix(
+                (np.ones(valid.sum(), dtype='int32'), (codes[valid], np.flatnonzero(valid))),
+                shape=(len(labels), self.matrix.shape[0]))
+            self._memo[facet] = (list(labels), (grouping @ self.matrix).tocsr())
+        return self._memo[facet]
+
+    def _counts(self, facet=None, value=None):
+        if facet is None:
+            return self.totals()
+        labels, counts = self.facet_counts(facet)
+        if value not in labels:
+            return np.zeros(len(self.terms), dtype='int64')
+        return counts[labels.index(value)].toarray().ravel()
+
+    def top_terms(self, n=20, facet=None, value=None, ngram=None):
+        """[(termo, contagem)] mais frequentes, no total ou de um rótulo da faceta"""
+        counts = np.where(self._term_mask(ngram), self._counts(facet, value), 0)
+        top = np.argsort(-counts, kind='stable')[:n]
+        return [(self.terms[i], int(counts[i])) for i in top if counts[i] > 0]
+
+    def frequencies(self, max_words=100, facet=None, value=None):
+        """Entrada de WordCloud.generate_from_frequencies (só unigramas)"""
+        return dict(self.top_terms(max_words, facet, value, ngram=1))
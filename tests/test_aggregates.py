@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Agregados do dashboard e agregação temporal em blocos"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import TEMPORAL_GRANULARITIES, ReviewAggregates, TemporalAggregates
+from dataset import read_reviews_csv
+
+
+def reviews_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2017-11-20') + pd.to_timedelta(rng.integers(0, 24 * 200, rows), unit='h')
+    return pd.DataFrame({
+        'review_id': [f'r{i:04d}' for i in range(rows)],
+        'review_score': rng.integers(1, 6, rows),
+        'review_creation_date': dates.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+
+@pytest.fixture
+def csv_paths(tmp_path):
+    df = reviews_frame(300)
+    paths = []
+    # Dois dumps com períodos sobrepostos, como arquivos de marketplaces diferentes
+    for name, part in (('a.csv', df.iloc[:170]), ('b.csv', df.iloc[170:])):
+        part.to_csv(tmp_path / name, index=False)
+        paths.append(tmp_path / name)
+    df.to_csv(tmp_path / 'all.csv', index=False)
+    return paths, tmp_path / 'all.csv'
+
+
+def assert_temporal_equal(left, right):
+    for name in TEMPORAL_GRANULARITIES:
+        pd.testing.assert_series_equal(left.counts[name], right.counts[name])
+        pd.testing.assert_series_equal(left.sums[name], right.sums[name])
+
+
+def test_chunked_and_merged_matches_single_frame(csv_paths):
+    parts, full = csv_paths
+    single = TemporalAggregates.from_frame(read_reviews_csv(full))
+    merged = TemporalAggregates.from_csv(parts[0], chunk_size=7).merge(
+        TemporalAggregates.from_csv(parts[1], chunk_size=11))
+    assert_temporal_equal(merged, single)
+
+
+def test_chunk_size_does_not_change_result(csv_paths):
+    _, full = csv_paths
+    assert_temporal_equal(TemporalAggregates.from_csv(full, chunk_size=13),
+                          TemporalAggregates.from_csv(full, chunk_size=1000))
+
+
+def test_frame_matches_groupby(csv_paths):
+    _, full = csv_paths
+    df = read_reviews_csv(full)
+    expected = df.groupby(df['review_creation_date'].dt.to_period('M'))['review_score'].agg(['count', 'mean'])
+    monthly = TemporalAggregates.from_csv(full, chunk_size=17).frame('monthly')
+    np.testing.assert_array_equal(monthly['count'].to_numpy(), expected['count'].to_numpy())
+    np.testing.assert_allclose(monthly['mean_score'].to_numpy(), expected['mean'].to_numpy())
+    assert list(monthly.index) == list(expected.index)
+
+
+def scores_frame(scores):
+    scores = pd.Series(scores, dtype='int8')
+    return pd.DataFrame({
+        'review_score': scores,
+        'review_comment_message': ['ok' if i % 3 else None for i in range(len(scores))],
+        'review_creation_date': pd.Timestamp('2018-01-01') + pd.to_timedelta(np.arange(len(scores)) * 5, unit='D'),
+    })
+
+
+@pytest.mark.parametrize('scores', [
+    [4],
+    [1, 5],
+    [1, 2, 4, 5],
+    [5, 5, 1, 1],
+    [3, 1, 2],
+    [5, 5, 5, 5, 4, 1, 1],
+    list(np.random.default_rng(1).integers(1, 6, 1000)),
+    list(np.random.default_rng(2).integers(1, 6, 999)),
+], ids=['single', 'two', 'even', 'even_bimodal', 'odd', 'skewed', 'even_1000', 'odd_999'])
+def test_median_and_std_match_pandas(scores):
+    df = scores_frame(scores)
+    stats = ReviewAggregates.from_frame(df).basic_stats()
+    expected = df['review_score'].astype('float64')
+    assert stats['Total de Reviews'] == len(df)
+    assert stats['Reviews com Comentário'] == int(df['review_comment_message'].notna().sum())
+    assert stats['Média de Avaliação'] == pytest.approx(expected.mean())
+    assert stats['Mediana de Avaliação'] == expected.median()
+    if len(df) == 1:
+        # pandas devolve NaN para o desvio amostral de uma única linha
+        assert np.isnan(stats['Desvio Padrão']) and np.isnan(expected.std())
+    else:
+        assert stats['Desvio Padrão'] == pytest.approx(expected.std(ddof=1))
+
+
+def test_incremental_update_matches_full_frame():
+    df = scores_frame(list(np.random.default_rng(3).integers(1, 6, 301)))
+    incremental = ReviewAggregates()
+    for start in range(0, len(df), 64):
+        incremental.update(df.iloc[start:start + 64])
+    full = ReviewAggregates.from_frame(df)
+    assert incremental.basic_stats() == pytest.approx(full.basic_stats())
+    pd.testing.assert_series_equal(incremental.score_distribution(), full.score_distribution())
+    pd.testing.assert_frame_equal(incremental.monthly_trend(), full.monthly_trend())
+
+
+def test_monthly_trend_matches_groupby():
+    df = scores_frame(list(np.random.default_rng(4).integers(1, 6, 120)))
+    months = df['review_creation_date'].dt.to_period('M')
+    expected = df.groupby(months)['review_score'].agg(['count', 'mean'])
+    trend = ReviewAggregates.from_frame(df).monthly_trend()
+    np.testing.assert_array_equal(trend['Total_Reviews'].to_numpy(), expected['count'].to_numpy())
+    # Médias arredondadas em 2 casas no dashboard
+    np.testing.assert_allclose(trend['Avaliação_Média'].to_numpy(), expected['mean'].to_numpy(), atol=0.005 + 1e-9)
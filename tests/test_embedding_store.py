@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Store incremental de embeddings com um encoder falso (sem modelo e sem rede)"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from embedding_store import EmbeddingStore
+from text_dedup import canonical_text
+
+MODEL = 'fake/encoder-v1'
+DIM = 4
+
+REVIEWS = {
+    'r0': 'Produto bom',
+    'r1': 'produto   BOM',
+    'r2': 'chegou atrasado',
+    'r3': 'ótimo',
+    'r4': 'Ótimo',
+    'r5': 'não recebi',
+    'r6': 'ﬁm',
+    'r7': 'fim',
+}
+
+
+def vector(text):
+    """Vetor determinístico da forma canônica (duplicados canônicos têm o mesmo vetor)"""
+    digest = hashlib.md5(canonical_text(text).encode('utf-8')).digest()
+    return np.frombuffer(digest, dtype='uint8')[:DIM].astype('float32')
+
+
+class FakeEncoder:
+    """Registra os lotes codificados; pode falhar depois de `fail_after` lotes"""
+
+    def __init__(self, fail_after=None):
+        self.calls = []
+        self.fail_after = fail_after
+
+    def __call__(self, texts):
+        if self.fail_after is not None and len(self.calls) >= self.fail_after:
+            raise RuntimeError('falha injetada')
+        self.calls.append(list(texts))
+        return np.stack([vector(text) for text in texts])
+
+
+def sync(store, reviews, encoder, **kwargs):
+    return store.sync(list(reviews), list(reviews.values()), encoder, **kwargs)
+
+
+def assert_vectors(store, reviews):
+    np.testing.assert_array_equal(store.get(list(reviews)), np.stack([vector(text) for text in reviews.values()]))
+
+
+def test_first_sync_encodes_each_canonical_text_once(tmp_path):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    encoder = FakeEncoder()
+    stats = sync(store, REVIEWS, encoder)
+
+    assert stats == {'reused': 0, 'embedded': 8, 'copied': 0, 'encoded': 5, 'tombstoned': 0, 'dedup_ratio': 0.375}
+    assert encoder.calls == [['Produto bom', 'chegou atrasado', 'ótimo', 'não recebi', 'ﬁm']]
+    assert_vectors(store, REVIEWS)
+    assert store.vectors.shape == (8, DIM)
+
+
+def test_sync_with_new_edited_and_deleted_ids(tmp_path):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    sync(store, REVIEWS, FakeEncoder())
+
+    updated = dict(REVIEWS)
+    del updated['r2']
+    updated['r3'] = 'péssimo'
+    updated['r8'] = 'produto bom'
+    encoder = FakeEncoder()
+    stats = sync(store, updated, encoder)
+
+    # Só o texto editado e o review novo passam pelo encoder
+    assert encoder.calls == [['péssimo', 'produto bom']]
+    assert stats['reused'] == 6 and stats['embedded'] == 2 and stats['tombstoned'] == 2
+    assert_vectors(store, updated)
+    with pytest.raises(KeyError):
+        store.get(['r2'])
+    # Linhas antigas continuam no arquivo, marcadas como excluídas
+    assert len(store.rows) == 10 and int(store.rows['alive'].sum()) == 8
+    assert store.rows.loc[~store.rows['alive'], 'review_id'].tolist() == ['r2', 'r3']
+
+
+def test_known_text_under_new_id_copies_the_stored_vector(tmp_path):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    sync(store, REVIEWS, FakeEncoder())
+
+    updated = dict(REVIEWS)
+    del updated['r5']
+    updated['r8'] = 'Produto bom'
+    encoder = FakeEncoder()
+    stats = sync(store, updated, encoder)
+    assert encoder.calls == []
+    assert stats['copied'] == 1 and stats['encoded'] == 0 and stats['tombstoned'] == 1
+
+    # O texto de uma linha excluída também é reaproveitado
+    updated['r9'] = 'não recebi'
+    stats = sync(store, updated, encoder)
+    assert encoder.calls == []
+    assert stats['copied'] == 1 and stats['embedded'] == 1
+    assert_vectors(store, updated)
+
+
+def test_rows_are_saved_every_n_batches(tmp_path, monkeypatch):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    saves = []
+    save = store._save
+    monkeypatch.setattr(store, '_save', lambda: saves.append(len(store.rows)) or save())
+
+    # 5 textos únicos em lotes de 1: grava depois do 2º e do 4º lote e no fim
+    sync(store, REVIEWS, FakeEncoder(), batch_size=1, save_every=2)
+    assert saves == [3, 6, 8]
+    assert len(EmbeddingStore.open(tmp_path, MODEL).rows) == 8
+
+
+def test_reopen_reads_rows_and_memmap(tmp_path):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    sync(store, REVIEWS, FakeEncoder())
+
+    reopened = EmbeddingStore.open(tmp_path, MODEL)
+    assert reopened.dim == DIM
+    pd.testing.assert_frame_equal(reopened.rows, store.rows)
+    assert isinstance(reopened.vectors, np.memmap)
+    assert_vectors(reopened, REVIEWS)
+
+    encoder = FakeEncoder()
+    stats = sync(reopened, REVIEWS, encoder)
+    assert encoder.calls == []
+    assert stats['reused'] == 8 and stats['embedded'] == 0 and stats['tombstoned'] == 0
+
+
+def test_other_model_or_dtype_starts_empty(tmp_path):
+    sync(EmbeddingStore.open(tmp_path, MODEL), REVIEWS, FakeEncoder())
+    assert len(EmbeddingStore.open(tmp_path, 'fake/encoder-v2').rows) == 0
+    assert len(EmbeddingStore.open(tmp_path, MODEL, dtype='float16').rows) == 0
+
+
+def test_compact_drops_tombstones(tmp_path):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    sync(store, REVIEWS, FakeEncoder())
+    remaining = {review_id: text for review_id, text in REVIEWS.items() if review_id not in ('r0', 'r5')}
+    sync(store, remaining, FakeEncoder())
+
+    assert store.compact() == 2
+    assert store.compact() == 0
+    reopened = EmbeddingStore.open(tmp_path, MODEL)
+    assert len(reopened.rows) == 6 and reopened.rows['alive'].all()
+    assert_vectors(reopened, remaining)
+
+
+def test_resume_after_interrupted_sync(tmp_path):
+    store = EmbeddingStore.open(tmp_path, MODEL)
+    with pytest.raises(RuntimeError):
+        sync(store, REVIEWS, FakeEncoder(fail_after=2), batch_size=2)
+    saved = len(EmbeddingStore.open(tmp_path, MODEL).rows)
+    assert 0 < saved < len(REVIEWS)
+    # Vetores órfãos gravados depois do último lote confirmado
+    with open(store._vectors_path, 'ab') as f:
+        f.write(b'\x00' * 3 * DIM)
+
+    resumed = EmbeddingStore.open(tmp_path, MODEL)
+    stats = sync(resumed, REVIEWS, FakeEncoder(), batch_size=2)
+    assert stats['reused'] == saved and stats['embedded'] == len(REVIEWS) - saved
+    assert len(resumed.rows) == len(REVIEWS)
+    assert store._vectors_path.stat().st_size == len(REVIEWS) * DIM * 4
+    assert_vectors(resumed, REVIEWS)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Deduplicação em blocos do CSV antes da codificação dos shards"""
+
+import pandas as pd
+import pytest
+
+from index_build import stream_unique_texts
+from text_dedup import TextDedup
+
+COMMENTS = ['Produto bom', None, 'chegou atrasado', 'produto   BOM', '   ', 'Ótimo', 'ótimo', 'CHEGOU atrasado',
+            'ﬁm', 'fim', 'Produto bom']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 100])
+def test_chunks_match_whole_file_dedup(tmp_path, chunk_size):
+    csv_path = tmp_path / 'reviews.csv'
+    pd.DataFrame({'review_id': [f'r{i}' for i in range(len(COMMENTS))],
+                  'review_comment_message': COMMENTS}).to_csv(csv_path, index=False)
+
+    unique_texts, review_ids, unique_ids = stream_unique_texts(csv_path, chunk_size=chunk_size)
+
+    kept = [i for i, text in enumerate(COMMENTS) if text is not None and text.strip()]
+    expected = TextDedup.from_texts([COMMENTS[i] for i in kept])
+    assert unique_texts == ['Produto bom', 'chegou atrasado', 'Ótimo', 'ﬁm']
+    assert unique_texts == expected.unique
+    assert review_ids.tolist() == [f'r{i}' for i in kept]
+    assert unique_ids.tolist() == expected.ids.tolist() == [0, 1, 0, 2, 2, 1, 3, 3, 0]
+
+
+def test_empty_csv(tmp_path):
+    csv_path = tmp_path / 'reviews.csv'
+    pd.DataFrame({'review_id': [], 'review_comment_message': []}).to_csv(csv_path, index=False)
+    unique_texts, review_ids, unique_ids = stream_unique_texts(csv_path)
+    assert unique_texts == [] and len(review_ids) == 0 and len(unique_ids) == 0
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Varint das postings, scores BM25 do índice lexical e fusão RRF da busca híbrida"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import lexical_index
+from lexical_index import LexicalIndex, analyze, varint_decode, varint_encode
+from search import HybridSearcher
+
+# Termos (sem stopwords e acentos): [entrega, rapida], [produto, otimo, entrega, prazo],
+# [produto, quebrado, quebrado], [entrega, rapida] -> N = 4, tamanho médio 11 / 4
+CORPUS = ['Entrega rápida', 'Produto ótimo, entrega no prazo', 'produto quebrado, QUEBRADO!', 'entrega rapida']
+REVIEW_IDS = ['r0', 'r1', 'r2', 'r3']
+
+
+def bm25(tf, df, dl, n_docs=4, avgdl=11 / 4, k1=1.2, b=0.75):
+    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+
+
+@pytest.fixture
+def index():
+    return LexicalIndex.build(CORPUS, REVIEW_IDS)
+
+
+@pytest.mark.parametrize('value, encoded', [
+    (0, [0x00]), (1, [0x01]), (127, [0x7F]), (128, [0x80, 0x01]), (300, [0xAC, 0x02]),
+    (16383, [0xFF, 0x7F]), (16384, [0x80, 0x80, 0x01]), (2 ** 21 - 1, [0xFF, 0xFF, 0x7F]),
+    (2 ** 21, [0x80, 0x80, 0x80, 0x01]),
+])
+def test_varint_bytes_at_boundaries(value, encoded):
+    data, starts = varint_encode([value])
+    assert data.tolist() == encoded
+    assert starts.tolist() == [0]
+    assert varint_decode(data).tolist() == [value]
+
+
+def test_varint_round_trip():
+    values = [127, 128, 0, 16383, 16384, 1, 2 ** 35 + 5, 128, 127]
+    data, starts = varint_encode(values)
+    assert starts.tolist() == [0, 1, 3, 4, 6, 9, 10, 16, 18]
+    assert len(data) == 19
+    assert varint_decode(data).tolist() == values
+    assert varint_decode(varint_encode([])[0]).tolist() == []
+
+
+def test_analyze_folds_accents_and_drops_stopwords():
+    assert analyze(CORPUS[1]) == ['produto', 'otimo', 'entrega', 'prazo']
+    assert analyze(CORPUS[0]) == analyze(CORPUS[3])
+
+
+def test_postings_round_trip(index):
+    docs, freqs = index.term_postings(index.vocabulary['quebrado'])
+    assert docs.tolist() == [2] and freqs.tolist() == [2]
+    docs, freqs = index.term_postings(index.vocabulary['entrega'])
+    assert docs.tolist() == [0, 1, 3] and freqs.tolist() == [1, 1, 1]
+    assert index.doc_lengths.tolist() == [2, 4, 3, 2]
+
+
+@pytest.mark.parametrize('dense_ratio', [16, 0], ids=['dense', 'sparse'])
+def test_bm25_matches_hand_computed_scores(index, monkeypatch, dense_ratio):
+    monkeypatch.setattr(lexical_index, 'DENSE_ACCUMULATOR_RATIO', dense_ratio)
+
+    scores, rows = index.search('quebrado')
+    assert rows.tolist() == [2]
+    assert scores[0] == pytest.approx(1.6141907, rel=1e-5)
+    assert scores[0] == pytest.approx(bm25(tf=2, df=1, dl=3), rel=1e-5)
+
+    scores, rows = index.search('entrega produto')
+    # Empate entre os documentos 0 e 3 (mesmos termos): menor posição primeiro
+    assert rows.tolist() == [1, 2, 0, 3]
+    expected = [bm25(1, 3, 4) + bm25(1, 2, 4), bm25(1, 2, 3), bm25(1, 3, 2), bm25(1, 3, 2)]
+    np.testing.assert_allclose(scores, expected, rtol=1e-5)
+
+    scores, rows = index.search('entrega produto', require_all=True)
+    assert rows.tolist() == [1]
+    scores, rows = index.search('entrega', top_k=2, mask=np.array([False, True, True, True]))
+    assert rows.tolist() == [3, 1]
+
+
+class StubSemantic:
+    """Parte vetorial com hits fixos (sem FAISS e sem encoder)"""
+
+    def __init__(self, metadata, similarities, rows):
+        self.metadata = metadata
+        self.hits = (np.asarray(similarities, dtype='float32'), np.asarray(rows, dtype='int64'))
+        self.queries = []
+
+    def filter_mask(self, **filters):
+        return None
+
+    def search_ids(self, queries, top_k, **filters):
+        self.queries.append(list(queries))
+        return [self.hits for _ in queries]
+
+
+def test_hybrid_search_fuses_with_reciprocal_rank(index):
+    # Metadados na ordem do índice vetorial, diferente da ordem do índice lexical
+    metadata = pd.DataFrame({'review_id': ['r3', 'r2', 'r1', 'r0'], 'review_comment_message': CORPUS[::-1]})
+    semantic = StubSemantic(metadata, similarities=[0.9, 0.8, 0.2], rows=[0, 1, 3])
+    searcher = HybridSearcher(semantic, index)
+
+    frame = searcher.search('entrega produto', top_k=4, mode='hybrid')[0]
+
+    # Lexical: r1, r2, r0, r3; vetorial: r3, r2, r0 -> score = soma de 1 / (60 + posição a partir de 1)
+    expected = {'r1': 1 / 61, 'r2': 1 / 62 + 1 / 62, 'r0': 1 / 63 + 1 / 63, 'r3': 1 / 64 + 1 / 61}
+    assert frame['review_id'].tolist() == ['r2', 'r3', 'r0', 'r1']
+    np.testing.assert_allclose(frame['score'], [expected[rid] for rid in frame['review_id']])
+    assert frame['retriever'].tolist() == ['hybrid', 'hybrid', 'hybrid', 'lexical']
+    assert frame['bm25'].iloc[-1] == pytest.approx(bm25(1, 3, 4) + bm25(1, 2, 4), rel=1e-5)
+    np.testing.assert_allclose(frame['similarity'].iloc[:3], [0.8, 0.9, 0.2], rtol=1e-6)
+    assert np.isnan(frame['similarity'].iloc[-1])
+
+
+def test_hybrid_threshold_drops_vector_candidates(index):
+    metadata = pd.DataFrame({'review_id': REVIEW_IDS})
+    semantic = StubSemantic(metadata, similarities=[0.9, 0.3], rows=[2, 0])
+    frame = HybridSearcher(semantic, index).search('quebrado', top_k=3, mode='hybrid', similarity_threshold=0.5)[0]
+    assert frame['review_id'].tolist() == ['r2']
+    assert frame['retriever'].tolist() == ['hybrid']
+    assert frame['score'].iloc[0] == pytest.approx(2 / 61)
+
+
+def test_auto_mode_answers_exact_terms_lexically(index):
+    semantic = StubSemantic(pd.DataFrame({'review_id': REVIEW_IDS}), similarities=[], rows=[])
+    frame = HybridSearcher(semantic, index).search('entrega', top_k=2)[0]
+    assert frame['review_id'].tolist() == ['r0', 'r3']
+    assert (frame['retriever'] == 'lexical').all()
+    assert semantic.queries == []
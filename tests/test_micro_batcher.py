@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Agrupamento de requisições concorrentes em lotes pelo tamanho máximo e pelo prazo"""
+
+import asyncio
+import time
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingBatch:
+    """Registra os lotes recebidos; devolve o dobro de cada item"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail:
+            raise ValueError('falha injetada')
+        return [item * 2 for item in items]
+
+
+def test_batches_fill_up_to_max_batch_size():
+    process = RecordingBatch()
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+
+    async def scenario():
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(scenario()) == [i * 2 for i in range(10)]
+    assert process.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert batcher.stats() == {'batches': 3, 'items': 10, 'mean_batch_size': 3.33}
+
+
+def test_partial_batch_flushes_after_max_wait():
+    process = RecordingBatch()
+    batcher = MicroBatcher(process, max_batch_size=32, max_wait_ms=100)
+
+    async def scenario():
+        try:
+            start = time.perf_counter()
+            first = asyncio.ensure_future(batcher.submit(1))
+            await asyncio.sleep(0.02)
+            # Chega dentro da janela do primeiro item: entra no mesmo lote
+            results = await asyncio.gather(first, batcher.submit(2))
+            elapsed = time.perf_counter() - start
+            return results, elapsed, await batcher.submit(3)
+        finally:
+            await batcher.close()
+
+    results, elapsed, third = asyncio.run(scenario())
+    assert results == [2, 4] and third == 6
+    assert 0.09 <= elapsed < 1.0
+    assert process.batches == [[1, 2], [3]]
+
+
+def test_failed_batch_reaches_every_caller_and_worker_keeps_running():
+    process = RecordingBatch(fail=True)
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=5)
+
+    async def scenario():
+        try:
+            results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+            process.fail = False
+            return results, await batcher.submit(3)
+        finally:
+            await batcher.close()
+
+    results, third = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert third == 6
+    assert batcher.stats()['batches'] == 1
+
+
+def test_worker_restarts_on_a_new_event_loop():
+    process = RecordingBatch()
+    batcher = MicroBatcher(process, max_wait_ms=5)
+
+    # O worker do primeiro loop é cancelado quando o loop termina
+    assert asyncio.run(batcher.submit(1)) == 2
+    first_worker = batcher._worker
+    assert first_worker.done()
+
+    assert asyncio.run(batcher.submit(2)) == 4
+    assert batcher._worker is not first_worker
+    assert process.batches == [[1], [2]]
+    asyncio.run(batcher.close())
+    assert batcher._worker is None
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Redução LTTB das séries e cache de PNGs do dashboard"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from plot_cache import PlotCache, lttb
+
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n)
+    return x, np.sin(x / 25) + rng.normal(0, 0.1, n)
+
+
+@pytest.mark.parametrize('threshold', [3, 10, 500, 999])
+def test_lttb_keeps_endpoints_and_threshold_length(threshold):
+    x, y = series(1000)
+    selected = lttb(x, y, threshold)
+    assert len(selected) == threshold
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+
+
+@pytest.mark.parametrize('n, threshold', [(10, 10), (10, 50), (0, 5), (1, 3), (10, 2)])
+def test_lttb_without_reduction_returns_every_point(n, threshold):
+    x = np.arange(n)
+    np.testing.assert_array_equal(lttb(x, x * 2.0, threshold), np.arange(n))
+
+
+def test_lttb_keeps_peaks_and_valleys():
+    y = np.zeros(1000)
+    y[437], y[801] = 10.0, -10.0
+    selected = lttb(np.arange(1000), y, 50)
+    assert 437 in selected and 801 in selected
+
+
+def draw(fig, color='blue'):
+    fig.add_subplot().plot([0, 1, 2], [2, 0, 1], color=color)
+
+
+class CountingRender:
+    """Conta as renderizações; as `failures` primeiras falham"""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.calls = 0
+        self.failures = failures
+        self.delay = delay
+
+    def __call__(self, fig, **params):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise ValueError('falha injetada')
+        draw(fig, **params)
+
+
+def get_concurrently(cache, render, threads=8):
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        return cache.get('linha', 'v1', render)
+
+    with ThreadPoolExecutor(threads) as executor:
+        return [executor.submit(worker) for _ in range(threads)]
+
+
+def test_get_renders_once_per_key(tmp_path):
+    cache = PlotCache(tmp_path)
+    render = CountingRender()
+    first = cache.get('linha', 'v1', render)
+    assert Path(first).read_bytes().startswith(b'\x89PNG')
+    assert cache.get('linha', 'v1', render) == first
+    cache.get('linha', 'v2', render)
+    cache.get('linha', 'v1', render, params={'color': 'red'})
+    assert render.calls == 3
+    assert cache.stats() == {'entries': 3, 'hits': 1, 'misses': 3}
+
+
+def test_failed_render_releases_the_key(tmp_path):
+    cache = PlotCache(tmp_path)
+    with pytest.raises(ValueError):
+        cache.get('linha', 'v1', CountingRender(failures=1))
+    assert cache._rendering == {}
+    assert cache.stats()['entries'] == 0
+
+    render = CountingRender()
+    assert Path(cache.get('linha', 'v1', render)).exists()
+    assert render.calls == 1 and cache._rendering == {}
+
+
+def test_concurrent_gets_render_once(tmp_path):
+    cache = PlotCache(tmp_path)
+    render = CountingRender(delay=0.05)
+    paths = {future.result() for future in get_concurrently(cache, render)}
+    assert len(paths) == 1 and render.calls == 1
+    assert cache.stats() == {'entries': 1, 'hits': 7, 'misses': 1}
+    assert cache._rendering == {}
+
+
+def test_concurrent_gets_after_failed_render(tmp_path):
+    cache = PlotCache(tmp_path)
+    render = CountingRender(failures=1, delay=0.05)
+    futures = get_concurrently(cache, render)
+    errors = [future.exception() for future in futures]
+    assert sum(isinstance(error, ValueError) for error in errors) == 1
+    # Quem esperava pela renderização que falhou renderiza de novo, uma única vez
+    assert len({future.result() for future, error in zip(futures, errors) if error is None}) == 1
+    assert render.calls == 2
+    assert cache.stats() == {'entries': 1, 'hits': 6, 'misses': 1}
+    assert cache._rendering == {}
+
+
+def test_eviction_removes_old_files(tmp_path):
+    cache = PlotCache(tmp_path, max_entries=2)
+    paths = [cache.get('linha', version, draw) for version in ('v1', 'v2', 'v3')]
+    assert [Path(path).exists() for path in paths] == [False, True, True]
+
+
+def test_close_removes_own_temporary_directory(tmp_path):
+    cache = PlotCache()
+    directory = cache.directory
+    cache.get('linha', 'v1', draw)
+    cache.close()
+    assert not directory.exists()
+
+    kept = PlotCache(tmp_path)
+    path = kept.get('linha', 'v1', draw)
+    kept.close()
+    assert tmp_path.exists() and not Path(path).exists()
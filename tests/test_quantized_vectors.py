@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Recall dos modos quantizados com re-ranqueamento e gravação/leitura do índice"""
+
+import numpy as np
+import pytest
+
+from quantized_vectors import QuantizedVectors
+
+pytest.importorskip('faiss')
+
+DIM = 32
+K = 10
+
+
+def clustered(n_clusters=40, per_cluster=50, n_queries=20, seed=0):
+    """Grupos compactos: os K vizinhos de cada consulta estão no grupo dela"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, DIM))
+    vectors = np.repeat(centers, per_cluster, axis=0) + rng.normal(scale=0.1, size=(n_clusters * per_cluster, DIM))
+    queries = centers[:n_queries] + rng.normal(scale=0.1, size=(n_queries, DIM))
+    return vectors.astype('float32'), queries.astype('float32')
+
+
+def recall(rows, truth):
+    return np.mean([len(set(found) & set(expected)) / K for found, expected in zip(rows, truth)])
+
+
+def cosine(queries, vectors):
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    vectors = vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.einsum('qd,qkd->qk', queries, vectors)
+
+
+@pytest.mark.parametrize('mode, min_recall', [('float16', 0.99), ('int8', 0.95), ('binary', 0.9)])
+def test_rerank_recall_against_float32(mode, min_recall):
+    vectors, queries = clustered()
+    _, truth = QuantizedVectors.build(vectors, 'float32').search(queries, K)
+
+    quantized = QuantizedVectors.build(vectors, mode)
+    _, coarse_rows = quantized.search(queries, K, rerank=False)
+    scores, rows = quantized.search(queries, K)
+
+    assert recall(rows, truth) >= min_recall
+    assert recall(rows, truth) >= recall(coarse_rows, truth)
+    # Depois do re-ranqueamento os scores são os exatos, em ordem decrescente
+    np.testing.assert_allclose(scores, cosine(queries, vectors[rows]), rtol=1e-4, atol=1e-5)
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+@pytest.mark.parametrize('mode, metric', [('float32', 'l2'), ('float16', 'l2'), ('int8', 'cosine'),
+                                          ('binary', 'cosine')])
+def test_save_load_round_trip(tmp_path, mode, metric):
+    vectors, queries = clustered(n_clusters=10, per_cluster=20, n_queries=5)
+    vectors.tofile(tmp_path / 'vectors.f32')
+    full = np.memmap(tmp_path / 'vectors.f32', dtype='float32', mode='r', shape=vectors.shape)
+    original = QuantizedVectors.build(vectors, mode, metric, full_vectors=full)
+    original.save(tmp_path / 'codes.index')
+
+    loaded = QuantizedVectors.load(tmp_path / 'codes.index', full_vectors=full)
+    assert (loaded.mode, loaded.metric, len(loaded), loaded.nbytes) == (mode, metric, len(vectors), original.nbytes)
+    for rerank in (False, True):
+        expected_scores, expected_rows = original.search(queries, K, rerank=rerank)
+        scores, rows = loaded.search(queries, K, rerank=rerank)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+
+def test_binary_requires_cosine():
+    with pytest.raises(ValueError):
+        QuantizedVectors.build(np.ones((4, DIM), dtype='float32'), 'binary', 'l2')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Expiração, LRU e invalidação por versão do índice no cache de consultas"""
+
+from query_cache import QueryCache
+
+MODEL = 'fake/encoder-v1'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = QueryCache(ttl_seconds=60, clock=clock)
+    cache.put_embedding('entrega atrasada', MODEL, [1.0, 0.0])
+
+    clock.now = 60
+    assert cache.get_embedding('Entrega  ATRASADA', MODEL) == [1.0, 0.0]
+    clock.now = 60.5
+    assert cache.get_embedding('entrega atrasada', MODEL) is None
+    assert len(cache) == 0
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2, clock=FakeClock())
+    cache.put_embedding('a', MODEL, [1])
+    cache.put_embedding('b', MODEL, [2])
+    # Ler "a" o torna o mais recente: "b" sai quando "c" entra
+    assert cache.get_embedding('a', MODEL) == [1]
+    cache.put_embedding('c', MODEL, [3])
+
+    assert cache.get_embedding('b', MODEL) is None
+    assert cache.get_embedding('a', MODEL) == [1] and cache.get_embedding('c', MODEL) == [3]
+    assert cache.stats()['evictions'] == 1 and len(cache) == 2
+
+
+def test_model_name_is_part_of_the_key():
+    cache = QueryCache(clock=FakeClock())
+    cache.put_embedding('a', MODEL, [1])
+    assert cache.get_embedding('a', 'fake/encoder-v2') is None
+
+
+def test_results_are_served_up_to_the_cached_depth():
+    cache = QueryCache(clock=FakeClock())
+    cache.put_embedding('a', MODEL, [1])
+    cache.put_results('a', MODEL, (), ([0.9, 0.8, 0.7], [3, 1, 2]))
+    # Um resultado mais raso não substitui o mais profundo
+    cache.put_results('a', MODEL, (), ([0.9], [3]))
+
+    assert cache.get_results('a', MODEL, (), 2) == ([0.9, 0.8], [3, 1])
+    assert cache.get_results('a', MODEL, (), 5) is None
+    assert cache.get_results('a', MODEL, (('review_score', 5),), 1) is None
+    stats = cache.stats()
+    assert (stats['result_hits'], stats['result_misses']) == (1, 2)
+
+
+def test_bind_index_invalidates_on_new_version():
+    cache = QueryCache(clock=FakeClock())
+    cache.bind_index('v1')
+    cache.put_embedding('a', MODEL, [1])
+    cache.put_results('a', MODEL, (), ([0.9], [3]))
+
+    cache.bind_index('v1')
+    assert cache.get_embedding('a', MODEL) == [1]
+
+    cache.bind_index('v2')
+    assert cache.index_version == 'v2' and len(cache) == 0
+    assert cache.get_embedding('a', MODEL) is None
+    assert cache.get_results('a', MODEL, (), 1) is None
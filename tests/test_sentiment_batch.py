@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Job de sentimento em lote com um classificador falso (sem modelo e sem rede)"""
+
+import json
+
+import pandas as pd
+import pytest
+
+import sentiment_batch
+
+COMMENTS = [
+    'produto bom', 'chegou quebrado e atrasado, muito ruim mesmo', 'ok', 'Produto bom',
+    'entrega rápida', None, 'não recebi o produto até hoje', '   ', 'ótimo', 'produto bom',
+    'veio diferente do anunciado, não recomendo', 'recomendo', 'chegou antes do prazo',
+]
+
+
+class FakeClassifier:
+    """Mesma interface do pipeline: rótulo derivado do texto, registra os lotes recebidos"""
+
+    def __init__(self, fail_after=None, tokenizer=None):
+        self.batches = []
+        self.fail_after = fail_after
+        if tokenizer is not None:
+            self.tokenizer = tokenizer
+
+    def __call__(self, texts, batch_size=None):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError('falha injetada')
+        self.batches.append(list(texts))
+        return [expected_output(text) for text in texts]
+
+
+class CharTokenizer:
+    """Um token por caractere fora os espaços, mais [CLS] e [SEP] (como um tokenizer de subpalavras)"""
+
+    def __call__(self, texts, add_special_tokens=True, truncation=False):
+        special = [101] if add_special_tokens else []
+        ids = [[ord(char) for char in text if not char.isspace()] for text in texts]
+        return {'input_ids': [special + row + ([102] if add_special_tokens else []) for row in ids]}
+
+
+# Ordem por palavras e ordem por tokens diferem: palavras longas valem mais tokens
+TOKEN_TEXTS = ['extraordinario', 'a b c d', 'bom', 'produto excelente', 'ok ok', 'inacreditavelmente bom']
+
+
+def local_wordpiece_tokenizer():
+    """Tokenizer WordPiece real montado em memória (vocabulário de caracteres, sem rede)"""
+    pytest.importorskip('transformers')
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    letters = [chr(code) for code in range(ord('a'), ord('z') + 1)]
+    vocab = {token: i for i, token in enumerate(['[UNK]', '[CLS]', '[SEP]'] + letters + [f'##{c}' for c in letters])}
+    tokenizer = Tokenizer(models.WordPiece(vocab=vocab, unk_token='[UNK]'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single='[CLS] $A [SEP]', special_tokens=[('[CLS]', vocab['[CLS]']), ('[SEP]', vocab['[SEP]'])])
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token='[UNK]',
+                                   cls_token='[CLS]', sep_token='[SEP]')
+
+
+def expected_output(text):
+    label = 'LABEL_2' if len(text) % 2 else 'LABEL_0'
+    score = (len(text) % 10 + 1) / 11
+    return [{'label': label, 'score': score}, {'label': 'LABEL_1', 'score': 1 - score}]
+
+
+def expected_label(text):
+    return sentiment_batch._to_record(None, expected_output(text))['sentiment']
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rows = [(f'r{i:03d}', COMMENTS[i % len(COMMENTS)]) for i in range(60)]
+    path = tmp_path / 'reviews.csv'
+    pd.DataFrame(rows, columns=['review_id', 'review_comment_message']).to_csv(path, index=False)
+    return path
+
+
+def expected_records(csv_path):
+    df = pd.read_csv(csv_path, dtype=str).dropna(subset=['review_comment_message'])
+    df = df[df['review_comment_message'].str.strip() != '']
+    return [(review_id, expected_label(text)) for review_id, text in zip(df['review_id'], df['review_comment_message'])]
+
+
+def read_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(record['review_id'], record['sentiment']) for record in map(json.loads, f)]
+
+
+def test_classify_chunk_restores_original_order():
+    texts = ['um texto bem mais longo que os outros', 'curto', 'um texto médio aqui', 'a']
+    classifier = FakeClassifier()
+    results = sentiment_batch.classify_chunk(classifier, texts, batch_size=2)
+    # Lotes montados do menor para o maior texto...
+    assert classifier.batches == [['curto', 'a'], ['um texto médio aqui', 'um texto bem mais longo que os outros']]
+    # ...e resultados devolvidos na ordem de entrada
+    assert results == [expected_output(text) for text in texts]
+
+
+@pytest.mark.parametrize('make_tokenizer', [CharTokenizer, local_wordpiece_tokenizer], ids=['fake', 'wordpiece'])
+def test_batches_are_ordered_by_token_count(make_tokenizer):
+    tokenizer = make_tokenizer()
+    classifier = FakeClassifier(tokenizer=tokenizer)
+    results = sentiment_batch.classify_chunk(classifier, TOKEN_TEXTS, batch_size=2)
+
+    counts = {text: len(ids) for text, ids in zip(TOKEN_TEXTS, tokenizer(TOKEN_TEXTS)['input_ids'])}
+    sent = [text for batch in classifier.batches for text in batch]
+    assert [counts[text] for text in sent] == sorted(counts.values())
+    # Sem o tokenizer a ordem seria por palavras ('extraordinario' viria antes de 'a b c d')
+    assert sent.index('a b c d') < sent.index('extraordinario')
+    assert all(len(batch) == 2 for batch in classifier.batches)
+    assert results == [expected_output(text) for text in TOKEN_TEXTS]
+
+
+def test_rows_keep_csv_order(csv_path, tmp_path):
+    output = tmp_path / 'sentiment.jsonl'
+    rows = sentiment_batch.run(csv_path, output, FakeClassifier(), 'fake', chunk_size=7, batch_size=3)
+    assert read_records(output) == expected_records(csv_path)
+    assert rows == len(expected_records(csv_path))
+
+
+def test_chunked_output_matches_single_run(csv_path, tmp_path):
+    chunked, single = tmp_path / 'chunked.jsonl', tmp_path / 'single.jsonl'
+    sentiment_batch.run(csv_path, chunked, FakeClassifier(), 'fake', chunk_size=7, batch_size=3)
+    sentiment_batch.run(csv_path, single, FakeClassifier(), 'fake', chunk_size=1000, batch_size=1000)
+    assert chunked.read_bytes() == single.read_bytes()
+
+
+def test_resume_after_crash_has_no_missing_or_duplicated_rows(csv_path, tmp_path):
+    output = tmp_path / 'sentiment.jsonl'
+    with pytest.raises(RuntimeError):
+        sentiment_batch.run(csv_path, output, FakeClassifier(fail_after=5), 'fake', chunk_size=7, batch_size=3)
+    done = json.loads((tmp_path / 'sentiment.jsonl.checkpoint.json').read_text())['rows_done']
+    assert 0 < done < len(expected_records(csv_path))
+    # Linha pela metade escrita depois do último bloco confirmado
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('{"review_id": "r0')
+
+    sentiment_batch.run(csv_path, output, FakeClassifier(), 'fake', chunk_size=7, batch_size=3)
+    assert read_records(output) == expected_records(csv_path)
+
+
+def test_resume_with_other_chunk_size_restarts(csv_path, tmp_path):
+    output = tmp_path / 'sentiment.jsonl'
+    with pytest.raises(RuntimeError):
+        sentiment_batch.run(csv_path, output, FakeClassifier(fail_after=5), 'fake', chunk_size=7, batch_size=3)
+
+    rows = sentiment_batch.run(csv_path, output, FakeClassifier(), 'fake', chunk_size=5, batch_size=3)
+    assert rows == len(expected_records(csv_path))
+    assert read_records(output) == expected_records(csv_path)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Junção dos top-k dos shards e resultado parcial quando um shard morre"""
+
+import numpy as np
+import pytest
+
+from sharded_index import ShardCoordinator, build_shards, hash_partition
+from vector_index import index_params
+
+
+def shard_hits(similarities, review_ids):
+    return np.array(similarities, dtype='float32'), np.array(review_ids, dtype=object)
+
+
+def test_merge_keeps_the_best_k_across_shards():
+    shard_a = shard_hits([[0.9, 0.5, 0.1], [0.8, -np.inf, -np.inf]], [['a1', 'a2', 'a3'], ['a4', None, None]])
+    shard_b = shard_hits([[0.7, 0.6, 0.2], [0.3, 0.2, 0.1]], [['b1', 'b2', 'b3'], ['b4', 'b5', 'b6']])
+    similarities, review_ids = ShardCoordinator._merge([shard_a, shard_b], n_queries=2, k=4)
+    assert review_ids.tolist() == [['a1', 'b1', 'b2', 'a2'], ['a4', 'b4', 'b5', 'b6']]
+    np.testing.assert_allclose(similarities, [[0.9, 0.7, 0.6, 0.5], [0.8, 0.3, 0.2, 0.1]], rtol=1e-6)
+
+
+def test_merge_pads_missing_positions():
+    shard = shard_hits([[0.4, -np.inf]], [['a1', None]])
+    similarities, review_ids = ShardCoordinator._merge([shard], n_queries=1, k=3)
+    assert review_ids.tolist() == [['a1', None, None]]
+    assert similarities[0, 0] == pytest.approx(0.4) and np.isneginf(similarities[0, 1:]).all()
+
+    similarities, review_ids = ShardCoordinator._merge([], n_queries=2, k=2)
+    assert review_ids.tolist() == [[None, None], [None, None]] and np.isneginf(similarities).all()
+
+
+@pytest.fixture
+def shards(tmp_path):
+    pytest.importorskip('faiss')
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 8)).astype('float32')
+    review_ids = np.array([f'r{i:03d}' for i in range(300)], dtype=object)
+    build_shards(vectors, review_ids, index_params(), n_shards=3, directory=tmp_path)
+    return tmp_path, vectors, review_ids
+
+
+def brute_force(vectors, review_ids, queries, k):
+    """Top-k exato em L2 com a mesma conversão para similaridade do coordenador"""
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    order = np.argsort(distances, axis=1)[:, :k]
+    return 1.0 - np.take_along_axis(distances, order, axis=1) / 2.0, review_ids[order]
+
+
+def test_killed_shard_returns_partial_result(shards):
+    directory, vectors, review_ids = shards
+    queries = vectors[:6]
+    with ShardCoordinator(directory, timeout=5.0, threads_per_shard=1) as coordinator:
+        result = coordinator.search(queries, k=5)
+        assert not result.partial
+        assert result.review_ids.tolist() == brute_force(vectors, review_ids, queries, 5)[1].tolist()
+
+        process = coordinator._processes[1]
+        process.kill()
+        process.join(timeout=10)
+        result = coordinator.search(queries, k=5, timeout=1.0)
+        assert coordinator.alive_shards() == [0, 2]
+
+    assert result.partial and result.missing_shards == [1]
+    # Mesmo resultado de uma busca exata só nos vetores dos shards que responderam
+    survivors = hash_partition(review_ids, 3) != 1
+    expected_similarities, expected_ids = brute_force(vectors[survivors], review_ids[survivors], queries, 5)
+    assert result.review_ids.tolist() == expected_ids.tolist()
+    np.testing.assert_allclose(result.similarities, expected_similarities, rtol=1e-4, atol=1e-4)
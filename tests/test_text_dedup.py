@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Forma canônica dos comentários e mapeamento texto -> texto único"""
+
+import numpy as np
+import pytest
+
+from text_dedup import TextDedup, canonical_text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('\ufb01m do prazo', 'fim do prazo'),  # ligadura (NFKC)
+    ('\uff2f\uff2b \uff11\uff10', 'ok 10'),  # largura total (NFKC)
+    ('e\u0301 o melhor', '\u00e9 o melhor'),  # acento combinante composto (NFKC)
+    ('\u00d3timo PRODUTO', '\u00f3timo produto'),  # casefold
+    ('Stra\u00dfe', 'strasse'),  # casefold além de lower()
+    ('  chegou \t\n  r\u00e1pido  ', 'chegou r\u00e1pido'),  # espaços colapsados e removidos das pontas
+    ('entrega\u00a0r\u00e1pida', 'entrega r\u00e1pida'),  # espaço não separável
+    ('', ''),
+])
+def test_canonical_text(text, expected):
+    assert canonical_text(text) == expected
+
+
+def test_canonical_text_keeps_accents_and_punctuation():
+    assert canonical_text('não') != canonical_text('nao')
+    assert canonical_text('bom!') != canonical_text('bom')
+
+
+def test_from_texts_keeps_first_original_of_each_canonical_form():
+    texts = ['Bom', 'ruim', 'bom', 'RUIM  ', 'ótimo', 'BOM']
+    dedup = TextDedup.from_texts(texts)
+    assert dedup.unique == ['Bom', 'ruim', 'ótimo']
+    assert dedup.ids.tolist() == [0, 1, 0, 1, 2, 0]
+    assert dedup.total == 6
+    assert dedup.ratio == pytest.approx(0.5)
+
+
+def test_expand_follows_input_order():
+    dedup = TextDedup.from_texts(['b', 'a', 'B', 'c', 'A'])
+    assert dedup.expand(['rb', 'ra', 'rc']) == ['rb', 'ra', 'rb', 'rc', 'ra']
+    matrix = np.array([[1, 1], [2, 2], [3, 3]])
+    np.testing.assert_array_equal(dedup.expand(matrix), [[1, 1], [2, 2], [1, 1], [3, 3], [2, 2]])
+
+
+def test_map_calls_func_once_with_unique_texts():
+    calls = []
+
+    def func(texts):
+        calls.append(list(texts))
+        return [text.upper() for text in texts]
+
+    dedup = TextDedup.from_texts(['x', 'y', 'X', 'x'])
+    assert dedup.map(func) == ['X', 'Y', 'X', 'X']
+    assert calls == [['x', 'y']]
+
+
+def test_empty_input():
+    dedup = TextDedup.from_texts([])
+    assert dedup.unique == [] and dedup.total == 0 and dedup.ratio == 0.0
+    assert dedup.map(lambda texts: pytest.fail('não deveria ser chamada')) == []
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deduplicação de textos antes do trabalho dos modelos
+Cada comentário é reduzido a uma forma canônica (NFKC + casefold + espaços
+colapsados); os modelos rodam só uma vez por texto canônico e os resultados
+são espalhados de volta para todos os reviews que o compartilham.
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def canonical_text(text):
+    """NFKC + casefold + espaços colapsados"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+
+class TextDedup:
+    """
+    Mapeia cada texto para o id do seu texto único.
+    unique: primeiro texto original de cada forma canônica (entrada dos modelos)
+    ids: para cada texto de entrada, a posição do seu texto único em `unique`
+    """
+
+    def __init__(self, unique, ids):
+        self.unique = unique
+        self.ids = ids
+
+    @classmethod
+    def from_texts(cls, texts):
+        texts = pd.Series(texts, dtype='object')
+        ids, keys = pd.factorize(texts.map(canonical_text), sort=False)
+        # Posição da primeira ocorrência de cada id (factorize numera na ordem de aparição)
+        _, first = np.unique(ids, return_index=True)
+        return cls(texts.iloc[first].tolist(), ids.astype('int64'))
+
+    @property
+    def total(self):
+        return len(self.ids)
+
+    @property
+    def ratio(self):
+        """Fração dos textos que eram duplicados (0 = todos únicos)"""
+        return 1 - len(self.unique) / self.total if self.total else 0.0
+
+    def expand(self, results):
+        """Espalha os resultados por texto único de volta para todos os textos de entrada"""
+        if isinstance(results, np.ndarray):
+            return results[self.ids]
+        return [results[i] for i in self.ids]
+
+    def map(self, func):
+        """Aplica `func` (lista -> lista/matriz) só nos textos únicos e espalha o resultado"""
+        if not self.unique:
+            return []
+        return self.expand(func(self.unique))
+
+    def __repr__(self):
+        return f"TextDedup(total={self.total}, unique={len(self.unique)}, ratio={self.ratio:.1%})"
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construção, gravação e carga dos índices FAISS dos reviews
+Suporta busca exata (Flat) e aproximada (IVF-Flat, IVF-PQ, HNSW), com
+distância L2 ou similaridade de cosseno (produto interno de vetores normalizados).
+Os parâmetros usados ficam num JSON ao lado do índice.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+INDEX_PATH = 'indice_reviews.faiss'
+INDEX_TYPES = ['flat', 'ivf_flat', 'ivf_pq', 'hnsw']
+METRICS = ['l2', 'cosine']
+
+DEFAULT_PARAMS = {
+    'index_type': 'flat',
+    'metric': 'l2',
+    'nlist': 1024,
+    'nprobe': 16,
+    'pq_m': 16,
+    'pq_bits': 8,
+    'hnsw_m': 32,
+    'ef_construction': 200,
+    'ef_search': 64,
+}
+
+# Mínimo de pontos de treino por centróide recomendado pelo FAISS
+MIN_POINTS_PER_CENTROID = 39
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def index_params(**overrides):
+    """Parâmetros padrão com as substituições informadas (None é ignorado)"""
+    params = dict(DEFAULT_PARAMS)
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    if params['index_type'] not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice inválido: {params['index_type']}")
+    if params['metric'] not in METRICS:
+        raise ValueError(f"Métrica inválida: {params['metric']}")
+    return params
+
+
+def prepare_vectors(vectors, params):
+    """Converte para float32 contíguo e normaliza quando a métrica é cosseno"""
+    if params['metric'] != 'cosine':
+        return np.ascontiguousarray(vectors, dtype='float32')
+    # Cópia: normalize_L2 altera o array no lugar
+    vectors = np.array(vectors, dtype='float32', order='C', copy=True)
+    _faiss().normalize_L2(vectors)
+    return vectors
+
+
+def build_index(vectors, params, train_sample=None, seed=42):
+    """
+    Cria e treina o índice descrito em `params` e adiciona os vetores.
+    Ajusta nlist para baixo quando há poucos pontos de treino.
+    """
+    faiss = _faiss()
+    vectors = prepare_vectors(vectors, params)
+    n, dim = vectors.shape
+    metric = faiss.METRIC_INNER_PRODUCT if params['metric'] == 'cosine' else faiss.METRIC_L2
+    index_type = params['index_type']
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dim)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, params['hnsw_m'], metric)
+        index.hnsw.efConstruction = params['ef_construction']
+    else:
+        nlist = max(1, min(params['nlist'], n // MIN_POINTS_PER_CENTROID))
+        if nlist != params['nlist']:
+            print(f"Aviso: nlist ajustado de {params['nlist']} para {nlist} ({n} vetores)")
+            params['nlist'] = nlist
+        quantizer = faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dim)
+        if index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            if dim % params['pq_m'] != 0:
+                raise ValueError(f"pq_m={params['pq_m']} precisa dividir a dimensão {dim}")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, params['pq_m'], params['pq_bits'], metric)
+
+        # Treina numa amostra para não custar O(N) em corpora muito grandes
+        train_size = train_sample or min(n, nlist * 256)
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(n, size=train_size, replace=False))] if train_size < n else vectors
+        index.train(sample)
+
+    index.add(vectors)
+    set_search_params(index, params)
+    return index
+
+
+def set_search_params(index, params):
+    """Aplica os parâmetros de busca (nprobe / efSearch) ao índice"""
+    faiss = _faiss()
+    if params['index_type'] in ('ivf_flat', 'ivf_pq'):
+        faiss.extract_index_ivf(index).nprobe = params['nprobe']
+    elif params['index_type'] == 'hnsw':
+        index.hnsw.efSearch = params['ef_search']
+
+
+def _sidecar_paths(index_path):
+    index_path = Path(index_path)
+    return index_path.with_suffix('.json'), index_path.with_suffix('.ids.parquet')
+
+
+def save_index(index, params, review_ids, index_path=INDEX_PATH):
+    """Grava o índice, os parâmetros (JSON) e o mapa posição -> review_id"""
+    faiss = _faiss()
+    params_path, ids_path = _sidecar_paths(index_path)
+    Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_index = f'{index_path}.tmp'
+    faiss.write_index(index, tmp_index)
+    os.replace(tmp_index, index_path)
+
+    pd.DataFrame({'review_id': pd.Series(review_ids, dtype='object').to_numpy()}).to_parquet(ids_path, index=False)
+
+    meta = dict(params)
+    meta['dim'] = index.d
+    meta['ntotal'] = int(index.ntotal)
+    # Identifica esta construção (caches de consulta são invalidados quando muda)
+    meta['version'] = uuid.uuid4().hex
+    with open(params_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_index(index_path=INDEX_PATH):
+    """Carrega (índice, parâmetros, review_ids) gravados por save_index()"""
+    faiss = _faiss()
+    params_path, ids_path = _sidecar_paths(index_path)
+    index = faiss.read_index(str(index_path))
+    try:
+        with open(params_path, 'r', encoding='utf-8') as f:
+            params = index_params(**json.load(f))
+    except OSError:
+        # Índices antigos (IndexFlatL2 do notebook) não têm JSON
+        params = index_params()
+    review_ids = pd.read_parquet(ids_path)['review_id'].to_numpy() if ids_path.exists() else None
+    set_search_params(index, params)
+    return index, params, review_ids